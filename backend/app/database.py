@@ -39,9 +39,142 @@ def migrate_fund_tags(engine):
         print(f"数据库迁移警告: {e}")
 
 
+def migrate_fund_classification(engine):
+    """Add derived asset_class / equity_sub columns and backfill unclassified funds."""
+    try:
+        with engine.connect() as conn:
+            inspector = inspect(engine)
+            columns = [c['name'] for c in inspector.get_columns('funds')]
+
+            with conn.begin():
+                if 'asset_class' not in columns:
+                    conn.execute(text("ALTER TABLE funds ADD COLUMN asset_class TEXT"))
+                if 'equity_sub' not in columns:
+                    conn.execute(text("ALTER TABLE funds ADD COLUMN equity_sub TEXT"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_funds_asset_class ON funds (asset_class)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_funds_equity_sub ON funds (equity_sub)"))
+
+        from app.services.classification import backfill_fund_classification
+
+        with Session(engine) as session:
+            backfill_fund_classification(session)
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
+def migrate_fund_overview(engine):
+    """Add fund overview columns (benchmark, inception date, size, fees) and allocation refresh state."""
+    new_columns = {
+        "benchmark": "TEXT NOT NULL DEFAULT ''",
+        "inception_date": "DATE",
+        "fund_size": "FLOAT",
+        "management_fee": "FLOAT",
+        "custodian_fee": "FLOAT",
+        "sales_service_fee": "FLOAT",
+        "overview_updated_at": "DATETIME",
+        "allocation_period": "DATE",
+        "allocation_checked_at": "DATETIME",
+    }
+    try:
+        with engine.connect() as conn:
+            inspector = inspect(engine)
+            columns = [c['name'] for c in inspector.get_columns('funds')]
+
+            with conn.begin():
+                for name, ddl in new_columns.items():
+                    if name not in columns:
+                        conn.execute(text(f"ALTER TABLE funds ADD COLUMN {name} {ddl}"))
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
+def migrate_allocation_history_indexes(engine):
+    """Composite indexes for the per-quarter allocation / top-holding history."""
+    try:
+        with engine.connect() as conn:
+            with conn.begin():
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_fund_allocations_fund_dim_date "
+                    "ON fund_allocations (fund_code, dimension, report_date)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_fund_top_holdings_fund_date "
+                    "ON fund_top_holdings (fund_code, report_date)"
+                ))
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
+def migrate_snapshot_accrual(engine):
+    """Accrued-interest columns on total asset snapshots; backfill the history once when they are added."""
+    try:
+        with engine.connect() as conn:
+            inspector = inspect(engine)
+            columns = [c['name'] for c in inspector.get_columns('total_asset_snapshots')]
+            added = False
+
+            with conn.begin():
+                for name in ("liquid_accrued", "stable_accrued"):
+                    if name not in columns:
+                        conn.execute(text(
+                            f"ALTER TABLE total_asset_snapshots ADD COLUMN {name} FLOAT NOT NULL DEFAULT 0"
+                        ))
+                        added = True
+
+        if added:
+            from app.services.accrual import backfill_accrued_snapshots
+
+            with Session(engine) as session:
+                backfill_accrued_snapshots(session)
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
+def migrate_index_lookthrough_source(engine):
+    """指数成分穿透行改存为 source="index"：修复此前混入季报历史、推高报告期的旧行"""
+    try:
+        from app.services.fund_data import repair_index_lookthrough
+
+        with Session(engine) as session:
+            repair_index_lookthrough(session)
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
+def migrate_generation_triggers(engine):
+    """每张表的写入触发器：递增 data_generations，让 MCP 等其他进程的写入也能使缓存/ETag 失效"""
+    try:
+        from app.services.generations import install_triggers
+
+        install_triggers(engine)
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
+def migrate_style_fit_dropped(engine):
+    """Record the factors left out of each style fit."""
+    try:
+        with engine.connect() as conn:
+            inspector = inspect(engine)
+            columns = [c['name'] for c in inspector.get_columns('fund_style_fits')]
+
+            with conn.begin():
+                if 'dropped_json' not in columns:
+                    conn.execute(text("ALTER TABLE fund_style_fits ADD COLUMN dropped_json TEXT NOT NULL DEFAULT '[]'"))
+    except Exception as e:
+        print(f"数据库迁移警告: {e}")
+
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
     migrate_fund_tags(engine)
+    migrate_fund_classification(engine)
+    migrate_fund_overview(engine)
+    migrate_allocation_history_indexes(engine)
+    migrate_snapshot_accrual(engine)
+    migrate_index_lookthrough_source(engine)
+    migrate_style_fit_dropped(engine)
+    migrate_generation_triggers(engine)
 
 
 def get_session():
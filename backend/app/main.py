@@ -4,20 +4,46 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.database import create_db_and_tables
-from app.routers import dashboard, diagnosis, funds, growth, holdings, insurance, liquid, portfolio, position, stable
+from app.middleware import ETagMiddleware, StreamSafeGZipMiddleware, etag_metrics
+from app.responses import ORJSONResponse
+from app.routers import (
+    dashboard,
+    diagnosis,
+    events,
+    funds,
+    growth,
+    holdings,
+    insurance,
+    liquid,
+    portfolio,
+    position,
+    stable,
+)
 from app.scheduler import scheduler
+from app.services.generations import snapshot as table_generations
+from app.services.intraday import intraday_engine
+from app.services.sweep import shutdown_sweep_pool
+from app.services.trend_rollup import backfill_trend_rollups
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    backfill_trend_rollups()
     scheduler.start()
+    intraday_engine.start()
     yield
+    intraday_engine.stop()
     scheduler.shutdown()
+    shutdown_sweep_pool()
 
 
-app = FastAPI(title="Fund Portfolio Aggregator", lifespan=lifespan)
+app = FastAPI(title="Fund Portfolio Aggregator", lifespan=lifespan, default_response_class=ORJSONResponse)
 
+# Compress bodies over 1 KB (NAV histories, trends); event streams are left uncompressed
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=1024, compresslevel=6)
+# Added before CORS so 304 responses still carry the CORS headers
+app.add_middleware(ETagMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:5175", "http://localhost:5176"],
@@ -37,8 +63,15 @@ app.include_router(insurance.router)
 app.include_router(stable.router)
 app.include_router(dashboard.router)
 app.include_router(diagnosis.router)
+app.include_router(events.router)
 
 
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics/http-cache")
+def http_cache_metrics():
+    """ETag 命中率（304 / 总条件化 GET）与各表数据代数"""
+    return {**etag_metrics.report(), "generations": table_generations()}
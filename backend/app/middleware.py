@@ -0,0 +1,141 @@
+"""Conditional GET support: weak ETags derived from per-table data generations.
+
+Each cached path prefix declares the tables its handlers read. The ETag
+hashes the URL, today's date (several views depend on it), the boot id and
+those tables' generations; it is computed *before* the handler runs, so a
+matching ``If-None-Match`` is answered with 304 without touching the handler,
+and a write racing with the handler only makes the next check miss.
+"""
+
+import datetime
+import hashlib
+import threading
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+
+from app.services.generations import BOOT_ID, generation
+
+_HOLDING_TABLES = frozenset({"holdings", "funds", "fund_nav_history", "holding_change_logs"})
+_FUND_TABLES = frozenset({
+    "funds", "fund_nav_history", "fund_allocations", "fund_top_holdings", "holdings",
+    "index_constituents", "stock_industries", "fund_style_fits", "fund_fetch_misses",
+})
+
+# (path prefix, tables read; None = never cached, "*" = any table). First match wins.
+CACHE_RULES: list[tuple[str, frozenset[str] | str | None]] = [
+    ("/api/portfolio/intraday", None),  # in-memory estimates, not table data
+    ("/api/funds/universe", None),  # remote fund list
+    ("/api/dashboard", "*"),
+    ("/api/holdings", _HOLDING_TABLES),
+    ("/api/portfolio", _FUND_TABLES | {"portfolio_snapshots", "trend_rollups", "index_nav_history"}),
+    ("/api/funds", _FUND_TABLES),
+    ("/api/insurance", frozenset({"insurance_policies"})),
+    ("/api/stable", frozenset({"stable_assets"})),
+]
+
+
+# Server-sent event streams: never compressed. Starlette before 0.41.3 gzips text/event-stream and
+# buffers each event in the compressor, so clients would only see them once enough bytes pile up.
+UNCOMPRESSED_PATHS = frozenset({"/api/events", "/api/portfolio/intraday/stream"})
+
+
+def _rule_for(path: str) -> tuple[str, frozenset[str] | str | None] | None:
+    for prefix, tables in CACHE_RULES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return prefix, tables
+    return None
+
+
+class _Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, dict[str, int]] = {}
+
+    def record(self, prefix: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(prefix, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+    def report(self) -> dict:
+        with self._lock:
+            counts = {p: dict(c) for p, c in self._counts.items()}
+        hits = sum(c["hits"] for c in counts.values())
+        total = hits + sum(c["misses"] for c in counts.values())
+        for c in counts.values():
+            n = c["hits"] + c["misses"]
+            c["hit_rate"] = round(c["hits"] / n, 3) if n else 0.0
+        return {
+            "hits": hits,
+            "misses": total - hits,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "by_prefix": counts,
+        }
+
+
+etag_metrics = _Metrics()
+
+
+def compute_etag(path: str, query: str, tables: frozenset[str] | str) -> str:
+    generations = generation(None if tables == "*" else tables)
+    key = f"{BOOT_ID}|{datetime.date.today()}|{path}?{query}|{generations}"
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on either side
+    candidates = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        rule = _rule_for(scope["path"])
+        if rule is None or rule[1] is None:
+            await self.app(scope, receive, send)
+            return
+
+        prefix, tables = rule
+        etag = compute_etag(scope["path"], scope.get("query_string", b"").decode(), tables)
+        if _etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+            etag_metrics.record(prefix, "hits")
+            response = Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+            await response(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                # Handlers mark partial failures no-store: tagging them would pin the error behind 304s
+                if "no-store" not in headers.get("cache-control", ""):
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = "private, no-cache"
+            await send(message)
+
+        etag_metrics.record(prefix, "misses")
+        await self.app(scope, receive, send_with_etag)
+
+
+class StreamSafeGZipMiddleware:
+    """:class:`GZipMiddleware` that passes :data:`UNCOMPRESSED_PATHS` through untouched."""
+
+    def __init__(self, app, **options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in UNCOMPRESSED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
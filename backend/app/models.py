@@ -1,5 +1,6 @@
 import datetime
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -13,6 +14,20 @@ class Fund(SQLModel, table=True):
     # 新增标签字段
     index_type: str | None = Field(default=None, description="指数类型标签: csi300|sp500|nasdaq100|csi500|hsi")
     region: str | None = Field(default=None, description="地域标签: china|usa|hongkong|japan|europe|global")
+    # 派生分类（由名称/类型/index_type 计算，入库和改标签时更新）
+    asset_class: str | None = Field(default=None, index=True, description="equity|bond|gold")
+    equity_sub: str | None = Field(default=None, index=True, description="spx|nasdaq|csi300|dividend|hkt|other")
+    # 基金概况（来自 fund_overview_em，长 TTL 刷新）
+    benchmark: str = ""
+    inception_date: datetime.date | None = None
+    fund_size: float | None = Field(default=None, description="资产规模（亿元）")
+    management_fee: float | None = Field(default=None, description="管理费率 %/年")
+    custodian_fee: float | None = Field(default=None, description="托管费率 %/年")
+    sales_service_fee: float | None = Field(default=None, description="销售服务费率 %/年")
+    overview_updated_at: datetime.datetime | None = None
+    # 持仓披露状态：已入库的最新报告期 / 上次检查时间（按披露日历决定是否刷新）
+    allocation_period: datetime.date | None = None
+    allocation_checked_at: datetime.datetime | None = None
     last_updated: datetime.datetime | None = None
 
 
@@ -39,18 +54,21 @@ class FundNavHistory(SQLModel, table=True):
 
 class FundAllocation(SQLModel, table=True):
     __tablename__ = "fund_allocations"
+    # 保留每个披露季度；按 (基金, 维度, 报告期) 查询 as-of 数据
+    __table_args__ = (Index("ix_fund_allocations_fund_dim_date", "fund_code", "dimension", "report_date"),)
 
     id: int | None = Field(default=None, primary_key=True)
     fund_code: str = Field(foreign_key="funds.fund_code")
     dimension: str  # asset_class / geography / sector
     category: str
     percentage: float
-    source: str = "auto"  # auto / manual
+    source: str = "auto"  # auto / manual / inferred / index
     report_date: datetime.date | None = None
 
 
 class FundTopHolding(SQLModel, table=True):
     __tablename__ = "fund_top_holdings"
+    __table_args__ = (Index("ix_fund_top_holdings_fund_date", "fund_code", "report_date"),)
 
     id: int | None = Field(default=None, primary_key=True)
     fund_code: str = Field(foreign_key="funds.fund_code")
@@ -60,6 +78,58 @@ class FundTopHolding(SQLModel, table=True):
     report_date: datetime.date | None = None
 
 
+class FundFetchMiss(SQLModel, table=True):
+    __tablename__ = "fund_fetch_misses"
+    # akshare 查询无数据的负缓存：到期前跳过该 (基金, 接口, 报告期) 的请求
+
+    fund_code: str = Field(foreign_key="funds.fund_code", primary_key=True)
+    endpoint: str = Field(primary_key=True)  # sector / top_holdings
+    period: str = Field(primary_key=True)  # 报告年份，如 "2026"
+    checked_at: datetime.datetime
+    expires_at: datetime.datetime
+
+
+class IndexConstituent(SQLModel, table=True):
+    __tablename__ = "index_constituents"
+    # 指数成分股权重（中证指数公司月度权重文件），每个指数只保留最新一期
+
+    index_code: str = Field(primary_key=True)  # 如 000300
+    stock_code: str = Field(primary_key=True)
+    stock_name: str = ""
+    weight: float  # %
+    as_of: datetime.date  # 权重日期
+
+
+class IndexNavHistory(SQLModel, table=True):
+    __tablename__ = "index_nav_history"
+    # 风格分析用的指数收盘价序列
+
+    index_code: str = Field(primary_key=True)
+    date: datetime.date = Field(primary_key=True)
+    close: float
+
+
+class FundStyleFit(SQLModel, table=True):
+    __tablename__ = "fund_style_fits"
+    # 收益率风格分析结果，对应 source="inferred" 的配置行
+
+    fund_code: str = Field(foreign_key="funds.fund_code", primary_key=True)
+    nav_date: datetime.date  # 拟合所用的最新净值日期
+    observations: int
+    r_squared: float
+    weights_json: str = "{}"  # {因子: 权重}
+    dropped_json: str = "[]"  # 窗口内无数据、未参与拟合的因子
+    fitted_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+
+class StockIndustry(SQLModel, table=True):
+    __tablename__ = "stock_industries"
+
+    stock_code: str = Field(primary_key=True)
+    industry: str  # 东方财富行业板块
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+
 class HoldingChangeLog(SQLModel, table=True):
     __tablename__ = "holding_change_logs"
 
@@ -146,6 +216,58 @@ class TotalAssetSnapshot(SQLModel, table=True):
     growth_amount: float = 0.0
     insurance_premium: float = 0.0
     total_assets: float = 0.0
+    liquid_accrued: float = 0.0  # liquid_amount 中的应计利息部分
+    stable_accrued: float = 0.0  # stable_amount 中的应计利息部分
+
+
+class TrendRollup(SQLModel, table=True):
+    __tablename__ = "trend_rollups"
+    # 快照走势的周/月/季度汇总，每次快照后增量重算
+
+    series: str = Field(primary_key=True)  # portfolio / total_assets
+    interval: str = Field(primary_key=True)  # week / month / quarter
+    period_start: datetime.date = Field(primary_key=True)  # 周一 / 月初 / 季初
+    period_end: datetime.date  # 区间内最后一个快照日
+    observations: int
+    open: float
+    high: float
+    low: float
+    close: float
+    period_return: float | None = None  # 相对上一区间收盘，百分比
+    values_json: str = "{}"  # 区间最后一个快照的全部字段
+
+
+class Reminder(SQLModel, table=True):
+    __tablename__ = "reminders"
+    # 物化的待办提醒（保险续费/失效、理财到期、仓位偏离），写入时按来源重建，每日滚动
+
+    id: int | None = Field(default=None, primary_key=True)
+    source: str = Field(index=True)  # insurance / stable / growth_position
+    source_id: int | None = None
+    type: str
+    level: str  # urgent / warning / info（30 天以外）
+    due_date: datetime.date = Field(index=True)  # 无具体日期的提醒（失效、仓位）记为生成当日
+    days: int | None = None  # 距到期天数，生成当日计算
+    title: str
+    detail: str
+    link: str
+    rolled_on: datetime.date
+
+
+class ReminderRoll(SQLModel, table=True):
+    __tablename__ = "reminder_rolls"
+    # 单行：提醒表最近一次全量滚动的日期（无提醒时也记录，读取方据此判断是否过期）
+
+    id: int | None = Field(default=None, primary_key=True)
+    rolled_on: datetime.date
+
+
+class DataGeneration(SQLModel, table=True):
+    __tablename__ = "data_generations"
+    # 每张表的写入计数，由 SQLite 触发器维护（任何进程、任何写法的写入都会计入），供缓存/ETag 判断失效
+
+    table_name: str = Field(primary_key=True)
+    generation: int = 0
 
 
 class InsurancePolicy(SQLModel, table=True):
@@ -0,0 +1,19 @@
+"""JSON responses rendered with orjson.
+
+``ORJSONResponse`` is the app's default response class. Handlers returning
+plain dicts still go through FastAPI's ``jsonable_encoder`` first; the large
+endpoints (NAV history, holdings) build JSON-native rows themselves and return
+the response directly, skipping both the encoder and per-row model validation.
+"""
+
+import orjson
+from fastapi.responses import JSONResponse
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=_OPTIONS)
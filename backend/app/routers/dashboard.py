@@ -1,38 +1,61 @@
 import datetime as dt
+from dataclasses import dataclass
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session, select
 
 from app.database import get_session
 from app.models import (
     Holding,
-    FundNavHistory,
     LiquidAsset,
     StableAsset,
     InsurancePolicy,
-    PositionBudget,
     TotalAssetSnapshot,
     AllocationTarget,
 )
 from app.schemas import AllocationTargetRequest
+from app.services.accrual import backfill_accrued_snapshots
+from app.services.downsample import downsample_rows
+from app.services.events import publish
+from app.services.nav_panel import latest_navs
+from app.services.reminders import due_reminders
+from app.services.trend_rollup import load_rollups
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
-def _get_growth_summary(session: Session) -> dict:
-    """Calculate long-money (fund) bucket summary."""
+@dataclass
+class _DashboardData:
+    """Every table the dashboard views read, loaded once and shared between them."""
+
+    liquid_assets: list[LiquidAsset]
+    stable_assets: list[StableAsset]
+    policies: list[InsurancePolicy]
+    holdings: list[Holding]
+    navs: dict[str, tuple[float, dt.date]]
+    target: AllocationTarget | None
+
+
+def _load_dashboard_data(session: Session) -> _DashboardData:
     holdings = session.exec(select(Holding)).all()
+    return _DashboardData(
+        liquid_assets=session.exec(select(LiquidAsset)).all(),
+        stable_assets=session.exec(select(StableAsset)).all(),
+        policies=session.exec(select(InsurancePolicy)).all(),
+        holdings=holdings,
+        navs=latest_navs([h.fund_code for h in holdings], session),
+        target=session.exec(select(AllocationTarget)).first(),
+    )
+
+
+def _get_growth_summary(data: _DashboardData) -> dict:
+    """Calculate long-money (fund) bucket summary."""
     total_value = 0.0
     total_cost = 0.0
-    for h in holdings:
-        nav_row = session.exec(
-            select(FundNavHistory)
-            .where(FundNavHistory.fund_code == h.fund_code)
-            .order_by(FundNavHistory.date.desc())
-        ).first()
-        nav = nav_row.nav if nav_row else None
+    for h in data.holdings:
+        nav = data.navs[h.fund_code][0] if h.fund_code in data.navs else None
         if nav is not None:
             total_value += h.shares * nav
         total_cost += h.shares * h.cost_price
@@ -43,7 +66,7 @@ def _get_growth_summary(session: Session) -> dict:
         "total_cost": round(total_cost, 2),
         "total_pnl": round(total_pnl, 2),
         "pnl_percent": round(pnl_percent, 2),
-        "count": len(holdings),
+        "count": len(data.holdings),
     }
 
 
@@ -67,23 +90,27 @@ def _nearest_renewal_days(policies: list) -> int | None:
 
 @router.get("/summary")
 def dashboard_summary(session: SessionDep):
+    return _summary(_load_dashboard_data(session))
+
+
+def _summary(data: _DashboardData) -> dict:
     # Liquid bucket
-    liquid_assets = session.exec(select(LiquidAsset)).all()
+    liquid_assets = data.liquid_assets
     liquid_amount = sum(a.amount for a in liquid_assets)
     liquid_return = sum(
         a.amount * (a.annual_rate / 100) for a in liquid_assets if a.annual_rate
     )
 
     # Stable bucket
-    stable_assets = session.exec(select(StableAsset)).all()
+    stable_assets = data.stable_assets
     stable_amount = sum(a.amount for a in stable_assets)
     stable_return = sum(a.amount * (a.annual_rate / 100) for a in stable_assets)
 
     # Growth bucket (funds)
-    growth = _get_growth_summary(session)
+    growth = _get_growth_summary(data)
 
     # Insurance bucket
-    policies = session.exec(select(InsurancePolicy)).all()
+    policies = data.policies
     active_policies = [p for p in policies if p.status == "active"]
     total_premium = sum(p.annual_premium for p in active_policies)
     covered_persons = len(set(p.insured_person for p in active_policies))
@@ -125,140 +152,35 @@ def dashboard_summary(session: SessionDep):
 
 @router.get("/reminders")
 def dashboard_reminders(session: SessionDep):
-    today = dt.date.today()
-    reminders = []
-
-    # Insurance lapsed / expired reminders
-    all_policies = session.exec(select(InsurancePolicy)).all()
-    for p in all_policies:
-        if p.status == "lapsed":
-            reminders.append({
-                "type": "insurance_lapsed",
-                "level": "urgent",
-                "title": "保险已失效",
-                "detail": f"{p.name}({p.insured_person}) 状态已失效",
-                "days": None,
-                "link": "/insurance",
-            })
-        elif p.status == "active" and p.end_date and p.end_date < today:
-            reminders.append({
-                "type": "insurance_expired",
-                "level": "urgent",
-                "title": "保险已过期",
-                "detail": f"{p.name}({p.insured_person}) 已于{p.end_date}过期",
-                "days": None,
-                "link": "/insurance",
-            })
-
-    # Insurance renewal reminders
-    active_policies = [p for p in all_policies if p.status == "active"]
-    for p in active_policies:
-        if not p.next_payment_date:
-            continue
-        days = (p.next_payment_date - today).days
-        if days < 0:
-            reminders.append({
-                "type": "insurance_renewal",
-                "level": "urgent",
-                "title": "保险已逾期续费",
-                "detail": f"{p.name}({p.insured_person}) 已逾期{-days}天",
-                "days": days,
-                "link": "/insurance",
-            })
-        elif days <= 7:
-            reminders.append({
-                "type": "insurance_renewal",
-                "level": "urgent",
-                "title": "保险即将续费",
-                "detail": f"{p.name}({p.insured_person}) 还有{days}天",
-                "days": days,
-                "link": "/insurance",
-            })
-        elif days <= 30:
-            reminders.append({
-                "type": "insurance_renewal",
-                "level": "warning",
-                "title": "保险续费提醒",
-                "detail": f"{p.name}({p.insured_person}) 还有{days}天",
-                "days": days,
-                "link": "/insurance",
-            })
-
-    # Stable asset maturity reminders
-    stable_assets = session.exec(select(StableAsset)).all()
-    for a in stable_assets:
-        if not a.maturity_date:
-            continue
-        days = (a.maturity_date - today).days
-        if days < 0:
-            reminders.append({
-                "type": "stable_maturity",
-                "level": "urgent",
-                "title": "理财已到期",
-                "detail": f"{a.name} 已到期{-days}天，请处理",
-                "days": days,
-                "link": "/stable",
-            })
-        elif days <= 7:
-            reminders.append({
-                "type": "stable_maturity",
-                "level": "urgent",
-                "title": "理财即将到期",
-                "detail": f"{a.name} 还有{days}天到期",
-                "days": days,
-                "link": "/stable",
-            })
-        elif days <= 30:
-            reminders.append({
-                "type": "stable_maturity",
-                "level": "warning",
-                "title": "理财到期提醒",
-                "detail": f"{a.name} 还有{days}天到期",
-                "days": days,
-                "link": "/stable",
-            })
-
-    # Growth money — position warning
-    budget = session.exec(select(PositionBudget)).first()
-    if budget and budget.total_budget > 0:
-        growth = _get_growth_summary(session)
-        position_pct = growth["total_amount"] / budget.total_budget * 100
-        if position_pct < budget.target_position_min:
-            reminders.append({
-                "type": "growth_position",
-                "level": "warning",
-                "title": "长钱仓位偏低",
-                "detail": f"当前仓位 {position_pct:.0f}%，低于目标下限 {budget.target_position_min:.0f}%",
-                "days": None,
-                "link": "/growth/position",
-            })
-        elif position_pct > budget.target_position_max:
-            reminders.append({
-                "type": "growth_position",
-                "level": "warning",
-                "title": "长钱仓位偏高",
-                "detail": f"当前仓位 {position_pct:.0f}%，高于目标上限 {budget.target_position_max:.0f}%",
-                "days": None,
-                "link": "/growth/position",
-            })
-
-    # Sort: urgent first, then warning, then info; within same level by days ascending
-    level_order = {"urgent": 0, "warning": 1, "info": 2}
-    reminders.sort(key=lambda r: (level_order.get(r["level"], 9), r["days"] if r["days"] is not None else 999))
-
-    return reminders
+    return due_reminders(session)
 
 
 @router.get("/trend")
-def dashboard_trend(session: SessionDep, days: int = 90):
-    """Return total asset snapshots for the last N days."""
+def dashboard_trend(
+    session: SessionDep,
+    days: int = 90,
+    interval: str = Query("day", pattern="^(day|week|month|quarter)$"),
+    max_points: int | None = Query(None, ge=3),
+):
+    """Return total asset snapshots for the last N days, LTTB-downsampled by total assets if *max_points* is set.
+
+    With a week/month/quarter *interval*, returns the precomputed rollups instead
+    (OHLC of total assets, period return and the closing snapshot's fields).
+    """
+    return _trend(session, days, interval, max_points)
+
+
+def _trend(session: Session, days: int, interval: str, max_points: int | None) -> list[dict]:
     cutoff = dt.date.today() - dt.timedelta(days=days) if days > 0 else dt.date.min
+    if interval != "day":
+        rollups = load_rollups("total_assets", interval, session, start=cutoff)
+        return downsample_rows(rollups, max_points, "total_assets")
     rows = session.exec(
         select(TotalAssetSnapshot)
         .where(TotalAssetSnapshot.date >= cutoff)
         .order_by(TotalAssetSnapshot.date)
     ).all()
-    return [
+    trend = [
         {
             "date": str(r.date),
             "liquid_amount": r.liquid_amount,
@@ -269,6 +191,27 @@ def dashboard_trend(session: SessionDep, days: int = 90):
         }
         for r in rows
     ]
+    return downsample_rows(trend, max_points, "total_assets")
+
+
+@router.get("/bundle")
+def dashboard_bundle(
+    session: SessionDep,
+    days: int = 90,
+    interval: str = Query("day", pattern="^(day|week|month|quarter)$"),
+    max_points: int | None = Query(None, ge=3),
+):
+    """Summary, reminders, trend and allocation targets in one response (one read of each table).
+
+    The trend parameters are those of ``/trend``.
+    """
+    data = _load_dashboard_data(session)
+    return {
+        "summary": _summary(data),
+        "reminders": due_reminders(session),
+        "trend": _trend(session, days, interval, max_points),
+        "allocation_targets": _allocation_targets(data.target),
+    }
 
 
 @router.post("/snapshot")
@@ -287,6 +230,23 @@ def take_snapshot(session: SessionDep):
     }
 
 
+@router.post("/snapshot/backfill-accrual")
+def backfill_snapshot_accrual(
+    session: SessionDep,
+    start: dt.date | None = Query(None),
+    end: dt.date | None = Query(None),
+    overwrite: bool = Query(False, description="重算已记录利息的快照（已删除资产的利息会丢失）"),
+):
+    """Fill the interest accrued by liquid/stable assets into historical total asset snapshots.
+
+    Estimated from the current assets; snapshots that already carry accrual are kept unless *overwrite*.
+    """
+    result = backfill_accrued_snapshots(session, start, end, overwrite=overwrite)
+    if result["updated"]:
+        publish("snapshot_written", kind="total_assets", date=result["to"], dates=result["updated"])
+    return result
+
+
 @router.get("/allocation-targets")
 def get_allocation_targets(session: SessionDep):
     """Return user-configured bucket allocation targets.
@@ -294,7 +254,10 @@ def get_allocation_targets(session: SessionDep):
     - stable_target: percentage of remaining assets (total - liquid)
     - growth_target: percentage of remaining assets (total - liquid)
     """
-    target = session.exec(select(AllocationTarget)).first()
+    return _allocation_targets(session.exec(select(AllocationTarget)).first())
+
+
+def _allocation_targets(target: AllocationTarget | None) -> dict | None:
     if not target:
         return None
     return {
@@ -333,6 +296,7 @@ def update_allocation_targets(
         session.add(target)
     session.commit()
     session.refresh(target)
+    publish("config_changed", scope="allocation_targets")
     return {
         "liquid_target": target.liquid_target,
         "stable_target": target.stable_target,
@@ -0,0 +1,87 @@
+import json
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.events import Event, bus
+from app.services.generations import BOOT_ID
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+# Seconds between keep-alive comments on an idle stream
+_KEEPALIVE_SECONDS = 15
+
+
+def _format(event: Event) -> str:
+    payload = json.dumps({**event.data, "at": event.at}, ensure_ascii=False)
+    return f"id: {BOOT_ID}-{event.id}\nevent: {event.type}\ndata: {payload}\n\n"
+
+
+def _resume_after(last_event_id: str | None) -> int:
+    """Sequence number to resume after for a client's ``Last-Event-ID``.
+
+    Sequence numbers restart with the process, so an id from another boot (or
+    one this process has not reached) replays everything still buffered.
+    """
+    if last_event_id is None:
+        return bus.last_id
+    boot, _, seq = last_event_id.rpartition("-")
+    if boot == BOOT_ID and seq.isdigit() and int(seq) <= bus.last_id:
+        return int(seq)
+    return 0
+
+
+@router.get("")
+async def event_stream(
+    request: Request,
+    types: str | None = Query(None, description="逗号分隔的事件类型过滤，如 nav_updated,holding_changed"),
+    last_event_id: str | None = Header(None),
+):
+    """Server-sent events: data-change notifications so clients refetch only affected views.
+
+    Event ids are ``<boot id>-<sequence>``. Reconnecting clients send ``Last-Event-ID`` and receive the
+    buffered events they missed. The buffer lives in memory: after a server restart only events published
+    since boot are replayed, so clients that see a new boot id should refetch their views.
+    """
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+
+    async def events():
+        last_id = _resume_after(last_event_id)
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            batch = await bus.wait_async(last_id, _KEEPALIVE_SECONDS)
+            if not batch:
+                yield ": keep-alive\n\n"
+                continue
+            last_id = batch[-1].id
+            for event in batch:
+                if wanted is None or event.type in wanted:
+                    yield _format(event)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/recent")
+def recent_events(after: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500)):
+    """Buffered events newer than *after*, for clients that prefer polling one cheap endpoint.
+
+    Returns the oldest *limit* events, so clients page forward from the last id they received while
+    ``has_more`` is true. ``missed`` means events after *after* have already left the buffer and the
+    client should refetch its views instead of relying on the list.
+
+    Ids restart with the server: when ``boot_id`` changes, poll again from 0. An *after* beyond the
+    current last id is treated that way already.
+    """
+    if after > bus.last_id:
+        after = 0
+    oldest_id = bus.oldest_id
+    pending = bus.since(after)
+    events = pending[:limit]
+    return {
+        "boot_id": BOOT_ID,
+        "last_id": bus.last_id,
+        "oldest_id": oldest_id,
+        "missed": after + 1 < oldest_id,
+        "has_more": len(pending) > limit,
+        "events": [{"id": e.id, "type": e.type, "data": e.data, "at": e.at} for e in events],
+    }
@@ -1,37 +1,298 @@
 import datetime
+import logging
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 
 from app.database import get_session, engine
-from app.models import Fund, FundAllocation, FundNavHistory, FundTopHolding
+from app.models import Fund, FundAllocation, FundNavHistory, Holding
+from app.responses import ORJSONResponse
 from app.schemas import FundTagsUpdate
-from app.services.fund_data import fetch_fund_allocation, fetch_fund_info, fetch_fund_nav
+from app.services.allocation import latest_allocations, latest_top_holdings
+from app.services.classification import apply_fund_classification
+from app.services.disclosure import current_window, expected_period, next_window, plan_allocation_refresh
+from app.services.downsample import downsample_columns
+from app.services.events import publish
+from app.services.fund_data import (
+    apply_index_lookthrough,
+    classify_fund_universe,
+    fetch_fund_info,
+    fetch_fund_nav,
+    refresh_fund_allocation,
+)
+from app.services.index_constituents import (
+    constituents_as_of,
+    held_index_funds,
+    index_code_for,
+    index_sector_weights,
+    index_stock_weights,
+    refresh_index_constituents,
+)
+from app.services.nav_panel import latest_navs
+from app.services.reminders import refresh_reminders
+from app.services.style_inference import get_style_fit, run_style_inference
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/funds", tags=["funds"])
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+DETAIL_FIELDS = ("fund", "nav_history", "allocation", "top_holdings")
+_MAX_DETAIL_CODES = 20
+
+
+def _fund_infos(codes: list[str], session: Session) -> dict[str, dict]:
+    funds = session.exec(select(Fund).where(Fund.fund_code.in_(codes))).all()
+    navs = latest_navs(codes, session)
+    result = {}
+    for fund in funds:
+        nav, nav_date = navs.get(fund.fund_code, (None, None))
+        result[fund.fund_code] = {
+            **fund.model_dump(),
+            "latest_nav": nav,
+            "latest_nav_date": str(nav_date) if nav_date else None,
+        }
+    return result
+
+
+def _nav_series(
+    codes: list[str],
+    session: Session,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    max_points: int | None = None,
+) -> dict[str, tuple[list[datetime.date], list[float]]]:
+    """``{fund_code: (dates, navs)}`` for *codes* in one query, optionally LTTB-downsampled."""
+    query = select(FundNavHistory.fund_code, FundNavHistory.date, FundNavHistory.nav).where(
+        FundNavHistory.fund_code.in_(codes)
+    )
+    if start:
+        query = query.where(FundNavHistory.date >= start)
+    if end:
+        query = query.where(FundNavHistory.date <= end)
+    series: dict[str, tuple[list, list]] = {code: ([], []) for code in codes}
+    for code, d, nav in session.exec(query.order_by(FundNavHistory.fund_code, FundNavHistory.date)).all():
+        series[code][0].append(d)
+        series[code][1].append(nav)
+    return {code: downsample_columns(dates, navs, max_points) for code, (dates, navs) in series.items()}
+
+
+def _allocation_views(codes: list[str], session: Session, as_of: datetime.date | None = None) -> dict[str, dict]:
+    dimensions = session.exec(
+        select(FundAllocation.dimension).where(FundAllocation.fund_code.in_(codes)).distinct()
+    ).all()
+    result: dict[str, dict[str, list]] = {code: {} for code in codes}
+    for dimension in dimensions:
+        for code, rows in latest_allocations(codes, dimension, session, as_of=as_of).items():
+            result[code][dimension] = [
+                {
+                    "category": a.category,
+                    "percentage": a.percentage,
+                    "source": a.source,
+                    "report_date": str(a.report_date) if a.report_date else None,
+                }
+                for a in rows
+            ]
+    return result
+
+
+def _top_holding_views(codes: list[str], session: Session, as_of: datetime.date | None = None) -> dict[str, list]:
+    holdings = latest_top_holdings(codes, session, as_of=as_of)
+    return {
+        code: [
+            {
+                "stock_code": h.stock_code,
+                "stock_name": h.stock_name,
+                "percentage": h.percentage,
+                "report_date": str(h.report_date) if h.report_date else None,
+            }
+            for h in holdings.get(code, [])
+        ]
+        for code in codes
+    }
+
+
+def _parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(DETAIL_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in DETAIL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def _fund_details(
+    codes: list[str],
+    fields: list[str],
+    session: Session,
+    start: datetime.date | None,
+    end: datetime.date | None,
+    max_points: int | None,
+    as_of: datetime.date | None,
+) -> list[dict]:
+    """Detail views of *codes*, one batched query set per field.
+
+    A failing field is reported under ``errors`` and left out, the other fields are still returned.
+    """
+    builders = {
+        "fund": lambda: _fund_infos(codes, session),
+        "nav_history": lambda: {
+            code: [{"date": d, "nav": nav} for d, nav in zip(dates, navs)]
+            for code, (dates, navs) in _nav_series(codes, session, start, end, max_points).items()
+        },
+        "allocation": lambda: _allocation_views(codes, session, as_of),
+        "top_holdings": lambda: _top_holding_views(codes, session, as_of),
+    }
+    details = [{"fund_code": code, "errors": {}} for code in codes]
+    for field in fields:
+        try:
+            values = builders[field]()
+        except Exception as e:
+            logger.exception("fund detail field %s failed for %s", field, codes)
+            session.rollback()
+            for detail in details:
+                detail["errors"][field] = str(e) or type(e).__name__
+            continue
+        for detail in details:
+            if field == "fund" and detail["fund_code"] not in values:
+                detail["errors"]["fund"] = "Fund not found"
+            else:
+                detail[field] = values.get(detail["fund_code"])
+    return details
+
+
+def _detail_response(content: dict, details: list[dict]) -> ORJSONResponse:
+    """Details with a failed field are marked ``no-store`` so the ETag middleware leaves them untagged."""
+    if any(detail["errors"] for detail in details):
+        return ORJSONResponse(content, headers={"Cache-Control": "no-store"})
+    return ORJSONResponse(content)
+
+
+@router.get("/universe/classification")
+def get_universe_classification(
+    asset_class: str | None = Query(None, description="equity|bond|gold"),
+    equity_sub: str | None = Query(None),
+    geography: str | None = Query(None),
+    q: str | None = Query(None, description="基金代码或名称关键字"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Classification of the whole fund universe, for tagging funds before they are bought."""
+    try:
+        rows = classify_fund_universe()
+    except Exception:
+        raise HTTPException(status_code=502, detail="Failed to load fund list")
+
+    counts: dict[str, int] = {}
+    for r in rows:
+        counts[r["asset_class"]] = counts.get(r["asset_class"], 0) + 1
+
+    if asset_class:
+        rows = [r for r in rows if r["asset_class"] == asset_class]
+    if equity_sub:
+        rows = [r for r in rows if r["equity_sub"] == equity_sub]
+    if geography:
+        rows = [r for r in rows if r["geography"] == geography]
+    if q:
+        rows = [r for r in rows if q in r["fund_code"] or q in r["fund_name"]]
+
+    return {
+        "universe_size": sum(counts.values()),
+        "asset_class_counts": counts,
+        "total": len(rows),
+        "items": rows[offset:offset + limit],
+    }
+
+
+@router.get("/disclosure/plan")
+def get_disclosure_plan(session: SessionDep):
+    """披露日历与持仓基金的配置刷新计划"""
+    window = current_window()
+    codes = sorted(set(session.exec(select(Holding.fund_code)).all()))
+    funds = session.exec(select(Fund).where(Fund.fund_code.in_(codes))).all() if codes else []
+    items = []
+    for f in funds:
+        plan = plan_allocation_refresh(f.allocation_period, f.allocation_checked_at)
+        items.append({
+            "fund_code": f.fund_code,
+            "fund_name": f.fund_name,
+            "allocation_period": str(f.allocation_period) if f.allocation_period else None,
+            "allocation_checked_at": f.allocation_checked_at.isoformat() if f.allocation_checked_at else None,
+            "fetch": plan.fetch,
+            "reason": plan.reason,
+        })
+    upcoming = next_window()
+    return {
+        "expected_period": str(expected_period()),
+        "current_window": {
+            "period": str(window.period), "kind": window.kind, "start": str(window.start), "end": str(window.end),
+        } if window else None,
+        "next_window": {"period": str(upcoming.period), "kind": upcoming.kind, "start": str(upcoming.start)},
+        "funds": items,
+    }
+
+
+@router.post("/index-constituents/refresh")
+def refresh_constituents(session: SessionDep, force: bool = Query(False)):
+    """下载持仓基金跟踪指数的成分股权重（增量），并更新相关指数基金的行业穿透"""
+    result = refresh_index_constituents(session, force=force)
+    if result["updated"] or result["industries_refreshed"]:
+        codes = [f.fund_code for f in held_index_funds(session)]
+        result["funds_changed"] = apply_index_lookthrough(codes, session)
+    return result
+
+
+@router.post("/style-inference/run")
+def run_style_inference_endpoint(session: SessionDep, force: bool = Query(False)):
+    """对缺少配置数据的持仓基金做收益率风格分析（仅净值有更新的基金会重新拟合）"""
+    return run_style_inference(session, force=force)
+
+
+@router.get("/detail")
+def get_funds_detail(
+    session: SessionDep,
+    codes: str = Query(..., description="逗号分隔的基金代码，最多 20 个"),
+    fields: str | None = Query(None, description="fund,nav_history,allocation,top_holdings 的子集，默认全部"),
+    start: datetime.date | None = Query(None),
+    end: datetime.date | None = Query(None),
+    max_points: int | None = Query(None, ge=3),
+    as_of: datetime.date | None = Query(None),
+):
+    """多只基金的详情（对比视图），各字段批量查询；某字段失败时只在 errors 中报告"""
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if not code_list or len(code_list) > _MAX_DETAIL_CODES:
+        raise HTTPException(status_code=422, detail=f"codes must list 1-{_MAX_DETAIL_CODES} funds")
+    details = _fund_details(code_list, _parse_fields(fields), session, start, end, max_points, as_of)
+    return _detail_response({"items": details}, details)
+
+
 @router.get("/{fund_code}")
 def get_fund(fund_code: str, session: SessionDep):
-    fund = session.get(Fund, fund_code)
-    if not fund:
+    info = _fund_infos([fund_code], session).get(fund_code)
+    if not info:
         raise HTTPException(status_code=404, detail="Fund not found")
+    return info
 
-    latest_nav = session.exec(
-        select(FundNavHistory)
-        .where(FundNavHistory.fund_code == fund_code)
-        .order_by(FundNavHistory.date.desc())
-        .limit(1)
-    ).first()
 
-    return {
-        **fund.model_dump(),
-        "latest_nav": latest_nav.nav if latest_nav else None,
-        "latest_nav_date": str(latest_nav.date) if latest_nav else None,
-    }
+@router.get("/{fund_code}/detail")
+def get_fund_detail(
+    fund_code: str,
+    session: SessionDep,
+    fields: str | None = Query(None, description="fund,nav_history,allocation,top_holdings 的子集，默认全部"),
+    start: datetime.date | None = Query(None),
+    end: datetime.date | None = Query(None),
+    max_points: int | None = Query(None, ge=3),
+    as_of: datetime.date | None = Query(None),
+):
+    """基金详情面板所需的全部数据，一次请求返回；某字段失败时其余字段照常返回，失败原因在 errors 中"""
+    if not session.get(Fund, fund_code):
+        raise HTTPException(status_code=404, detail="Fund not found")
+    detail = _fund_details([fund_code], _parse_fields(fields), session, start, end, max_points, as_of)[0]
+    return _detail_response(detail, [detail])
 
 
 @router.get("/{fund_code}/nav-history")
@@ -40,57 +301,106 @@ def get_nav_history(
     session: SessionDep,
     start: datetime.date | None = Query(None),
     end: datetime.date | None = Query(None),
+    format: str = Query("rows", pattern="^(rows|columns)$", description="rows: [{date, nav}]; columns: {dates, navs}"),
+    max_points: int | None = Query(None, ge=3, description="LTTB 降采样到最多 N 个点（保留峰谷）"),
 ):
-    query = select(FundNavHistory).where(FundNavHistory.fund_code == fund_code)
-    if start:
-        query = query.where(FundNavHistory.date >= start)
-    if end:
-        query = query.where(FundNavHistory.date <= end)
-    query = query.order_by(FundNavHistory.date)
-
-    records = session.exec(query).all()
-    return [{"date": str(r.date), "nav": r.nav} for r in records]
+    dates, navs = _nav_series([fund_code], session, start, end, max_points)[fund_code]
+    # Rows are already JSON-native; hand them straight to orjson (dates serialize as ISO strings)
+    if format == "columns":
+        return ORJSONResponse({"dates": dates, "navs": navs})
+    return ORJSONResponse([{"date": d, "nav": nav} for d, nav in zip(dates, navs)])
 
 
 @router.post("/{fund_code}/refresh")
-def refresh_fund(fund_code: str, session: SessionDep):
+def refresh_fund(
+    fund_code: str,
+    session: SessionDep,
+    force: bool = Query(False, description="忽略披露日历，强制重新拉取持仓配置"),
+):
     # fetch_fund_info uses the cached fund list — fast path when name exists
     fund = fetch_fund_info(fund_code, session)
 
     with Session(engine) as s:
         fetch_fund_nav(fund_code, s)
+        # A new NAV moves the growth bucket's value, so the position-drift reminder must follow
+        refresh_reminders(s, "growth_position")
     with Session(engine) as s:
-        fetch_fund_allocation(fund_code, s)
+        allocation = refresh_fund_allocation(fund_code, s, force=force)
 
-    return {"ok": True, "fund_name": fund.fund_name}
+    return {
+        "ok": True,
+        "fund_name": fund.fund_name,
+        "allocation_fetched": allocation["fetched"],
+        "allocation_changed": allocation["changed"],
+        "allocation_reason": allocation["reason"],
+        "allocation_timings_ms": allocation.get("timings_ms", {}),
+    }
 
 
 @router.get("/{fund_code}/allocation")
-def get_fund_allocation(fund_code: str, session: SessionDep):
+def get_fund_allocation(
+    fund_code: str,
+    session: SessionDep,
+    as_of: datetime.date | None = Query(None),
+):
+    return _allocation_views([fund_code], session, as_of)[fund_code]
+
+
+@router.get("/{fund_code}/allocation/history")
+def get_fund_allocation_history(fund_code: str, dimension: str, session: SessionDep):
+    """该基金某维度的全部已存季报，按报告期升序（指数成分穿透不是季报，不计入）"""
     allocations = session.exec(
-        select(FundAllocation).where(FundAllocation.fund_code == fund_code)
+        select(FundAllocation)
+        .where(FundAllocation.fund_code == fund_code)
+        .where(FundAllocation.dimension == dimension)
+        .where(FundAllocation.source != "index")
+        .order_by(FundAllocation.report_date, FundAllocation.percentage.desc())
     ).all()
-    result: dict[str, list] = {}
+    periods: dict[str | None, list] = {}
     for a in allocations:
-        if a.dimension not in result:
-            result[a.dimension] = []
-        result[a.dimension].append({
+        periods.setdefault(str(a.report_date) if a.report_date else None, []).append({
             "category": a.category,
             "percentage": a.percentage,
             "source": a.source,
         })
-    return result
+    return [{"report_date": d, "items": items} for d, items in periods.items()]
 
 
 @router.get("/{fund_code}/top-holdings")
-def get_fund_top_holdings(fund_code: str, session: SessionDep):
-    holdings = session.exec(
-        select(FundTopHolding).where(FundTopHolding.fund_code == fund_code)
-    ).all()
-    return [
-        {"stock_code": h.stock_code, "stock_name": h.stock_name, "percentage": h.percentage}
-        for h in holdings
-    ]
+def get_fund_top_holdings(
+    fund_code: str,
+    session: SessionDep,
+    as_of: datetime.date | None = Query(None),
+):
+    return _top_holding_views([fund_code], session, as_of)[fund_code]
+
+
+@router.get("/{fund_code}/index-lookthrough")
+def get_index_lookthrough(fund_code: str, session: SessionDep, limit: int | None = Query(None, ge=1)):
+    """指数基金按跟踪指数成分股权重穿透到个股与行业"""
+    fund = session.get(Fund, fund_code)
+    if not fund:
+        raise HTTPException(status_code=404, detail="Fund not found")
+    index_code = index_code_for(fund)
+    if not index_code:
+        raise HTTPException(status_code=404, detail="Fund is not tagged with a CSI index")
+    as_of = constituents_as_of([index_code], session).get(index_code)
+    _, sectors = index_sector_weights(index_code, session)
+    return {
+        "index_code": index_code,
+        "as_of": str(as_of) if as_of else None,
+        "sectors": [{"category": c, "percentage": round(p, 2)} for c, p in sectors],
+        "stocks": index_stock_weights(index_code, session, limit=limit),
+    }
+
+
+@router.get("/{fund_code}/style")
+def get_fund_style(fund_code: str, session: SessionDep):
+    """收益率风格分析结果：因子权重、拟合优度与推断的资产/地域暴露"""
+    fit = get_style_fit(fund_code, session)
+    if not fit:
+        raise HTTPException(status_code=404, detail="No style fit for this fund")
+    return fit
 
 
 @router.put("/{fund_code}/allocation")
@@ -105,6 +415,7 @@ def override_allocation(fund_code: str, data: list[dict], session: SessionDep):
             report_date=item.get("report_date"),
         ))
     session.commit()
+    publish("allocation_updated", fund_code=fund_code, source="manual")
     return {"ok": True}
 
 
@@ -119,9 +430,12 @@ def update_fund_tags(fund_code: str, data: FundTagsUpdate, session: SessionDep):
         fund.index_type = data.index_type
     if data.region is not None:
         fund.region = data.region
+    apply_fund_classification(fund)
     fund.last_updated = datetime.datetime.now()
 
     session.commit()
+    apply_index_lookthrough([fund_code], session)
     session.refresh(fund)
+    publish("fund_updated", fund_code=fund_code)
 
     return fund.model_dump()
@@ -7,6 +7,8 @@ from sqlmodel import Session, select
 from app.database import get_session
 from app.models import GrowthAllocationTarget, StrategyConfig
 from app.schemas import GrowthAllocationItem, GrowthAllocationRequest, GrowthAllocationResponse
+from app.services.classification import get_class_values
+from app.services.events import publish
 
 router = APIRouter(prefix="/api/growth", tags=["growth"])
 SessionDep = Annotated[Session, Depends(get_session)]
@@ -123,4 +125,11 @@ def update_allocation_targets(
     session.add(cfg_row)
 
     session.commit()
+    publish("config_changed", scope="growth_targets")
     return get_allocation_targets(session)
+
+
+@router.get("/class-values")
+def get_growth_class_values(session: SessionDep):
+    """按资产类别/权益子项汇总当前持仓市值（基于 Fund 上持久化的分类）。"""
+    return get_class_values(session)
@@ -5,58 +5,62 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 
 from app.database import get_session
-from app.models import Fund, FundNavHistory, Holding, HoldingChangeLog
+from app.models import Fund, Holding, HoldingChangeLog
+from app.responses import ORJSONResponse
 from app.schemas import ChangeLogResponse, HoldingCreate, HoldingResponse, HoldingUpdate, SnapshotUpdate
+from app.services.events import publish
+from app.services.reminders import refresh_reminders
+from app.services.nav_panel import latest_navs
 
 router = APIRouter(prefix="/api/holdings", tags=["holdings"])
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+def _holding_rows(holdings: list[Holding], session: Session) -> list[dict]:
+    """Holdings joined with fund tags and the latest NAV, as plain JSON-ready dicts (two queries in total)."""
+    codes = list({h.fund_code for h in holdings})
+    funds = {f.fund_code: f for f in session.exec(select(Fund).where(Fund.fund_code.in_(codes))).all()} if codes else {}
+    navs = latest_navs(codes, session)
+
+    rows = []
+    for holding in holdings:
+        fund = funds.get(holding.fund_code)
+        latest_nav, latest_nav_date = navs.get(holding.fund_code, (None, None))
+        market_value = holding.shares * latest_nav if latest_nav else None
+        total_cost = holding.shares * holding.cost_price
+        pnl = market_value - total_cost if market_value else None
+        pnl_percent = (pnl / total_cost * 100) if pnl and total_cost else None
+        rows.append({
+            "id": holding.id,
+            "fund_code": holding.fund_code,
+            "fund_name": fund.fund_name if fund else "",
+            "platform": holding.platform,
+            "shares": holding.shares,
+            "cost_price": holding.cost_price,
+            "purchase_date": holding.purchase_date,
+            "latest_nav": latest_nav,
+            "latest_nav_date": latest_nav_date,
+            "market_value": market_value,
+            "pnl": pnl,
+            "pnl_percent": pnl_percent,
+            "index_type": fund.index_type if fund else None,
+            "region": fund.region if fund else None,
+            "created_at": holding.created_at,
+            "updated_at": holding.updated_at,
+        })
+    return rows
+
+
 def _enrich_holding(holding: Holding, session: Session) -> HoldingResponse:
-    fund = session.get(Fund, holding.fund_code)
-    fund_name = fund.fund_name if fund else ""
-    index_type = fund.index_type if fund else None
-    region = fund.region if fund else None
-
-    nav_record = session.exec(
-        select(FundNavHistory)
-        .where(FundNavHistory.fund_code == holding.fund_code)
-        .order_by(FundNavHistory.date.desc())
-        .limit(1)
-    ).first()
-
-    latest_nav = nav_record.nav if nav_record else None
-    latest_nav_date = nav_record.date if nav_record else None
-    market_value = holding.shares * latest_nav if latest_nav else None
-    total_cost = holding.shares * holding.cost_price
-    pnl = market_value - total_cost if market_value else None
-    pnl_percent = (pnl / total_cost * 100) if pnl and total_cost else None
-
-    return HoldingResponse(
-        id=holding.id,
-        fund_code=holding.fund_code,
-        fund_name=fund_name,
-        platform=holding.platform,
-        shares=holding.shares,
-        cost_price=holding.cost_price,
-        purchase_date=holding.purchase_date,
-        latest_nav=latest_nav,
-        latest_nav_date=latest_nav_date,
-        market_value=market_value,
-        pnl=pnl,
-        pnl_percent=pnl_percent,
-        index_type=index_type,
-        region=region,
-        created_at=holding.created_at,
-        updated_at=holding.updated_at,
-    )
+    return HoldingResponse(**_holding_rows([holding], session)[0])
 
 
 @router.get("", response_model=list[HoldingResponse])
 def list_holdings(session: SessionDep):
+    # Rows match HoldingResponse field for field; skip per-row validation and serialize with orjson
     holdings = session.exec(select(Holding)).all()
-    return [_enrich_holding(h, session) for h in holdings]
+    return ORJSONResponse(_holding_rows(holdings, session))
 
 
 @router.post("", response_model=HoldingResponse, status_code=201)
@@ -78,6 +82,8 @@ def create_holding(data: HoldingCreate, session: SessionDep):
     session.add(holding)
     session.commit()
     session.refresh(holding)
+    refresh_reminders(session, "growth_position")
+    publish("holding_changed", action="created", holding_id=holding.id, fund_code=holding.fund_code)
     return _enrich_holding(holding, session)
 
 
@@ -95,6 +101,8 @@ def update_holding(holding_id: int, data: HoldingUpdate, session: SessionDep):
     session.add(holding)
     session.commit()
     session.refresh(holding)
+    refresh_reminders(session, "growth_position")
+    publish("holding_changed", action="updated", holding_id=holding_id, fund_code=holding.fund_code)
     return _enrich_holding(holding, session)
 
 
@@ -103,8 +111,11 @@ def delete_holding(holding_id: int, session: SessionDep):
     holding = session.get(Holding, holding_id)
     if not holding:
         raise HTTPException(status_code=404, detail="Holding not found")
+    fund_code = holding.fund_code
     session.delete(holding)
     session.commit()
+    refresh_reminders(session, "growth_position")
+    publish("holding_changed", action="deleted", holding_id=holding_id, fund_code=fund_code)
     return {"ok": True}
 
 
@@ -136,6 +147,8 @@ def update_snapshot(holding_id: int, data: SnapshotUpdate, session: SessionDep):
     session.add(holding)
     session.commit()
     session.refresh(holding)
+    refresh_reminders(session, "growth_position")
+    publish("holding_changed", action="snapshot_updated", holding_id=holding_id, fund_code=holding.fund_code)
     return _enrich_holding(holding, session)
 
 
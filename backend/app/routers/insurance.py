@@ -7,6 +7,9 @@ from sqlmodel import Session, select
 from app.database import get_session
 from app.models import InsurancePolicy
 from app.schemas import InsurancePolicyCreate, InsurancePolicyUpdate
+from app.services.events import publish
+from app.services.premiums import premium_schedule
+from app.services.reminders import refresh_reminders
 
 router = APIRouter(prefix="/api/insurance", tags=["insurance"])
 SessionDep = Annotated[Session, Depends(get_session)]
@@ -34,12 +37,20 @@ def list_policies(
     }
 
 
+@router.get("/premium-schedule")
+def get_premium_schedule(session: SessionDep, years: int = Query(10, ge=1, le=50)):
+    """生效保单未来各期保费：按月、按被保人、按年汇总（保单变更前命中缓存）"""
+    return premium_schedule(session, years)
+
+
 @router.post("", status_code=201)
 def create_policy(data: InsurancePolicyCreate, session: SessionDep):
     policy = InsurancePolicy(**data.model_dump())
     session.add(policy)
     session.commit()
     session.refresh(policy)
+    refresh_reminders(session, "insurance")
+    publish("asset_changed", bucket="insurance", action="created", id=policy.id)
     return policy
 
 
@@ -54,6 +65,8 @@ def update_policy(policy_id: int, data: InsurancePolicyUpdate, session: SessionD
     session.add(policy)
     session.commit()
     session.refresh(policy)
+    refresh_reminders(session, "insurance")
+    publish("asset_changed", bucket="insurance", action="updated", id=policy_id)
     return policy
 
 
@@ -64,6 +77,8 @@ def delete_policy(policy_id: int, session: SessionDep):
         raise HTTPException(status_code=404, detail="Insurance policy not found")
     session.delete(policy)
     session.commit()
+    refresh_reminders(session, "insurance")
+    publish("asset_changed", bucket="insurance", action="deleted", id=policy_id)
     return {"ok": True}
 
 
@@ -88,4 +103,6 @@ def renew_policy(policy_id: int, session: SessionDep):
     session.add(policy)
     session.commit()
     session.refresh(policy)
+    refresh_reminders(session, "insurance")
+    publish("asset_changed", bucket="insurance", action="renewed", id=policy_id)
     return policy
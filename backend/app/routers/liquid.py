@@ -7,6 +7,7 @@ from sqlmodel import Session, select
 from app.database import get_session
 from app.models import LiquidAsset
 from app.schemas import LiquidAssetCreate, LiquidAssetUpdate
+from app.services.events import publish
 
 router = APIRouter(prefix="/api/liquid", tags=["liquid"])
 SessionDep = Annotated[Session, Depends(get_session)]
@@ -35,6 +36,7 @@ def create_liquid_asset(data: LiquidAssetCreate, session: SessionDep):
     session.add(asset)
     session.commit()
     session.refresh(asset)
+    publish("asset_changed", bucket="liquid", action="created", id=asset.id)
     return asset
 
 
@@ -49,6 +51,7 @@ def update_liquid_asset(asset_id: int, data: LiquidAssetUpdate, session: Session
     session.add(asset)
     session.commit()
     session.refresh(asset)
+    publish("asset_changed", bucket="liquid", action="updated", id=asset_id)
     return asset
 
 
@@ -59,4 +62,5 @@ def delete_liquid_asset(asset_id: int, session: SessionDep):
         raise HTTPException(status_code=404, detail="Liquid asset not found")
     session.delete(asset)
     session.commit()
+    publish("asset_changed", bucket="liquid", action="deleted", id=asset_id)
     return {"ok": True}
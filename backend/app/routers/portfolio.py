@@ -1,13 +1,19 @@
+import json
 from datetime import date as date_type
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
 from app.database import get_session, engine
 from app.models import FundNavHistory, Holding, PortfolioSnapshot
 from app.services.allocation import get_weighted_allocation
+from app.services.downsample import downsample_rows
+from app.services.intraday import intraday_engine
+from app.services.risk import DEFAULT_LOOKBACK_DAYS, DEFAULT_SCENARIOS, compute_portfolio_risk, parse_shock_spec
 from app.services.snapshot import take_portfolio_snapshot, take_total_asset_snapshot
+from app.services.trend_rollup import load_rollups
 
 router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
 
@@ -76,8 +82,28 @@ def portfolio_by_platform(session: SessionDep):
 
 
 @router.get("/allocation")
-def portfolio_allocation(dimension: str, session: SessionDep):
-    return get_weighted_allocation(dimension, session)
+def portfolio_allocation(
+    dimension: str,
+    session: SessionDep,
+    as_of: date_type | None = Query(None, description="按该日期可见的最新季报计算（默认最新）"),
+):
+    return get_weighted_allocation(dimension, session, as_of=as_of)
+
+
+@router.get("/risk")
+def portfolio_risk(
+    session: SessionDep,
+    lookback_days: int = Query(DEFAULT_LOOKBACK_DAYS, ge=30),
+    shocks: str | None = Query(None, description="自定义冲击，如 股票/美国:-20,黄金:+10"),
+):
+    """Historical VaR/CVaR plus preset (and optional custom) stress scenarios."""
+    scenarios = list(DEFAULT_SCENARIOS)
+    if shocks:
+        try:
+            scenarios.append({"name": "自定义情景", "shocks": parse_shock_spec(shocks)})
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return compute_portfolio_risk(session, lookback_days=lookback_days, scenarios=scenarios)
 
 
 @router.post("/snapshot")
@@ -94,7 +120,13 @@ def portfolio_trend(
     session: SessionDep,
     start: date_type | None = Query(None),
     end: date_type | None = Query(None),
+    interval: str = Query("day", pattern="^(day|week|month|quarter)$", description="week/month/quarter 返回汇总"),
+    max_points: int | None = Query(None, ge=3, description="LTTB 降采样到最多 N 个点（按总市值形状）"),
 ):
+    if interval != "day":
+        # 汇总行: period/date(区间最后快照日)/open/high/low/close/period_return + 收盘快照字段
+        return downsample_rows(load_rollups("portfolio", interval, session, start, end), max_points, "total_value")
+
     query = select(PortfolioSnapshot)
     if start:
         query = query.where(PortfolioSnapshot.date >= start)
@@ -103,7 +135,7 @@ def portfolio_trend(
     query = query.order_by(PortfolioSnapshot.date)
 
     records = session.exec(query).all()
-    return [
+    rows = [
         {
             "date": str(r.date),
             "total_value": r.total_value,
@@ -112,3 +144,39 @@ def portfolio_trend(
         }
         for r in records
     ]
+    return downsample_rows(rows, max_points, "total_value")
+
+
+@router.get("/intraday")
+def portfolio_intraday(
+    refresh: bool = Query(False, description="立即重新估值，而不是返回最近一次轮询结果"),
+):
+    """盘中估算：长钱桶估算市值与当日盈亏（基于基金估值/指数行情）"""
+    snapshot = intraday_engine.snapshot()
+    if snapshot is None or refresh:
+        snapshot = intraday_engine.refresh()
+    return snapshot
+
+
+# Seconds between keep-alive comments on an idle intraday stream
+_SSE_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/intraday/stream")
+async def portfolio_intraday_stream(request: Request):
+    """Server-sent events: one ``intraday`` event per estimation cycle."""
+
+    async def events():
+        version = intraday_engine.version
+        snapshot = intraday_engine.snapshot()
+        if snapshot is not None:
+            yield f"event: intraday\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+        while not await request.is_disconnected():
+            updated = await intraday_engine.wait_for_update_async(version, _SSE_KEEPALIVE_SECONDS)
+            if not updated:
+                yield ": keep-alive\n\n"
+                continue
+            version = intraday_engine.version
+            yield f"event: intraday\ndata: {json.dumps(intraday_engine.snapshot(), ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -11,6 +11,7 @@ from app.database import get_session
 from app.models import BudgetChangeLog, PositionBudget, StrategyConfig
 from app.schemas import (
     ActiveStrategyUpdate,
+    BacktestRequest,
     BudgetChangeLogResponse,
     BudgetUpdateRequest,
     PositionStatusResponse,
@@ -18,8 +19,13 @@ from app.schemas import (
     StrategyInfoResponse,
     StrategyResultResponse,
     SuggestionItemResponse,
+    SweepRequest,
 )
+from app.services.backtest import run_backtest
+from app.services.events import publish
+from app.services.reminders import refresh_reminders
 from app.services.position import build_portfolio_context, get_or_create_budget, run_strategy
+from app.services.sweep import run_sweep
 from app.services.strategies.registry import get_strategy, list_strategies
 
 router = APIRouter(prefix="/api/position", tags=["position"])
@@ -70,6 +76,8 @@ def update_budget(data: BudgetUpdateRequest, session: SessionDep):
     session.add(budget)
     session.commit()
     session.refresh(budget)
+    refresh_reminders(session, "growth_position")
+    publish("config_changed", scope="budget")
 
     ctx = build_portfolio_context(budget, session)
     return PositionStatusResponse(
@@ -119,6 +127,7 @@ def set_active_strategy(data: ActiveStrategyUpdate, session: SessionDep):
     session.add(budget)
     session.commit()
     session.refresh(budget)
+    publish("config_changed", scope="active_strategy")
 
     ctx = build_portfolio_context(budget, session)
     return PositionStatusResponse(
@@ -166,6 +175,7 @@ def update_strategy_config(name: str, data: StrategyConfigUpdate, session: Sessi
     session.add(cfg_row)
     session.commit()
     session.refresh(cfg_row)
+    publish("config_changed", scope="strategy_config", strategy=name)
     return {"strategy_name": name, "config": json.loads(cfg_row.config_json)}
 
 
@@ -189,3 +199,41 @@ def get_suggestion(session: SessionDep):
         ],
         extra=result.metadata,
     )
+
+
+@router.post("/backtest")
+def backtest_strategy(data: BacktestRequest, session: SessionDep):
+    """Replay a strategy over historical NAVs of the current holdings."""
+    result = run_backtest(
+        session,
+        strategy_name=data.strategy_name,
+        config=data.config,
+        start=data.start,
+        end=data.end,
+        initial_capital=data.initial_capital,
+        fee_rate=data.fee_rate,
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Strategy '{data.strategy_name}' not found")
+    return result
+
+
+@router.post("/backtest/sweep")
+def sweep_strategy_configs(data: SweepRequest, session: SessionDep):
+    """Backtest a grid of strategy configs in parallel and rank the outcomes."""
+    try:
+        return run_sweep(
+            session,
+            data.strategy_name,
+            grid=data.grid,
+            configs=data.configs,
+            base_config=data.base_config,
+            start=data.start,
+            end=data.end,
+            initial_capital=data.initial_capital,
+            fee_rate=data.fee_rate,
+            rank_by=data.rank_by,
+            max_workers=data.max_workers,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -1,12 +1,15 @@
 from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 
 from app.database import get_session
 from app.models import StableAsset
 from app.schemas import StableAssetCreate, StableAssetUpdate
+from app.services.events import publish
+from app.services.ladder import stable_ladder
+from app.services.reminders import refresh_reminders
 
 router = APIRouter(prefix="/api/stable", tags=["stable"])
 SessionDep = Annotated[Session, Depends(get_session)]
@@ -29,12 +32,24 @@ def list_stable_assets(session: SessionDep):
     }
 
 
+@router.get("/ladder")
+def get_stable_ladder(
+    session: SessionDep,
+    interval: str = Query("month", pattern="^(week|month)$"),
+    horizon_months: int = Query(12, ge=1, le=120),
+):
+    """到期阶梯：未来各周/月到期的本金与利息现金流（稳钱资产变更前命中缓存）"""
+    return stable_ladder(session, interval, horizon_months)
+
+
 @router.post("", status_code=201)
 def create_stable_asset(data: StableAssetCreate, session: SessionDep):
     asset = StableAsset(**data.model_dump())
     session.add(asset)
     session.commit()
     session.refresh(asset)
+    refresh_reminders(session, "stable")
+    publish("asset_changed", bucket="stable", action="created", id=asset.id)
     return asset
 
 
@@ -49,6 +64,8 @@ def update_stable_asset(asset_id: int, data: StableAssetUpdate, session: Session
     session.add(asset)
     session.commit()
     session.refresh(asset)
+    refresh_reminders(session, "stable")
+    publish("asset_changed", bucket="stable", action="updated", id=asset_id)
     return asset
 
 
@@ -59,4 +76,6 @@ def delete_stable_asset(asset_id: int, session: SessionDep):
         raise HTTPException(status_code=404, detail="Stable asset not found")
     session.delete(asset)
     session.commit()
+    refresh_reminders(session, "stable")
+    publish("asset_changed", bucket="stable", action="deleted", id=asset_id)
     return {"ok": True}
@@ -1,10 +1,19 @@
+import datetime
+import logging
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from sqlmodel import Session, select
 
 from app.database import engine
 from app.models import Holding
-from app.services.fund_data import fetch_fund_nav
+from app.services.events import publish
+from app.services.fund_data import apply_index_lookthrough, fetch_fund_nav, refresh_fund_allocation
+from app.services.index_constituents import held_index_funds, refresh_index_constituents
+from app.services.reminders import refresh_reminders
 from app.services.snapshot import take_portfolio_snapshot, take_total_asset_snapshot
+from app.services.style_inference import run_style_inference
+
+logger = logging.getLogger(__name__)
 
 
 def _daily_update():
@@ -20,7 +29,54 @@ def _daily_update():
 
         take_portfolio_snapshot(session)
         take_total_asset_snapshot(session)
+        refresh_reminders(session, "growth_position")
+
+        try:
+            run_style_inference(session)
+        except Exception:
+            logger.exception("style inference failed")
+    publish("job_finished", job="daily_update", funds=len(fund_codes))
+
+
+def _allocation_update():
+    """Batch allocation refresh for all held funds; the planner skips funds outside disclosure windows."""
+    with Session(engine) as session:
+        fund_codes = sorted(set(session.exec(select(Holding.fund_code)).all()))
+
+    fetched = changed = 0
+    for code in fund_codes:
+        try:
+            with Session(engine) as session:
+                outcome = refresh_fund_allocation(code, session)
+        except Exception:
+            logger.exception("allocation refresh failed for %s", code)
+            continue
+        fetched += outcome["fetched"]
+        changed += outcome["changed"]
+    logger.info("allocation refresh: %d funds, %d fetched, %d changed", len(fund_codes), fetched, changed)
+    publish("job_finished", job="allocation_update", funds=len(fund_codes), fetched=fetched, changed=changed)
+
+
+def _index_constituent_update():
+    """Incremental constituent-weight refresh; indices whose weights are under a month old are skipped."""
+    with Session(engine) as session:
+        result = refresh_index_constituents(session)
+        if result["updated"] or result["industries_refreshed"]:
+            apply_index_lookthrough([f.fund_code for f in held_index_funds(session)], session)
+    logger.info("index constituents: %s", result)
+    publish("job_finished", job="index_constituent_update", updated=result["updated"])
+
+
+def _reminder_roll():
+    """Date roll: day counts, levels and texts of every reminder move with the calendar."""
+    with Session(engine) as session:
+        count = refresh_reminders(session)
+    publish("job_finished", job="reminder_roll", reminders=count)
 
 
 scheduler = BackgroundScheduler()
 scheduler.add_job(_daily_update, "cron", hour=20, minute=0)
+scheduler.add_job(_allocation_update, "cron", hour=21, minute=0)
+scheduler.add_job(_index_constituent_update, "cron", day_of_week="sat", hour=21, minute=30)
+# Also once at startup, in case the server was down over midnight
+scheduler.add_job(_reminder_roll, "cron", hour=0, minute=5, next_run_time=datetime.datetime.now())
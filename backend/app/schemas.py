@@ -1,7 +1,8 @@
+import os
 from datetime import date, datetime
 
 from pydantic import BaseModel
-from sqlmodel import SQLModel
+from sqlmodel import Field, SQLModel
 
 
 class HoldingCreate(SQLModel):
@@ -114,6 +115,29 @@ class StrategyResultResponse(SQLModel):
     extra: dict
 
 
+class BacktestRequest(SQLModel):
+    strategy_name: str | None = None
+    config: dict | None = None
+    start: date | None = None
+    end: date | None = None
+    initial_capital: float | None = None
+    fee_rate: float = 0.0
+
+
+class SweepRequest(SQLModel):
+    strategy_name: str = "asset_rebalance"
+    base_config: dict | None = None
+    # dotted config path -> candidate values, e.g. {"targets.equity.min": [60, 65]}
+    grid: dict[str, list] = {}
+    configs: list[dict] | None = None
+    start: date | None = None
+    end: date | None = None
+    initial_capital: float | None = None
+    fee_rate: float = 0.0
+    rank_by: str = "sharpe"
+    max_workers: int | None = Field(None, ge=1, le=os.cpu_count() or 1)
+
+
 # --- Liquid Asset schemas ---
 
 class LiquidAssetCreate(SQLModel):
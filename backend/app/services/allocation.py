@@ -1,67 +1,194 @@
+import datetime
+
+from sqlalchemy import and_, func, or_
 from sqlmodel import Session, select
 
-from app.models import Fund, FundAllocation, FundNavHistory, Holding
+from app.models import Fund, FundAllocation, FundTopHolding, Holding
+from app.services.fetch_misses import latest_misses
+from app.services.nav_panel import latest_navs
+
+
+# Reported categories that carry no real information (e.g. unknown QDII region);
+# returns-based inferred rows take precedence over them
+PLACEHOLDER_CATEGORIES = {"海外（其他）"}
+
+
+def latest_allocations(
+    fund_codes: list[str],
+    dimension: str,
+    session: Session,
+    as_of: datetime.date | None = None,
+) -> dict[str, list[FundAllocation]]:
+    """Return ``{fund_code: rows}`` for each fund's latest report on or before *as_of*.
+
+    Dated rows win; undated rows (benchmark geography, index fallbacks, manual
+    overrides without a date) are used only for funds with no dated report.
+    Resolved in SQL with one query over the (fund_code, dimension, report_date) index.
+    Undated ``inferred`` rows (returns-based style analysis) stand in only
+    when a fund has no other rows or only placeholder categories.
+
+    ``index`` rows (constituent lookthrough, dated with the index weight file
+    rather than a report period) are kept out of the report series: they
+    replace the reported table in the current view only, never in *as_of*
+    lookups.
+    """
+    codes = list(dict.fromkeys(fund_codes))
+    if not codes:
+        return {}
+    latest = (
+        select(FundAllocation.fund_code, func.max(FundAllocation.report_date).label("max_date"))
+        .where(FundAllocation.fund_code.in_(codes))
+        .where(FundAllocation.dimension == dimension)
+        .where(FundAllocation.source != "index")
+    )
+    if as_of:
+        latest = latest.where(FundAllocation.report_date <= as_of)
+    latest = latest.group_by(FundAllocation.fund_code).subquery()
+
+    rows = session.exec(
+        select(FundAllocation)
+        .outerjoin(latest, latest.c.fund_code == FundAllocation.fund_code)
+        .where(FundAllocation.fund_code.in_(codes))
+        .where(FundAllocation.dimension == dimension)
+        .where(FundAllocation.source != "index")
+        .where(or_(
+            FundAllocation.report_date == latest.c.max_date,
+            and_(latest.c.max_date.is_(None), FundAllocation.report_date.is_(None)),
+        ))
+    ).all()
+
+    result: dict[str, list[FundAllocation]] = {}
+    for a in rows:
+        result.setdefault(a.fund_code, []).append(a)
+    for code, allocs in result.items():
+        inferred = [a for a in allocs if a.source == "inferred"]
+        if inferred:
+            reported = [a for a in allocs if a.source != "inferred" and a.category not in PLACEHOLDER_CATEGORIES]
+            result[code] = reported or inferred
+
+    if as_of is None:
+        lookthrough: dict[str, list[FundAllocation]] = {}
+        for a in session.exec(
+            select(FundAllocation)
+            .where(FundAllocation.fund_code.in_(codes))
+            .where(FundAllocation.dimension == dimension)
+            .where(FundAllocation.source == "index")
+        ).all():
+            lookthrough.setdefault(a.fund_code, []).append(a)
+        result.update(lookthrough)
+    return result
+
 
+def latest_top_holdings(
+    fund_codes: list[str],
+    session: Session,
+    as_of: datetime.date | None = None,
+) -> dict[str, list[FundTopHolding]]:
+    """Return ``{fund_code: rows}`` for each fund's latest top-holdings report on or before *as_of*."""
+    codes = list(dict.fromkeys(fund_codes))
+    if not codes:
+        return {}
+    latest = (
+        select(FundTopHolding.fund_code, func.max(FundTopHolding.report_date).label("max_date"))
+        .where(FundTopHolding.fund_code.in_(codes))
+    )
+    if as_of:
+        latest = latest.where(FundTopHolding.report_date <= as_of)
+    latest = latest.group_by(FundTopHolding.fund_code).subquery()
 
-def get_weighted_allocation(dimension: str, session: Session) -> dict:
+    rows = session.exec(
+        select(FundTopHolding)
+        .outerjoin(latest, latest.c.fund_code == FundTopHolding.fund_code)
+        .where(FundTopHolding.fund_code.in_(codes))
+        .where(or_(
+            FundTopHolding.report_date == latest.c.max_date,
+            and_(latest.c.max_date.is_(None), FundTopHolding.report_date.is_(None)),
+        ))
+        .order_by(FundTopHolding.percentage.desc())
+    ).all()
+
+    result: dict[str, list[FundTopHolding]] = {}
+    for h in rows:
+        result.setdefault(h.fund_code, []).append(h)
+    return result
+
+
+# Allocation dimensions backed by a negative-cached akshare endpoint
+_DIMENSION_ENDPOINTS = {"sector": "sector"}
+
+
+def get_weighted_allocation(dimension: str, session: Session, as_of: datetime.date | None = None) -> dict:
     """Calculate portfolio-level allocation by weighting each fund's allocation by its market value.
 
     Returns allocation items plus coverage metadata so the frontend can show
     how much of the portfolio is actually represented in the chart.
+
+    With *as_of*, each fund uses its latest report on or before that date and
+    is weighted by current shares at the NAV on that date; holdings bought
+    after *as_of* are left out.
+
+    ``coverage.inferred_funds`` lists funds covered only by returns-based
+    style inference; ``coverage.no_data`` maps missing funds whose report lookup came back
+    empty to when that was last checked (sector dimension only).
     """
     holdings = session.exec(select(Holding)).all()
+    if as_of:
+        holdings = [h for h in holdings if h.purchase_date <= as_of]
+    all_fund_codes = sorted(set(h.fund_code for h in holdings))
 
     # Calculate each holding's market value
+    navs = latest_navs(all_fund_codes, session, as_of=as_of)
     fund_weights: dict[str, float] = {}
     total_value = 0.0
     for h in holdings:
-        nav_record = session.exec(
-            select(FundNavHistory)
-            .where(FundNavHistory.fund_code == h.fund_code)
-            .order_by(FundNavHistory.date.desc())
-            .limit(1)
-        ).first()
-        if nav_record:
-            mv = h.shares * nav_record.nav
+        if h.fund_code in navs:
+            mv = h.shares * navs[h.fund_code][0]
             fund_weights[h.fund_code] = fund_weights.get(h.fund_code, 0) + mv
             total_value += mv
 
     if total_value == 0:
         return {
+            "as_of": str(as_of) if as_of else None,
             "items": [],
+            "report_dates": {},
             "coverage": {
                 "covered_funds": 0,
-                "total_funds": len(set(h.fund_code for h in holdings)),
+                "total_funds": len(all_fund_codes),
                 "covered_value": 0,
                 "total_value": 0,
                 "covered_percent": 0,
                 "missing_funds": [],
+                "inferred_funds": [],
+                "no_data": {},
             },
         }
 
+    allocations_by_fund = latest_allocations(list(fund_weights), dimension, session, as_of=as_of)
+    fund_names = {
+        f.fund_code: f.fund_name
+        for f in session.exec(select(Fund).where(Fund.fund_code.in_(list(fund_weights)))).all()
+    }
+
     # Find which funds have data for this dimension
     covered_value = 0.0
     covered_funds: list[str] = []
     missing_funds: list[str] = []
+    inferred_funds: list[str] = []
+    report_dates: dict[str, str | None] = {}
 
     category_totals: dict[str, float] = {}
     category_funds: dict[str, list[dict]] = {}
     for fund_code, market_value in fund_weights.items():
         weight = market_value / total_value
-        allocations = session.exec(
-            select(FundAllocation)
-            .where(FundAllocation.fund_code == fund_code)
-            .where(FundAllocation.dimension == dimension)
-        ).all()
+        allocations = allocations_by_fund.get(fund_code)
         if allocations:
-            # Only use the latest report_date to avoid duplicate entries
-            latest_date = max((a.report_date for a in allocations if a.report_date), default=None)
-            if latest_date:
-                allocations = [a for a in allocations if a.report_date == latest_date]
             covered_value += market_value
             covered_funds.append(fund_code)
-            fund_record = session.get(Fund, fund_code)
-            fund_name = fund_record.fund_name if fund_record else fund_code
+            if allocations[0].source == "inferred":
+                inferred_funds.append(fund_code)
+            report_date = allocations[0].report_date
+            report_dates[fund_code] = str(report_date) if report_date else None
+            fund_name = fund_names.get(fund_code) or fund_code
             for a in allocations:
                 weighted_pct = a.percentage * weight
                 category_totals[a.category] = category_totals.get(a.category, 0) + weighted_pct
@@ -73,15 +200,19 @@ def get_weighted_allocation(dimension: str, session: Session) -> dict:
         else:
             missing_funds.append(fund_code)
 
+    no_data = {}
+    if missing_funds and dimension in _DIMENSION_ENDPOINTS:
+        no_data = latest_misses(missing_funds, _DIMENSION_ENDPOINTS[dimension], session)
+
     items = []
     for cat, pct in sorted(category_totals.items(), key=lambda x: -x[1]):
         funds = sorted(category_funds.get(cat, []), key=lambda f: -f["percentage"])
         items.append({"category": cat, "percentage": round(pct, 2), "funds": funds})
 
-    all_fund_codes = set(h.fund_code for h in holdings)
-
     return {
+        "as_of": str(as_of) if as_of else None,
         "items": items,
+        "report_dates": report_dates,
         "coverage": {
             "covered_funds": len(covered_funds),
             "total_funds": len(all_fund_codes),
@@ -89,5 +220,7 @@ def get_weighted_allocation(dimension: str, session: Session) -> dict:
             "total_value": round(total_value, 2),
             "covered_percent": round(covered_value / total_value * 100, 1) if total_value else 0,
             "missing_funds": missing_funds,
+            "inferred_funds": inferred_funds,
+            "no_data": no_data,
         },
     }
@@ -0,0 +1,315 @@
+"""Day-by-day historical replay of a RebalanceStrategy over a preloaded NAV panel."""
+
+from __future__ import annotations
+
+import datetime
+import json
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.models import Fund, Holding, StrategyConfig
+from app.services.nav_panel import NavPanel, load_nav_panel
+from app.services.position import get_or_create_budget
+from app.services.strategies.asset_rebalance import DEFAULT_CONFIG as ASSET_REBALANCE_DEFAULTS, classify_fund
+from app.services.strategies.base import PortfolioContext, RebalanceStrategy, StrategyResult
+from app.services.strategies.registry import get_strategy
+
+TRADING_DAYS_PER_YEAR = 244
+
+
+@dataclass
+class BacktestInputs:
+    """Everything a replay needs, loaded once so the loop never touches the DB."""
+
+    panel: NavPanel
+    funds: list[dict]  # one entry per panel column: fund metadata incl. asset_class / equity_sub
+    initial_weights: np.ndarray  # current market-value weights of the holdings
+    initial_position_ratio: float  # current total value / budget, in %
+    total_budget: float
+    target_position_min: float
+    target_position_max: float
+
+
+def load_backtest_inputs(
+    session: Session,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+) -> BacktestInputs:
+    """Load the NAV panel and fund metadata for the current holdings."""
+    holdings = session.exec(select(Holding)).all()
+    fund_codes = sorted({h.fund_code for h in holdings})
+    panel = load_nav_panel(fund_codes, session, start=start, end=end)
+    funds_by_code = {
+        f.fund_code: f for f in session.exec(select(Fund).where(Fund.fund_code.in_(fund_codes))).all()
+    }
+
+    funds = []
+    for code in fund_codes:
+        f = funds_by_code.get(code)
+        funds.append({
+            "fund_code": code,
+            "fund_name": f.fund_name if f else "",
+            "fund_type": f.fund_type if f else "",
+            "index_type": f.index_type if f else None,
+            "asset_class": f.asset_class if f else None,
+            "equity_sub": f.equity_sub if f else None,
+        })
+
+    shares = np.zeros(len(fund_codes))
+    index = {c: i for i, c in enumerate(fund_codes)}
+    for h in holdings:
+        shares[index[h.fund_code]] += h.shares
+    last_navs = np.zeros(len(fund_codes))
+    if panel.navs.size:
+        last_navs = np.nan_to_num(panel.navs[-1])
+    values = shares * last_navs
+    total_value = values.sum()
+    weights = values / total_value if total_value > 0 else np.full(len(fund_codes), 1 / max(len(fund_codes), 1))
+
+    budget = get_or_create_budget(session)
+    return BacktestInputs(
+        panel=panel,
+        funds=funds,
+        initial_weights=weights,
+        initial_position_ratio=min(total_value / budget.total_budget * 100, 100.0) if budget.total_budget > 0 else 100.0,
+        total_budget=budget.total_budget,
+        target_position_min=budget.target_position_min,
+        target_position_max=budget.target_position_max,
+    )
+
+
+def load_strategy_config(strategy_name: str, session: Session) -> dict:
+    cfg_row = session.exec(
+        select(StrategyConfig).where(StrategyConfig.strategy_name == strategy_name).limit(1)
+    ).first()
+    return json.loads(cfg_row.config_json) if cfg_row else {}
+
+
+def _pro_rata(amount: float, members: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Spread *amount* over the *members* mask in proportion to current value (equal if all zero)."""
+    out = np.zeros_like(values)
+    if not members.any():
+        return out
+    base = np.where(members, values, 0.0)
+    total = base.sum()
+    out[members] = amount * (base[members] / total if total > 0 else 1 / members.sum())
+    return out
+
+
+def _trades_from_result(
+    result: StrategyResult,
+    values: np.ndarray,
+    code_index: dict[str, int],
+    class_masks: dict[str, np.ndarray],
+) -> np.ndarray:
+    """Translate a StrategyResult into signed per-fund trade amounts (+buy / -sell)."""
+    all_funds = np.ones(len(values), dtype=bool)
+    trades = np.zeros_like(values)
+    for s in result.suggestions:
+        if s.action not in ("buy", "sell") or s.amount <= 0:
+            continue
+        amount = s.amount if s.action == "buy" else -s.amount
+        if s.fund_code in code_index:
+            trades[code_index[s.fund_code]] += amount
+        elif s.fund_code in class_masks:
+            trades += _pro_rata(amount, class_masks[s.fund_code], values)
+        else:
+            trades += _pro_rata(amount, all_funds, values)
+
+    # Position-only strategies (e.g. SimpleStrategy) report the trade in metadata
+    if not result.suggestions:
+        action = result.metadata.get("action")
+        if action == "buy" and result.metadata.get("gap", 0) > 0:
+            trades += _pro_rata(result.metadata["gap"], all_funds, values)
+        elif action == "sell" and result.metadata.get("excess", 0) > 0:
+            trades += _pro_rata(-result.metadata["excess"], all_funds, values)
+    return trades
+
+
+def _class_deviation(result: StrategyResult, config: dict) -> float | None:
+    """RMS distance (pp) between reported class ratios and configured targets."""
+    ratios = result.metadata.get("class_ratios")
+    if not ratios:
+        return None
+    targets = {**ASSET_REBALANCE_DEFAULTS["targets"], **config.get("targets", {})}
+    diffs = [ratios[c] - t["target"] for c, t in targets.items() if c in ratios and "target" in t]
+    return float(np.sqrt(np.mean(np.square(diffs)))) if diffs else None
+
+
+def replay(
+    inputs: BacktestInputs,
+    strategy: RebalanceStrategy,
+    config: dict,
+    initial_capital: float | None = None,
+    fee_rate: float = 0.0,
+) -> dict:
+    """Replay *strategy* over the panel and return the equity curve and summary statistics.
+
+    Trades are executed at each day's NAV. Buys are capped by available cash
+    and sells by the fund's current value; *fee_rate* is charged on traded
+    amount. The budget stays fixed at the initial capital.
+    """
+    started = time.perf_counter()
+    navs = inputs.panel.navs
+    n_funds = len(inputs.funds)
+    empty = {
+        "strategy_name": strategy.name,
+        "start": None,
+        "end": None,
+        "days": 0,
+        "equity_curve": [],
+    }
+    if navs.size == 0 or n_funds == 0:
+        return empty
+
+    # Start on the first day every fund has a NAV so initial weights are meaningful
+    complete = np.flatnonzero(~np.isnan(navs).any(axis=1))
+    if complete.size < 2:
+        return empty
+    navs = navs[complete[0]:]
+    dates = inputs.panel.dates[complete[0]:]
+
+    capital = initial_capital or inputs.total_budget or 100_000.0
+    invested = capital * inputs.initial_position_ratio / 100
+    shares = invested * inputs.initial_weights / navs[0]
+    cost_basis = invested * inputs.initial_weights
+    cash = capital - invested
+
+    code_index = {f["fund_code"]: i for i, f in enumerate(inputs.funds)}
+    classes = np.array([
+        f.get("asset_class") or classify_fund(f["fund_type"] or "", f["fund_name"] or "") for f in inputs.funds
+    ])
+    class_masks = {c: classes == c for c in ("equity", "bond", "gold")}
+    holdings = [{**f, "platform": "", "cost_price": 0.0} for f in inputs.funds]
+
+    n_days = len(dates)
+    equity = np.empty(n_days)
+    position = np.empty(n_days)
+    position_gap = np.empty(n_days)
+    class_dev: list[float] = []
+    traded = 0.0
+    fees = 0.0
+    trade_days = 0
+    py_dates = dates.astype(datetime.date)
+
+    for t in range(n_days):
+        values = shares * navs[t]
+        total_value = float(values.sum())
+        ratio = total_value / capital * 100 if capital > 0 else 0.0
+        for i, h in enumerate(holdings):
+            h["shares"] = shares[i]
+            h["market_value"] = values[i]
+            h["cost"] = cost_basis[i]
+            h["weight"] = values[i] / total_value * 100 if total_value else 0.0
+
+        ctx = PortfolioContext(
+            total_budget=capital,
+            total_value=total_value,
+            total_cost=float(cost_basis.sum()),
+            available_cash=max(cash, 0.0),
+            position_ratio=ratio,
+            target_position_min=inputs.target_position_min,
+            target_position_max=inputs.target_position_max,
+            holdings=holdings,
+            strategy_config=config,
+            as_of=py_dates[t],
+        )
+        result = strategy.evaluate(ctx, None)
+        dev = _class_deviation(result, config)
+        if dev is not None:
+            class_dev.append(dev)
+
+        trades = _trades_from_result(result, values, code_index, class_masks)
+        if trades.any():
+            sells = np.maximum(trades, -values)  # cannot sell more than held
+            sells = np.minimum(sells, 0.0)
+            buys = np.maximum(trades, 0.0)
+            proceeds = -sells.sum()
+            buy_total = buys.sum()
+            affordable = max(cash + proceeds * (1 - fee_rate), 0.0) / (1 + fee_rate)
+            if buy_total > affordable:
+                buys *= affordable / buy_total
+            executed = buys + sells
+            if np.abs(executed).sum() > 0:
+                trade_fee = np.abs(executed).sum() * fee_rate
+                held = values > 0
+                cost_basis[held] += np.where(sells[held] < 0, cost_basis[held] * sells[held] / values[held], 0.0)
+                cost_basis += buys
+                shares += executed / navs[t]
+                cash -= executed.sum() + trade_fee
+                traded += float(np.abs(executed).sum())
+                fees += trade_fee
+                trade_days += 1
+                values = shares * navs[t]
+                total_value = float(values.sum())
+                ratio = total_value / capital * 100 if capital > 0 else 0.0
+
+        equity[t] = total_value + cash
+        position[t] = ratio
+        position_gap[t] = max(inputs.target_position_min - ratio, ratio - inputs.target_position_max, 0.0)
+
+    daily = equity[1:] / equity[:-1] - 1
+    years = n_days / TRADING_DAYS_PER_YEAR
+    total_return = equity[-1] / equity[0] - 1
+    vol = float(daily.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)) if daily.size > 1 else 0.0
+    cagr = (equity[-1] / equity[0]) ** (1 / years) - 1 if years > 0 and equity[0] > 0 else 0.0
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    turnover = traded / equity.mean() if equity.mean() > 0 else 0.0
+
+    return {
+        "strategy_name": strategy.name,
+        "start": str(py_dates[0]),
+        "end": str(py_dates[-1]),
+        "days": n_days,
+        "initial_capital": round(capital, 2),
+        "final_value": round(float(equity[-1]), 2),
+        "total_return": round(float(total_return) * 100, 2),
+        "annualized_return": round(float(cagr) * 100, 2),
+        "volatility": round(vol * 100, 2),
+        "sharpe": round(float(cagr) / vol, 2) if vol > 0 else None,
+        "max_drawdown": round(float(drawdown.min()) * 100, 2),
+        "turnover": round(float(turnover) * 100, 2),
+        "annual_turnover": round(float(turnover / years) * 100, 2) if years > 0 else 0.0,
+        "trade_days": trade_days,
+        "fees": round(fees, 2),
+        "tracking": {
+            "position_gap_mean": round(float(position_gap.mean()), 2),
+            "position_gap_max": round(float(position_gap.max()), 2),
+            "days_outside_band": int((position_gap > 0).sum()),
+            "class_deviation_mean": round(float(np.mean(class_dev)), 2) if class_dev else None,
+            "class_deviation_max": round(float(np.max(class_dev)), 2) if class_dev else None,
+        },
+        "equity_curve": [
+            {"date": str(d), "value": round(float(v), 2), "position_ratio": round(float(p), 2)}
+            for d, v, p in zip(py_dates, equity, position)
+        ],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def run_backtest(
+    session: Session,
+    strategy_name: str | None = None,
+    config: dict | None = None,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    initial_capital: float | None = None,
+    fee_rate: float = 0.0,
+) -> dict | None:
+    """Backtest a registered strategy against the current holdings' NAV history.
+
+    Defaults to the active strategy and its stored config. Returns None if
+    the strategy is not registered.
+    """
+    if strategy_name is None:
+        strategy_name = get_or_create_budget(session).active_strategy
+    strategy = get_strategy(strategy_name)
+    if strategy is None:
+        return None
+    if config is None:
+        config = load_strategy_config(strategy_name, session)
+    inputs = load_backtest_inputs(session, start=start, end=end)
+    return replay(inputs, strategy, config, initial_capital=initial_capital, fee_rate=fee_rate)
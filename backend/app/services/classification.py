@@ -0,0 +1,86 @@
+"""Persisted fund classification (asset_class / equity_sub) and class-level aggregates."""
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import Fund, FundNavHistory, Holding
+from app.services.strategies.asset_rebalance import classify_equity_sub, classify_fund
+
+
+def classify_metadata(fund_type: str, fund_name: str, index_type: str | None = None) -> tuple[str, str | None]:
+    """Return ``(asset_class, equity_sub)``; equity_sub is None for non-equity funds."""
+    asset_class = classify_fund(fund_type, fund_name)
+    equity_sub = classify_equity_sub(fund_type, fund_name, index_type) if asset_class == "equity" else None
+    return asset_class, equity_sub
+
+
+def apply_fund_classification(fund: Fund) -> bool:
+    """Recompute ``fund.asset_class`` / ``fund.equity_sub``; return True if either changed.
+
+    Funds without a name or type yet (just created from a holding) are left
+    unclassified until their metadata is fetched.
+    """
+    if not fund.fund_name and not fund.fund_type:
+        return False
+    asset_class, equity_sub = classify_metadata(fund.fund_type or "", fund.fund_name or "", fund.index_type)
+    changed = (fund.asset_class, fund.equity_sub) != (asset_class, equity_sub)
+    fund.asset_class = asset_class
+    fund.equity_sub = equity_sub
+    return changed
+
+
+def backfill_fund_classification(session: Session) -> int:
+    """Classify every fund that has metadata but no stored asset_class."""
+    funds = session.exec(select(Fund).where(Fund.asset_class.is_(None))).all()
+    count = 0
+    for fund in funds:
+        if apply_fund_classification(fund):
+            session.add(fund)
+            count += 1
+    if count:
+        session.commit()
+    return count
+
+
+def get_class_values(session: Session) -> dict:
+    """Market value of current holdings grouped by stored asset_class / equity_sub.
+
+    Uses one aggregate query joining each holding to its fund's latest NAV.
+    """
+    latest = (
+        select(FundNavHistory.fund_code, func.max(FundNavHistory.date).label("max_date"))
+        .group_by(FundNavHistory.fund_code)
+        .subquery()
+    )
+    rows = session.exec(
+        select(Fund.asset_class, Fund.equity_sub, func.sum(Holding.shares * FundNavHistory.nav))
+        .select_from(Holding)
+        .join(Fund, Fund.fund_code == Holding.fund_code)
+        .join(latest, latest.c.fund_code == Holding.fund_code)
+        .join(
+            FundNavHistory,
+            (FundNavHistory.fund_code == latest.c.fund_code) & (FundNavHistory.date == latest.c.max_date),
+        )
+        .group_by(Fund.asset_class, Fund.equity_sub)
+    ).all()
+
+    asset_class: dict[str, float] = {"equity": 0.0, "bond": 0.0, "gold": 0.0}
+    equity_sub: dict[str, float] = {}
+    unclassified = 0.0
+    for cls, sub, value in rows:
+        value = value or 0.0
+        if cls is None:
+            unclassified += value
+            continue
+        asset_class[cls] = asset_class.get(cls, 0.0) + value
+        if cls == "equity":
+            equity_sub[sub or "other"] = equity_sub.get(sub or "other", 0.0) + value
+
+    total = sum(asset_class.values()) + unclassified
+    return {
+        "total_value": round(total, 2),
+        "asset_class": {k: round(v, 2) for k, v in asset_class.items()},
+        "asset_class_ratio": {k: round(v / total * 100, 2) if total else 0.0 for k, v in asset_class.items()},
+        "equity_sub": {k: round(v, 2) for k, v in equity_sub.items()},
+        "unclassified_value": round(unclassified, 2),
+    }
@@ -0,0 +1,120 @@
+"""Fund report disclosure calendar and the allocation refresh planner built on it.
+
+Public funds publish quarterly reports within 15 working days of quarter end
+(roughly the second half of January / April / July / October); the semi-annual
+and annual reports (full holdings for the Q2 / Q4 periods) follow by the end of
+August and March. Allocation data can only change inside these windows.
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DisclosureWindow:
+    period: datetime.date  # report period (quarter end) published in this window
+    start: datetime.date
+    end: datetime.date
+    kind: str  # quarterly | semiannual | annual
+
+    def contains(self, day: datetime.date) -> bool:
+        return self.start <= day <= self.end
+
+
+def windows_for_year(year: int) -> list[DisclosureWindow]:
+    """All disclosure windows whose publication falls in calendar *year*, in date order."""
+    d = datetime.date
+    return [
+        DisclosureWindow(d(year - 1, 12, 31), d(year, 1, 1), d(year, 1, 31), "quarterly"),
+        DisclosureWindow(d(year - 1, 12, 31), d(year, 3, 1), d(year, 3, 31), "annual"),
+        DisclosureWindow(d(year, 3, 31), d(year, 4, 1), d(year, 4, 30), "quarterly"),
+        DisclosureWindow(d(year, 6, 30), d(year, 7, 1), d(year, 7, 31), "quarterly"),
+        DisclosureWindow(d(year, 6, 30), d(year, 8, 1), d(year, 8, 31), "semiannual"),
+        DisclosureWindow(d(year, 9, 30), d(year, 10, 1), d(year, 10, 31), "quarterly"),
+    ]
+
+
+def current_window(today: datetime.date | None = None) -> DisclosureWindow | None:
+    today = today or datetime.date.today()
+    return next((w for w in windows_for_year(today.year) if w.contains(today)), None)
+
+
+def last_window_started(today: datetime.date | None = None) -> DisclosureWindow:
+    """The most recent window that has started on or before *today*."""
+    today = today or datetime.date.today()
+    started = [w for w in windows_for_year(today.year - 1) + windows_for_year(today.year) if w.start <= today]
+    return started[-1]
+
+
+def next_window(today: datetime.date | None = None) -> DisclosureWindow:
+    today = today or datetime.date.today()
+    return next(w for w in windows_for_year(today.year) + windows_for_year(today.year + 1) if w.start > today)
+
+
+def expected_period(today: datetime.date | None = None) -> datetime.date:
+    """Latest report period that should be (or is being) published by *today*."""
+    return last_window_started(today).period
+
+
+def no_data_expiry(today: datetime.date | None = None) -> datetime.date:
+    """Until when an empty report lookup made on *today* stays valid.
+
+    Inside an open window reports trickle in, so retry the next day; outside
+    one nothing new can appear before the next window starts.
+    """
+    today = today or datetime.date.today()
+    if current_window(today):
+        return today + datetime.timedelta(days=1)
+    return next_window(today).start
+
+
+@dataclass(frozen=True)
+class RefreshPlan:
+    fetch: bool
+    reason: str
+    years: tuple[int, ...] = ()  # report years the yearly endpoints need to be asked for
+    min_period: datetime.date | None = None  # oldest quarter worth asking the per-quarter endpoint for
+
+
+def plan_allocation_refresh(
+    allocation_period: datetime.date | None,
+    checked_at: datetime.datetime | None,
+    today: datetime.date | None = None,
+) -> RefreshPlan:
+    """Decide whether a fund's allocation data needs fetching today.
+
+    *allocation_period* is the newest report period already stored for the
+    fund and *checked_at* when it was last fetched.
+    """
+    today = today or datetime.date.today()
+    expected = expected_period(today)
+    window = current_window(today)
+    checked = checked_at.date() if checked_at else None
+
+    if allocation_period is None:
+        if checked is None:
+            return RefreshPlan(True, "never fetched", (expected.year, expected.year - 1))
+        years = (expected.year, expected.year - 1)
+    else:
+        years = tuple(range(expected.year, allocation_period.year - 1, -1))
+
+    if allocation_period is None or allocation_period < expected:
+        if window and window.period == expected:
+            if checked == today:
+                return RefreshPlan(False, f"{expected} pending, already checked today")
+            return RefreshPlan(True, f"{window.kind} window for {expected} open", years, allocation_period)
+        # Window closed without the report arriving: one catch-up check after it ends
+        last = last_window_started(today)
+        if checked is None or checked <= last.end:
+            return RefreshPlan(True, f"catch-up check for {expected}", years, allocation_period)
+        return RefreshPlan(False, f"{expected} not published, next window {next_window(today).start}")
+
+    # Up to date; semi-annual / annual reports re-publish the period with full holdings
+    if window and window.period == allocation_period and window.kind != "quarterly":
+        if checked is None or checked < window.start:
+            return RefreshPlan(
+                True, f"{window.kind} report for {allocation_period}", (allocation_period.year,), allocation_period
+            )
+    return RefreshPlan(False, f"up to date ({allocation_period}), next window {next_window(today).start}")
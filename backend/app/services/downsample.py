@@ -0,0 +1,72 @@
+"""Largest-Triangle-Three-Buckets downsampling for chart series.
+
+LTTB keeps the first and last points and, for every bucket in between, the
+point forming the largest triangle with the previously kept point and the
+average of the next bucket — so peaks, troughs and drawdowns survive while a
+multi-year daily series shrinks to a few hundred points.
+
+Bucket bounds, next-bucket averages and the triangle areas are computed with
+numpy; the only Python loop is over buckets (the kept point of bucket *i*
+anchors bucket *i + 1*), never over points.
+"""
+
+import datetime
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the points LTTB keeps when reducing ``(x, y)`` to *max_points*."""
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n - 2 interior points split into max_points - 2 buckets; edges[i]:edges[i + 1] is bucket i
+    edges = (np.arange(max_points - 1) * (n - 2) / (max_points - 2)).astype(int) + 1
+    edges[-1] = n - 1
+
+    # Average of each bucket (and of the final point, which follows the last bucket)
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_rows(rows: list[dict], max_points: int | None, value_key: str, date_key: str = "date") -> list[dict]:
+    """Downsample dict rows by the LTTB shape of ``rows[*][value_key]``; other columns follow the kept rows."""
+    if not max_points or len(rows) <= max_points:
+        return rows
+    x = _date_axis([r[date_key] for r in rows])
+    y = np.array([r[value_key] or 0.0 for r in rows], dtype=float)
+    return [rows[i] for i in lttb_indices(x, y, max_points)]
+
+
+def downsample_columns(
+    dates: list, values: list[float], max_points: int | None
+) -> tuple[list, list[float]]:
+    """Columnar variant of :func:`downsample_rows` for a single ``(dates, values)`` series."""
+    if not max_points or len(values) <= max_points:
+        return dates, values
+    idx = lttb_indices(_date_axis(dates), np.asarray(values, dtype=float), max_points)
+    return [dates[i] for i in idx], [values[i] for i in idx]
+
+
+def _date_axis(dates: list) -> np.ndarray:
+    """Day numbers for the x axis, so gaps (weekends, holidays, missed snapshots) keep their width."""
+    return np.array(
+        [(d if isinstance(d, datetime.date) else datetime.date.fromisoformat(d)).toordinal() for d in dates],
+        dtype=float,
+    )
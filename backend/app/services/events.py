@@ -0,0 +1,119 @@
+"""In-process pub/sub bus behind the ``/api/events`` server-sent-event stream.
+
+Publishers (scheduler jobs, refresh services, write routers) run on worker
+threads, so the bus is a thread-safe ring buffer of sequence-numbered events
+guarded by a condition variable; stream handlers on the event loop are woken
+through ``call_soon_threadsafe`` rather than by blocking a thread each. Subscribers remember the last id they saw
+and collect everything newer, which also lets a reconnecting client resume
+from ``Last-Event-ID`` as long as the events are still buffered.
+
+Event types:
+
+- ``nav_updated`` {fund_code, added, latest_date}
+- ``allocation_updated`` {fund_code, source}
+- ``fund_updated`` {fund_code}
+- ``holding_changed`` {action, holding_id, fund_code}
+- ``asset_changed`` {bucket, action, id}
+- ``config_changed`` {scope}
+- ``snapshot_written`` {kind, date}
+- ``job_finished`` {job, ...}
+- ``intraday_estimated`` {estimated_value, day_pnl}
+"""
+
+import asyncio
+import datetime
+import threading
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+_HISTORY = 512
+
+
+class AsyncNotifier:
+    """Wakes coroutines waiting on their own event loops when a publisher thread notifies.
+
+    Stream handlers await this instead of parking a default-executor thread
+    per connected client.
+    """
+
+    def __init__(self):
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def notify_all(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+    async def wait_for(self, predicate: Callable[[], bool], timeout: float) -> bool:
+        """Wait until *predicate* holds, up to *timeout* seconds; returns its final value."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            # Checked after registering, so a notification in between is not lost
+            if predicate():
+                return True
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return predicate()
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: dict = field(default_factory=dict)
+    at: str = ""
+
+
+class EventBus:
+    def __init__(self, history: int = _HISTORY):
+        self._events: deque[Event] = deque(maxlen=history)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._notifier = AsyncNotifier()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def oldest_id(self) -> int:
+        """Id of the oldest buffered event, or ``last_id + 1`` when the buffer is empty."""
+        with self._lock:
+            return self._events[0].id if self._events else self._last_id + 1
+
+    def publish(self, type: str, **data) -> Event:
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, type, data, datetime.datetime.now().isoformat(timespec="seconds"))
+            self._events.append(event)
+        self._notifier.notify_all()
+        return event
+
+    def since(self, last_id: int) -> list[Event]:
+        with self._lock:
+            return [e for e in self._events if e.id > last_id]
+
+    async def wait_async(self, last_id: int, timeout: float) -> list[Event]:
+        """Events newer than *last_id*, suspending on the event loop up to *timeout* seconds for the first one."""
+        await self._notifier.wait_for(lambda: self._last_id > last_id, timeout)
+        return self.since(last_id)
+
+
+bus = EventBus()
+
+
+def publish(type: str, **data) -> Event:
+    return bus.publish(type, **data)
@@ -0,0 +1,76 @@
+"""Negative cache for akshare report lookups that legitimately return no data.
+
+QDII feeders, gold ETF links and similar funds never disclose industry
+allocation or top holdings; remembering the empty answer per (fund, endpoint,
+report year) until the disclosure calendar says it could change saves two
+failing remote calls per endpoint on every refresh.
+"""
+
+import datetime
+
+from sqlmodel import Session, select
+
+from app.models import FundFetchMiss
+from app.services.disclosure import no_data_expiry
+
+
+def active_misses(fund_code: str, session: Session, now: datetime.datetime | None = None) -> set[tuple[str, str]]:
+    """``{(endpoint, period)}`` known to be empty for *fund_code* and not yet expired."""
+    now = now or datetime.datetime.now()
+    rows = session.exec(
+        select(FundFetchMiss.endpoint, FundFetchMiss.period)
+        .where(FundFetchMiss.fund_code == fund_code)
+        .where(FundFetchMiss.expires_at > now)
+    ).all()
+    return {(endpoint, period) for endpoint, period in rows}
+
+
+def record_lookups(
+    fund_code: str,
+    outcomes: dict[tuple[str, str], bool],
+    session: Session,
+    now: datetime.datetime | None = None,
+) -> None:
+    """Apply ``{(endpoint, period): has_data}`` to the cache (no commit).
+
+    Empty lookups are (re)recorded with a calendar-based expiry; lookups that
+    returned data clear any stale entry.
+    """
+    if not outcomes:
+        return
+    now = now or datetime.datetime.now()
+    expires_at = datetime.datetime.combine(no_data_expiry(now.date()), datetime.time.min)
+    existing = {
+        (m.endpoint, m.period): m
+        for m in session.exec(select(FundFetchMiss).where(FundFetchMiss.fund_code == fund_code)).all()
+    }
+    for key, has_data in outcomes.items():
+        miss = existing.get(key)
+        if has_data:
+            if miss:
+                session.delete(miss)
+            continue
+        if miss is None:
+            miss = FundFetchMiss(fund_code=fund_code, endpoint=key[0], period=key[1], checked_at=now, expires_at=now)
+        miss.checked_at = now
+        miss.expires_at = expires_at
+        session.add(miss)
+
+
+def latest_misses(fund_codes: list[str], endpoint: str, session: Session) -> dict[str, dict]:
+    """``{fund_code: {"last_checked", "retry_after"}}`` for funds with a recorded empty *endpoint* lookup."""
+    codes = list(dict.fromkeys(fund_codes))
+    if not codes:
+        return {}
+    result: dict[str, dict] = {}
+    for m in session.exec(
+        select(FundFetchMiss)
+        .where(FundFetchMiss.fund_code.in_(codes))
+        .where(FundFetchMiss.endpoint == endpoint)
+        .order_by(FundFetchMiss.checked_at)
+    ).all():
+        result[m.fund_code] = {
+            "last_checked": m.checked_at.isoformat(timespec="seconds"),
+            "retry_after": m.expires_at.isoformat(timespec="seconds"),
+        }
+    return result
@@ -1,13 +1,23 @@
 import datetime
+import functools
 import logging
 import re
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import akshare as ak
+from sqlalchemy import func, or_
 from sqlmodel import Session, select
 
 from app.models import Fund, FundAllocation, FundNavHistory, FundTopHolding
+from app.services.classification import apply_fund_classification
+from app.services.disclosure import expected_period, plan_allocation_refresh
+from app.services.events import publish
+from app.services.fetch_misses import active_misses, record_lookups
+from app.services.index_constituents import index_code_for, index_sector_weights
+from app.services.keywords import KeywordMatcher
+from app.services.strategies.asset_rebalance import _FUND_NAME_SUB_MATCHER, classify_fund
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +54,8 @@ _QDII_GEOGRAPHY_KEYWORDS: list[tuple[list[str], str]] = [
 ]
 
 # Approximate sector weights for major indices (based on public data, 2024-Q4).
-# Used as fallback when eastmoney API has no industry data for QDII/index funds.
+# Used as fallback when eastmoney API has no industry data for QDII/index funds
+# whose index has no stored constituent weights (see app.services.index_constituents).
 _INDEX_SECTOR_WEIGHTS: dict[str, list[tuple[str, float]]] = {
     "标普500": [
         ("信息技术", 32.4),
@@ -115,20 +126,19 @@ _FUND_NAME_TO_INDEX: list[tuple[list[str], str]] = [
 ]
 
 
-def _infer_geography(fund_type: str, fund_name: str) -> str:
-    """Infer geography from fund_type and fund_name (single-region fallback)."""
-    is_overseas = (
+def _is_overseas(fund_type: str, fund_name: str) -> bool:
+    return bool(fund_type) and (
         fund_type.startswith("QDII")
         or "海外" in fund_type
         or "QDII" in fund_name
     )
-    if not fund_type or not is_overseas:
+
+
+def _infer_geography(fund_type: str, fund_name: str) -> str:
+    """Infer geography from fund_type and fund_name (single-region fallback)."""
+    if not _is_overseas(fund_type, fund_name):
         return "中国"
-    for keywords, geo in _QDII_GEOGRAPHY_KEYWORDS:
-        for kw in keywords:
-            if kw in fund_name:
-                return geo
-    return "海外（其他）"
+    return _QDII_GEOGRAPHY_MATCHER.first(fund_name) or "海外（其他）"
 
 
 # Keywords in benchmark components that map to a geography.
@@ -148,19 +158,31 @@ _BENCHMARK_SKIP_KEYWORDS = [
     "存款", "利率", "中债", "国债", "债券", "票据", "货币", "现金",
 ]
 
+# Compiled once at import; see app.services.keywords
+_QDII_GEOGRAPHY_MATCHER = KeywordMatcher(_QDII_GEOGRAPHY_KEYWORDS)
+_BENCHMARK_GEO_MATCHER = KeywordMatcher(_BENCHMARK_GEO_KEYWORDS)
+_BENCHMARK_SKIP_MATCHER = KeywordMatcher([(_BENCHMARK_SKIP_KEYWORDS, "skip")])
+_FUND_NAME_INDEX_MATCHER = KeywordMatcher(_FUND_NAME_TO_INDEX)
 
-def _parse_benchmark_geography(benchmark: str) -> list[tuple[str, float]] | None:
-    """Parse benchmark string into [(geography, weight), ...].
+_BENCHMARK_SPLIT_RE = re.compile(r"[+＋]")
+_BENCHMARK_WEIGHT_RE = re.compile(r"[*×]\s*(\d+(?:\.\d+)?)\s*%")
+_BENCHMARK_BARE_WEIGHT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_benchmark_geography(benchmark: str) -> tuple[tuple[str, float], ...] | None:
+    """Parse benchmark string into ((geography, weight), ...).
 
     Returns None if parsing fails or no equity components are found.
+    Memoized by benchmark string — many funds share one, and it rarely changes.
     Example input: "沪深300指数收益率*50%+中证香港300指数收益率*30%+中债总指数收益率*20%"
-    Example output: [("中国", 62.5), ("中国香港", 37.5)]  (re-normalized after dropping bond)
+    Example output: (("中国", 62.5), ("中国香港", 37.5))  (re-normalized after dropping bond)
     """
     if not benchmark:
         return None
 
     # Split on '+' or '＋' (fullwidth)
-    parts = re.split(r"[+＋]", benchmark)
+    parts = _BENCHMARK_SPLIT_RE.split(benchmark)
 
     geo_weights: list[tuple[str, float]] = []
     for part in parts:
@@ -169,26 +191,19 @@ def _parse_benchmark_geography(benchmark: str) -> list[tuple[str, float]] | None
             continue
 
         # Skip non-equity components (cash, bonds)
-        if any(kw in part for kw in _BENCHMARK_SKIP_KEYWORDS):
+        if _BENCHMARK_SKIP_MATCHER.matches(part):
             continue
 
         # Extract percentage: look for *NN% or ×NN% or NN%
-        m = re.search(r"[*×]\s*(\d+(?:\.\d+)?)\s*%", part)
+        m = _BENCHMARK_WEIGHT_RE.search(part)
         if not m:
-            m = re.search(r"(\d+(?:\.\d+)?)\s*%", part)
+            m = _BENCHMARK_BARE_WEIGHT_RE.search(part)
         if not m:
             continue
         weight = float(m.group(1))
 
         # Match geography
-        matched_geo = None
-        for keywords, geo in _BENCHMARK_GEO_KEYWORDS:
-            for kw in keywords:
-                if kw in part:
-                    matched_geo = geo
-                    break
-            if matched_geo:
-                break
+        matched_geo = _BENCHMARK_GEO_MATCHER.first(part)
         if not matched_geo:
             continue
 
@@ -208,7 +223,54 @@ def _parse_benchmark_geography(benchmark: str) -> list[tuple[str, float]] | None
         return None
     result = [(geo, round(w / total * 100, 2)) for geo, w in merged.items()]
     result.sort(key=lambda x: -x[1])
-    return result
+    return tuple(result)
+
+
+# ---------------------------------------------------------------------------
+# Whole-universe classification, recomputed only when the fund list refreshes
+# ---------------------------------------------------------------------------
+_universe_cache: dict = {"df": None, "rows": None}
+
+
+def classify_fund_universe() -> list[dict]:
+    """Classify every fund in the cached fund list (asset_class / equity_sub / geography / index).
+
+    Lets funds be pre-tagged before they are bought; the result is cached for
+    as long as the underlying fund list DataFrame is.
+    """
+    df = _get_fund_list()
+    with _fund_list_cache_lock:
+        if _universe_cache["df"] is df:
+            return _universe_cache["rows"]
+
+    codes = df["基金代码"].astype(str).tolist()
+    names = df["基金简称"].astype(str).tolist()
+    fund_types = df["基金类型"].astype(str).tolist()
+    # One regex pass per keyword table over the whole list
+    subs = _FUND_NAME_SUB_MATCHER.first_many(names)
+    geos = _QDII_GEOGRAPHY_MATCHER.first_many(names)
+    indexes = _FUND_NAME_INDEX_MATCHER.first_many(names)
+
+    rows = []
+    for code, name, fund_type, sub, geo, index_name in zip(codes, names, fund_types, subs, geos, indexes):
+        asset_class = classify_fund(fund_type, name)
+        if _is_overseas(fund_type, name):
+            geography = geo or "海外（其他）"
+        else:
+            geography = "中国"
+        rows.append({
+            "fund_code": code,
+            "fund_name": name,
+            "fund_type": fund_type,
+            "asset_class": asset_class,
+            "equity_sub": (sub or "other") if asset_class == "equity" else None,
+            "geography": geography,
+            "index_name": index_name,
+        })
+    with _fund_list_cache_lock:
+        _universe_cache["df"] = df
+        _universe_cache["rows"] = rows
+    return rows
 
 
 def fetch_fund_info(fund_code: str, session: Session, *, force: bool = False) -> Fund:
@@ -233,6 +295,7 @@ def fetch_fund_info(fund_code: str, session: Session, *, force: bool = False) ->
             fund.fund_type = str(row.iloc[0]["基金类型"])
     except Exception:
         pass
+    apply_fund_classification(fund)
 
     fund.last_updated = datetime.datetime.now()
     session.add(fund)
@@ -241,10 +304,83 @@ def fetch_fund_info(fund_code: str, session: Session, *, force: bool = False) ->
     return fund
 
 
+# Benchmark / fees / size change rarely; re-fetch the overview at most monthly
+_OVERVIEW_TTL = datetime.timedelta(days=30)
+
+_PERCENT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*亿")
+_CN_DATE_RE = re.compile(r"(\d{4})年(\d{1,2})月(\d{1,2})日")
+
+
+def _parse_percent(value) -> float | None:
+    """'0.50%（每年）' -> 0.5; '---（每年）' -> None"""
+    m = _PERCENT_RE.search(str(value or ""))
+    return float(m.group(1)) if m else None
+
+
+def _parse_fund_size(value) -> float | None:
+    """'62.56亿元（截止至：2024年09月30日）' -> 62.56"""
+    m = _SIZE_RE.search(str(value or ""))
+    return float(m.group(1)) if m else None
+
+
+def _parse_cn_date(value) -> datetime.date | None:
+    """'2015年08月13日 / 10.37亿份' -> date(2015, 8, 13)"""
+    m = _CN_DATE_RE.search(str(value or ""))
+    if not m:
+        return None
+    try:
+        return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+
+def fetch_fund_overview(fund_code: str, session: Session, *, force: bool = False) -> Fund | None:
+    """Refresh benchmark / company / inception / size / fees on ``Fund`` from the overview page.
+
+    Skips the remote call while ``overview_updated_at`` is within ``_OVERVIEW_TTL``
+    unless *force*. Changes are added to *session*; the caller commits.
+    """
+    fund = session.get(Fund, fund_code)
+    if not fund:
+        return None
+    if not force and _overview_is_fresh(fund):
+        return fund
+
+    try:
+        df = ak.fund_overview_em(symbol=fund_code)
+    except Exception:
+        return fund
+    _apply_overview(fund, df)
+    session.add(fund)
+    return fund
+
+
+def _overview_is_fresh(fund: Fund) -> bool:
+    return bool(fund.overview_updated_at) and datetime.datetime.now() - fund.overview_updated_at < _OVERVIEW_TTL
+
+
+def _apply_overview(fund: Fund, df) -> None:
+    """Copy the fund_overview_em row onto *fund* (no-op for a missing/empty frame)."""
+    if df is None or df.empty:
+        return
+    row = df.iloc[0]
+    fund.benchmark = str(row.get("业绩比较基准", "") or "")
+    if row.get("基金管理人"):
+        fund.management_company = str(row["基金管理人"])
+    fund.inception_date = _parse_cn_date(row.get("成立日期/规模"))
+    fund.fund_size = _parse_fund_size(row.get("资产规模"))
+    fund.management_fee = _parse_percent(row.get("管理费率"))
+    fund.custodian_fee = _parse_percent(row.get("托管费率"))
+    fund.sales_service_fee = _parse_percent(row.get("销售服务费率"))
+    fund.overview_updated_at = datetime.datetime.now()
+
+
 def fetch_fund_nav(fund_code: str, session: Session) -> None:
     """Fetch historical NAV data and store in database."""
     try:
         df = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势")
+        added: list[datetime.date] = []
         for _, row in df.iterrows():
             nav_date = row["净值日期"]
             if isinstance(nav_date, str):
@@ -260,18 +396,294 @@ def fetch_fund_nav(fund_code: str, session: Session) -> None:
                     nav=float(row["单位净值"]),
                 )
                 session.add(record)
+                added.append(nav_date)
         session.commit()
     except Exception:
         session.rollback()
+        return
+    if added:
+        publish("nav_updated", fund_code=fund_code, added=len(added), latest_date=str(max(added)))
+
+
+# Upper bound on concurrent akshare calls for one fund's allocation refresh
+_ALLOCATION_FETCH_WORKERS = 6
+
+
+def fetch_fund_allocation(
+    fund_code: str,
+    session: Session,
+    *,
+    years: tuple[int, ...] | None = None,
+    min_period: datetime.date | None = None,
+    force: bool = False,
+) -> dict:
+    """Fetch asset allocation and top holdings from akshare.
+
+    The independent remote calls (asset class, overview, per-year sector and
+    top-holding reports) run concurrently; results are then persisted in one
+    transaction. *years* / *min_period* narrow the report years and quarters
+    requested (see :func:`app.services.disclosure.plan_allocation_refresh`);
+    by default the current and previous year are fetched. Per-year reports
+    known to be empty (see :mod:`app.services.fetch_misses`) are skipped
+    unless *force* is set.
+
+    Returns ``{"changed", "elapsed_ms", "timings_ms", "skipped"}`` where
+    ``changed`` is True if any stored allocation / top-holding row actually
+    changed, ``timings_ms`` is the wall time of each remote call and
+    ``skipped`` lists the lookups answered from the negative cache.
+    """
+    started = time.perf_counter()
+    current_year = datetime.date.today().year
+    years = years or (current_year, current_year - 1)
+    fund = session.get(Fund, fund_code)
 
-
-def fetch_fund_allocation(fund_code: str, session: Session) -> None:
-    """Fetch asset allocation and top holdings from akshare."""
-    _fetch_asset_class_allocation(fund_code, session)
-    _fetch_sector_allocation(fund_code, session)
-    _fetch_geography_allocation(fund_code, session)
-    _fetch_top_holdings(fund_code, session)
+    known_empty = set() if force else active_misses(fund_code, session)
+    tasks = {"asset_class": functools.partial(_download_asset_class, fund_code, min_period)}
+    skipped = []
+    for year in years:
+        for endpoint, ak_function in _YEARLY_REPORT_ENDPOINTS.items():
+            name = f"{endpoint}:{year}"
+            if (endpoint, str(year)) in known_empty:
+                skipped.append(name)
+            else:
+                tasks[name] = functools.partial(getattr(ak, ak_function), symbol=fund_code, date=str(year))
+    if fund is not None and not _overview_is_fresh(fund):
+        tasks["overview"] = functools.partial(ak.fund_overview_em, symbol=fund_code)
+    results, timings, errors = _run_concurrently(tasks)
+
+    # Persist everything in one transaction
+    changed = _store_asset_class_allocation(fund_code, results["asset_class"], session)
+    changed |= _store_sector_allocation(fund_code, [results.get(f"sector:{y}") for y in years], session)
+    if "overview" in results:
+        _apply_overview(fund, results["overview"])
+        session.add(fund)
+    changed |= _store_geography_allocation(fund_code, session)
+    changed |= _store_top_holdings(fund_code, [results.get(f"top_holdings:{y}") for y in years], session)
+    lookups = {}
+    for name in tasks:
+        endpoint, _, period = name.partition(":")
+        # Network errors say nothing about the data; only cache real empty answers
+        if endpoint in _YEARLY_REPORT_ENDPOINTS and not isinstance(errors.get(name), OSError):
+            df = results[name]
+            lookups[(endpoint, period)] = df is not None and not df.empty
+    record_lookups(fund_code, lookups, session)
+    _record_allocation_state(fund_code, session)
     session.commit()
+    if changed:
+        publish("allocation_updated", fund_code=fund_code, source="auto")
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("allocation fetch %s: %.0fms %s skipped=%s", fund_code, elapsed_ms, timings, skipped)
+    return {"changed": changed, "elapsed_ms": elapsed_ms, "timings_ms": timings, "skipped": skipped}
+
+
+# Per-year report endpoints covered by the negative cache
+_YEARLY_REPORT_ENDPOINTS = {
+    "sector": "fund_portfolio_industry_allocation_em",
+    "top_holdings": "fund_portfolio_hold_em",
+}
+
+
+def _timed_call(fn):
+    started = time.perf_counter()
+    try:
+        result, error = fn(), None
+    except Exception as e:
+        result, error = None, e
+    return result, round((time.perf_counter() - started) * 1000, 1), error
+
+
+def _run_concurrently(tasks: dict) -> tuple[dict, dict[str, float], dict[str, Exception]]:
+    """Run ``{name: callable}`` in a thread pool; failed calls yield None and an entry in the errors dict."""
+    with ThreadPoolExecutor(max_workers=min(len(tasks), _ALLOCATION_FETCH_WORKERS)) as pool:
+        futures = {name: pool.submit(_timed_call, fn) for name, fn in tasks.items()}
+        outcomes = {name: future.result() for name, future in futures.items()}
+    results = {name: result for name, (result, _, _) in outcomes.items()}
+    timings = {name: ms for name, (_, ms, _) in outcomes.items()}
+    errors = {name: error for name, (_, _, error) in outcomes.items() if error is not None}
+    return results, timings, errors
+
+
+def refresh_fund_allocation(fund_code: str, session: Session, *, force: bool = False) -> dict:
+    """Fetch allocations only when the disclosure calendar says new data can exist.
+
+    Returns ``{"fetched", "changed", "reason"}`` plus the fetch timings when
+    fetched; *force* bypasses the planner.
+    """
+    fund = session.get(Fund, fund_code)
+    if force or fund is None:
+        return {"fetched": True, "reason": "forced", **fetch_fund_allocation(fund_code, session, force=force)}
+
+    plan = plan_allocation_refresh(fund.allocation_period, fund.allocation_checked_at)
+    if not plan.fetch:
+        return {"fetched": False, "changed": False, "reason": plan.reason}
+    outcome = fetch_fund_allocation(fund_code, session, years=plan.years, min_period=plan.min_period)
+    return {"fetched": True, "reason": plan.reason, **outcome}
+
+
+def _reported_period(fund_code: str, session: Session) -> datetime.date | None:
+    """Newest report period among the fund's reported allocations and top holdings.
+
+    Only ``auto`` rows are reported data; index lookthrough rows carry the
+    weight-file date and manual / inferred rows no period at all.
+    """
+    periods = [
+        session.exec(
+            select(func.max(FundAllocation.report_date))
+            .where(FundAllocation.fund_code == fund_code)
+            .where(FundAllocation.source == "auto")
+        ).one(),
+        session.exec(select(func.max(FundTopHolding.report_date)).where(FundTopHolding.fund_code == fund_code)).one(),
+    ]
+    periods = [p for p in periods if p]
+    return max(periods) if periods else None
+
+
+def _record_allocation_state(fund_code: str, session: Session) -> None:
+    """Store the newest dated report period held for the fund and when it was checked."""
+    fund = session.get(Fund, fund_code)
+    if not fund:
+        return
+    session.flush()
+    period = _reported_period(fund_code, session)
+    if period:
+        fund.allocation_period = period
+    fund.allocation_checked_at = datetime.datetime.now()
+    session.add(fund)
+
+
+# ---------------------------------------------------------------------------
+# Diff-and-upsert writers — only real changes reach the database
+# ---------------------------------------------------------------------------
+_PERCENT_EPSILON = 1e-6
+
+
+def _sync_allocations(
+    fund_code: str,
+    dimension: str,
+    rows: list[tuple[str, float, datetime.date | None]],
+    session: Session,
+    source: str = "auto",
+) -> bool:
+    """Make the stored *source* rows of *dimension* equal *rows* ``[(category, percentage, report_date)]``.
+
+    Rows are keyed by (category, report_date): unchanged rows are left alone,
+    changed percentages are updated in place, and missing/extra rows are
+    inserted/deleted. For ``auto`` (the quarterly report history) only the
+    report dates present in *rows* (plus undated rows) are replaced, so earlier
+    quarters stay in the history; other sources keep a single current table.
+    Returns True if anything was written.
+    """
+    fetched: dict[tuple[str, datetime.date | None], float] = {}
+    for category, percentage, report_date in rows:
+        key = (category, report_date)
+        fetched[key] = fetched.get(key, 0.0) + percentage
+    dates = {d for _, d in fetched if d is not None}
+
+    query = (
+        select(FundAllocation)
+        .where(FundAllocation.fund_code == fund_code)
+        .where(FundAllocation.dimension == dimension)
+        .where(FundAllocation.source == source)
+    )
+    if source == "auto":
+        query = query.where(or_(FundAllocation.report_date.is_(None), FundAllocation.report_date.in_(dates)))
+    stored = session.exec(query).all()
+
+    changed = False
+    for record in stored:
+        key = (record.category, record.report_date)
+        if key not in fetched:
+            session.delete(record)
+            changed = True
+            continue
+        percentage = fetched.pop(key)
+        if abs(record.percentage - percentage) > _PERCENT_EPSILON:
+            record.percentage = percentage
+            session.add(record)
+            changed = True
+
+    for (category, report_date), percentage in fetched.items():
+        session.add(FundAllocation(
+            fund_code=fund_code,
+            dimension=dimension,
+            category=category,
+            percentage=percentage,
+            source=source,
+            report_date=report_date,
+        ))
+        changed = True
+    return changed
+
+
+def _sync_top_holdings(
+    fund_code: str,
+    rows: list[tuple[str, str, float, datetime.date | None]],
+    session: Session,
+) -> bool:
+    """Diff-and-upsert top holdings ``[(stock_code, stock_name, percentage, report_date)]``.
+
+    Keyed by (stock_code, report_date); like :func:`_sync_allocations` only the
+    report dates present in *rows* are replaced. Returns True if anything was written.
+    """
+    fetched = {(code, report_date): (name, percentage) for code, name, percentage, report_date in rows}
+    dates = {d for _, d in fetched if d is not None}
+    stored = session.exec(
+        select(FundTopHolding)
+        .where(FundTopHolding.fund_code == fund_code)
+        .where(or_(FundTopHolding.report_date.is_(None), FundTopHolding.report_date.in_(dates)))
+    ).all()
+
+    changed = False
+    for record in stored:
+        key = (record.stock_code, record.report_date)
+        if key not in fetched:
+            session.delete(record)
+            changed = True
+            continue
+        name, percentage = fetched.pop(key)
+        if record.stock_name != name or abs(record.percentage - percentage) > _PERCENT_EPSILON:
+            record.stock_name = name
+            record.percentage = percentage
+            session.add(record)
+            changed = True
+
+    for (code, report_date), (name, percentage) in fetched.items():
+        session.add(FundTopHolding(
+            fund_code=fund_code,
+            stock_code=code,
+            stock_name=name,
+            percentage=percentage,
+            report_date=report_date,
+        ))
+        changed = True
+    return changed
+
+
+_QUARTER_LABEL_RE = re.compile(r"(\d{4})年\s*([1-4])季度")
+_QUARTER_END = {1: (3, 31), 2: (6, 30), 3: (9, 30), 4: (12, 31)}
+
+
+def _parse_quarter_label(label) -> datetime.date | None:
+    """'2024年3季度股票投资明细' -> date(2024, 9, 30)"""
+    m = _QUARTER_LABEL_RE.search(str(label or ""))
+    if not m:
+        return None
+    month, day = _QUARTER_END[int(m.group(2))]
+    return datetime.date(int(m.group(1)), month, day)
+
+
+def _parse_report_date(value) -> datetime.date | None:
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
 
 
 def _recent_quarter_dates() -> list[str]:
@@ -289,220 +701,216 @@ def _recent_quarter_dates() -> list[str]:
 
 
 _GOLD_FUND_KEYWORDS = ["黄金", "Gold", "gold", "AU", "贵金属"]
+_GOLD_FUND_MATCHER = KeywordMatcher([(_GOLD_FUND_KEYWORDS, "gold")])
 
 
 def _is_gold_fund(fund_code: str, session: Session) -> bool:
     fund = session.get(Fund, fund_code)
     if not fund:
         return False
-    name = fund.fund_name or ""
-    return any(kw in name for kw in _GOLD_FUND_KEYWORDS)
+    return _GOLD_FUND_MATCHER.matches(fund.fund_name)
 
 
-def _fetch_asset_class_allocation(fund_code: str, session: Session) -> None:
-    """Fetch asset class allocation (股票/债券/现金/其他) from xueqiu."""
-    try:
-        df = ak.fund_individual_detail_hold_xq(symbol=fund_code)
-        if df.empty:
-            return
+def _previous_quarter_end(period: datetime.date) -> datetime.date:
+    quarter = (period.month - 1) // 3
+    if quarter == 0:
+        return datetime.date(period.year - 1, 12, 31)
+    month, day = _QUARTER_END[quarter]
+    return datetime.date(period.year, month, day)
 
-        # Clear old auto records for asset_class
-        old = session.exec(
-            select(FundAllocation)
-            .where(FundAllocation.fund_code == fund_code)
-            .where(FundAllocation.dimension == "asset_class")
-            .where(FundAllocation.source == "auto")
-        ).all()
-        for o in old:
-            session.delete(o)
 
-        is_gold = _is_gold_fund(fund_code, session)
-        for _, row in df.iterrows():
-            category = str(row["资产类型"])
-            # 黄金ETF的底层资产在雪球被标记为"其他"，修正为"黄金"
-            if is_gold and category == "其他":
-                category = "黄金"
-            session.add(FundAllocation(
-                fund_code=fund_code,
-                dimension="asset_class",
-                category=category,
-                percentage=float(row["仓位占比"]),
-                source="auto",
-            ))
-    except Exception:
-        pass
+# The expected period, then the one before it (still the latest while the expected one trickles in)
+_ASSET_CLASS_PROBES = 2
+
+
+def _download_asset_class(fund_code: str, min_period: datetime.date | None = None):
+    """Return ``(report_date, df)`` for the latest quarter xueqiu has asset-class data for, else None.
+
+    Asks for the period the disclosure calendar expects first and only falls
+    back to the quarter before it when that is empty — one round trip in the
+    usual case, two at most. Quarters older than *min_period* are not requested.
+    """
+    period = expected_period()
+    for _ in range(_ASSET_CLASS_PROBES):
+        if min_period and period < min_period:
+            break
+        try:
+            df = ak.fund_individual_detail_hold_xq(symbol=fund_code, date=period.strftime("%Y%m%d"))
+        except Exception:
+            df = None
+        if df is not None and not df.empty:
+            return period, df
+        period = _previous_quarter_end(period)
+    return None
+
+
+def _store_asset_class_allocation(fund_code: str, downloaded, session: Session) -> bool:
+    """Store asset class allocation (股票/债券/现金/其他) from :func:`_download_asset_class`."""
+    if downloaded is None:
+        return False
+    report_date, df = downloaded
+    is_gold = _is_gold_fund(fund_code, session)
+    rows = []
+    for _, row in df.iterrows():
+        category = str(row["资产类型"])
+        # 黄金ETF的底层资产在雪球被标记为"其他"，修正为"黄金"
+        if is_gold and category == "其他":
+            category = "黄金"
+        rows.append((category, float(row["仓位占比"]), report_date))
+    return _sync_allocations(fund_code, "asset_class", rows, session)
 
 
 def _match_index_name(fund_name: str) -> str | None:
     """Return the index key if the fund name matches a known index, else None."""
-    for keywords, index_name in _FUND_NAME_TO_INDEX:
-        for kw in keywords:
-            if kw in fund_name:
-                return index_name
-    return None
+    return _FUND_NAME_INDEX_MATCHER.first(fund_name)
 
 
-def _apply_index_sector_fallback(fund_code: str, index_name: str, session: Session) -> None:
+def _apply_index_sector_fallback(fund_code: str, index_name: str, session: Session) -> bool:
     """Write pre-defined index sector weights as fallback allocation data."""
     weights = _INDEX_SECTOR_WEIGHTS.get(index_name)
     if not weights:
-        return
+        return False
+    rows = [(category, percentage, None) for category, percentage in weights]
+    return _sync_allocations(fund_code, "sector", rows, session)
 
-    # Clear old auto records for sector
-    old = session.exec(
-        select(FundAllocation)
-        .where(FundAllocation.fund_code == fund_code)
-        .where(FundAllocation.dimension == "sector")
-        .where(FundAllocation.source == "auto")
-    ).all()
-    for o in old:
-        session.delete(o)
 
-    for category, percentage in weights:
-        session.add(FundAllocation(
-            fund_code=fund_code,
-            dimension="sector",
-            category=category,
-            percentage=percentage,
-            source="auto",
-        ))
+def _store_index_lookthrough(fund_code: str, session: Session) -> bool | None:
+    """Sector allocation from the tracked index's stored constituent weights; None if there are none.
+
+    Stored as ``source="index"`` rows dated with the weight file, outside the
+    quarterly report history (see :func:`app.services.allocation.latest_allocations`).
+    """
+    index_code = index_code_for(session.get(Fund, fund_code))
+    if not index_code:
+        return None
+    as_of, weights = index_sector_weights(index_code, session)
+    if not weights:
+        return None
+    rows = [(c, pct, as_of) for c, pct in weights]
+    return _sync_allocations(fund_code, "sector", rows, session, source="index")
 
 
-def _fetch_sector_allocation(fund_code: str, session: Session) -> None:
-    """Fetch sector/industry allocation."""
-    current_year = str(datetime.date.today().year)
-    prev_year = str(datetime.date.today().year - 1)
+def apply_index_lookthrough(fund_codes: list[str], session: Session) -> int:
+    """Re-derive sector allocation of tagged index funds from current constituents; returns funds changed. Commits."""
+    changed = [code for code in dict.fromkeys(fund_codes) if _store_index_lookthrough(code, session)]
+    session.commit()
+    for code in changed:
+        publish("allocation_updated", fund_code=code, source="index")
+    return len(changed)
+
+
+def repair_index_lookthrough(session: Session) -> int:
+    """Move lookthrough sector rows written before they had their own source out of the report history.
+
+    Such rows are ``auto`` sector rows of index-tagged funds dated off the
+    quarter ends, or past every asset-class / top-holding report. They are
+    dropped, the lookthrough is re-derived as ``index`` rows and the fund's
+    report period recomputed. Returns the number of funds repaired. Commits.
+    """
+    repaired = 0
+    for fund in session.exec(select(Fund).where(Fund.index_type.is_not(None))).all():
+        if not index_code_for(fund):
+            continue
+        reported = [
+            session.exec(
+                select(func.max(FundAllocation.report_date))
+                .where(FundAllocation.fund_code == fund.fund_code)
+                .where(FundAllocation.dimension == "asset_class")
+                .where(FundAllocation.source == "auto")
+            ).one(),
+            session.exec(
+                select(func.max(FundTopHolding.report_date)).where(FundTopHolding.fund_code == fund.fund_code)
+            ).one(),
+        ]
+        latest_report = max((d for d in reported if d), default=None)
+        stale = [
+            a for a in session.exec(
+                select(FundAllocation)
+                .where(FundAllocation.fund_code == fund.fund_code)
+                .where(FundAllocation.dimension == "sector")
+                .where(FundAllocation.source == "auto")
+                .where(FundAllocation.report_date.is_not(None))
+            ).all()
+            if (a.report_date.month, a.report_date.day) not in _QUARTER_END.values()
+            or (latest_report is not None and a.report_date > latest_report)
+        ]
+        if not stale:
+            continue
+        for a in stale:
+            session.delete(a)
+        session.flush()
+        _store_index_lookthrough(fund.fund_code, session)
+        fund.allocation_period = _reported_period(fund.fund_code, session)
+        session.add(fund)
+        repaired += 1
+    session.commit()
+    return repaired
+
+
+def _store_sector_allocation(fund_code: str, frames: list, session: Session) -> bool:
+    """Store sector/industry allocation for every quarter in the per-year report *frames*.
+
+    Index funds whose index has stored constituent weights also get the exact
+    lookthrough, which current views prefer over the (coarser) reported
+    industries; the reported quarters are kept as the fund's history.
+    """
+    lookthrough = _store_index_lookthrough(fund_code, session)
+
     fetched = False
-    try:
-        for year in [current_year, prev_year]:
-            try:
-                df = ak.fund_portfolio_industry_allocation_em(symbol=fund_code, date=year)
-                if not df.empty:
-                    # Clear old auto records
-                    old = session.exec(
-                        select(FundAllocation)
-                        .where(FundAllocation.fund_code == fund_code)
-                        .where(FundAllocation.dimension == "sector")
-                        .where(FundAllocation.source == "auto")
-                    ).all()
-                    for o in old:
-                        session.delete(o)
-
-                    # Only keep the latest quarter's data (df is sorted by date descending)
-                    latest_date = df.iloc[0]["截止时间"] if "截止时间" in df.columns else None
-                    if latest_date is not None:
-                        recent = df[df["截止时间"] == latest_date]
-                    else:
-                        recent = df
-
-                    for _, row in recent.iterrows():
-                        report_date_str = str(row.get("截止时间", ""))
-                        report_date_val = None
-                        if report_date_str:
-                            try:
-                                report_date_val = datetime.date.fromisoformat(report_date_str)
-                            except ValueError:
-                                pass
-                        session.add(FundAllocation(
-                            fund_code=fund_code,
-                            dimension="sector",
-                            category=str(row["行业类别"]),
-                            percentage=float(row["占净值比例"]),
-                            source="auto",
-                            report_date=report_date_val,
-                        ))
-                    fetched = True
-                    break
-            except Exception:
-                continue
-    except Exception:
-        pass
+    changed = bool(lookthrough)
+    for df in frames:
+        if df is None or df.empty:
+            continue
+        rows = [
+            (str(row["行业类别"]), float(row["占净值比例"]), _parse_report_date(row.get("截止时间")))
+            for _, row in df.iterrows()
+        ]
+        changed |= _sync_allocations(fund_code, "sector", rows, session)
+        fetched = True
 
     # Fallback: use pre-defined index sector weights for known QDII/index funds
-    if not fetched:
+    if not fetched and lookthrough is None:
         fund = session.get(Fund, fund_code)
         if fund and fund.fund_name:
             index_name = _match_index_name(fund.fund_name)
             if index_name:
-                _apply_index_sector_fallback(fund_code, index_name, session)
+                changed = _apply_index_sector_fallback(fund_code, index_name, session)
+    return changed
 
 
-def _fetch_geography_allocation(fund_code: str, session: Session) -> None:
-    """Infer geography allocation from benchmark or fund metadata."""
+def _store_geography_allocation(fund_code: str, session: Session) -> bool:
+    """Infer geography allocation from the stored benchmark or fund metadata."""
     fund = session.get(Fund, fund_code)
     if not fund:
-        return
-
-    # Clear old auto records for geography
-    old = session.exec(
-        select(FundAllocation)
-        .where(FundAllocation.fund_code == fund_code)
-        .where(FundAllocation.dimension == "geography")
-        .where(FundAllocation.source == "auto")
-    ).all()
-    for o in old:
-        session.delete(o)
+        return False
 
-    # Try parsing benchmark from akshare first
-    geo_splits = None
-    try:
-        df = ak.fund_overview_em(symbol=fund_code)
-        if not df.empty:
-            benchmark = str(df.iloc[0].get("业绩比较基准", ""))
-            geo_splits = _parse_benchmark_geography(benchmark)
-    except Exception:
-        pass
+    geo_splits = _parse_benchmark_geography(fund.benchmark)
 
     if geo_splits:
-        for geo, pct in geo_splits:
-            session.add(FundAllocation(
-                fund_code=fund_code,
-                dimension="geography",
-                category=geo,
-                percentage=pct,
-                source="auto",
-            ))
+        rows = [(geo, pct, None) for geo, pct in geo_splits]
     else:
         # Fallback: single-region inference from fund type/name
         geography = _infer_geography(fund.fund_type or "", fund.fund_name or "")
-        session.add(FundAllocation(
-            fund_code=fund_code,
-            dimension="geography",
-            category=geography,
-            percentage=100.0,
-            source="auto",
-        ))
+        rows = [(geography, 100.0, None)]
+    return _sync_allocations(fund_code, "geography", rows, session)
 
 
-def _fetch_top_holdings(fund_code: str, session: Session) -> None:
-    """Fetch top stock holdings."""
-    current_year = str(datetime.date.today().year)
-    prev_year = str(datetime.date.today().year - 1)
-    try:
-        for year in [current_year, prev_year]:
-            try:
-                df = ak.fund_portfolio_hold_em(symbol=fund_code, date=year)
-                if not df.empty:
-                    # Clear old records
-                    old = session.exec(
-                        select(FundTopHolding).where(FundTopHolding.fund_code == fund_code)
-                    ).all()
-                    for o in old:
-                        session.delete(o)
-
-                    # Only save top 10 from the most recent quarter
-                    latest_quarter = df.iloc[0]["季度"] if "季度" in df.columns else ""
-                    recent = df[df["季度"] == latest_quarter].head(10) if latest_quarter else df.head(10)
-
-                    for _, row in recent.iterrows():
-                        session.add(FundTopHolding(
-                            fund_code=fund_code,
-                            stock_code=str(row["股票代码"]),
-                            stock_name=str(row["股票名称"]),
-                            percentage=float(row["占净值比例"]),
-                        ))
-                    break
-            except Exception:
-                continue
-    except Exception:
-        pass
+def _store_top_holdings(fund_code: str, frames: list, session: Session) -> bool:
+    """Store the top-10 stock holdings of every quarter in the per-year report *frames*."""
+    changed = False
+    for df in frames:
+        if df is None or df.empty:
+            continue
+        # Top 10 of each quarter (rows are ordered by weight within a quarter)
+        recent = df.groupby("季度", sort=False).head(10) if "季度" in df.columns else df.head(10)
+        rows = [
+            (
+                str(row["股票代码"]),
+                str(row["股票名称"]),
+                float(row["占净值比例"]),
+                _parse_quarter_label(row.get("季度")),
+            )
+            for _, row in recent.iterrows()
+        ]
+        changed |= _sync_top_holdings(fund_code, rows, session)
+    return changed
@@ -0,0 +1,119 @@
+"""Per-table data generation counters, bumped whenever a commit writes to a table.
+
+Each table has a row in ``data_generations`` that SQLite triggers increment on
+every insert, update and delete (see :func:`install_triggers`), so writes from
+any process sharing the database — the API, the MCP server, scripts — and raw
+SQL are all counted. Readers combine the generations of the tables they
+depend on into a cache key — the HTTP ETag middleware does exactly that.
+
+Reads stay cheap: a dedicated read-only connection polls ``PRAGMA
+data_version``, which changes only when some other connection commits, and
+re-reads the generations table only then. ``BOOT_ID`` additionally changes
+keys across restarts (code or configuration may have changed).
+"""
+
+import functools
+import sqlite3
+import threading
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+GENERATIONS_TABLE = "data_generations"
+
+_lock = threading.Lock()
+_probe: sqlite3.Connection | None = None
+_data_version: int | None = None
+_generations: dict[str, int] = {}
+_total = 0
+
+
+def install_triggers(engine: Engine) -> None:
+    """Seed a generations row and create insert/update/delete triggers for every other table. Idempotent."""
+    with engine.begin() as conn:
+        tables = [
+            row[0] for row in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            ))
+            if row[0] != GENERATIONS_TABLE
+        ]
+        for table in tables:
+            conn.execute(
+                text(f"INSERT OR IGNORE INTO {GENERATIONS_TABLE} (table_name, generation) VALUES (:t, 0)"),
+                {"t": table},
+            )
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS gen_{table}_{op.lower()} AFTER {op} ON {table} BEGIN "
+                    f"UPDATE {GENERATIONS_TABLE} SET generation = generation + 1 WHERE table_name = '{table}'; END"
+                ))
+
+
+def _sync() -> None:
+    """Reload the generations if anything was committed since the last read; call with ``_lock`` held."""
+    global _probe, _data_version, _generations, _total
+    if _probe is None:
+        from app.database import engine
+
+        _probe = sqlite3.connect(engine.url.database, check_same_thread=False, timeout=30)
+    version = _probe.execute("PRAGMA data_version").fetchone()[0]
+    if version == _data_version:
+        return
+    try:
+        rows = _probe.execute(f"SELECT table_name, generation FROM {GENERATIONS_TABLE}").fetchall()
+    except sqlite3.OperationalError:  # table not created yet
+        return
+    _data_version = version
+    _generations = dict(rows)
+    _total = sum(_generations.values())
+
+
+def generation(tables: frozenset[str] | set[str] | None = None) -> tuple[int, ...]:
+    """Current generations of *tables* (sorted by name); ``None`` means any table."""
+    with _lock:
+        _sync()
+        if tables is None:
+            return (_total,)
+        return tuple(_generations.get(t, 0) for t in sorted(tables))
+
+
+def snapshot() -> dict[str, int]:
+    with _lock:
+        _sync()
+        return dict(_generations)
+
+
+def generation_cache(*tables: str, maxsize: int = 64):
+    """Memoize ``fn(session, *args)`` until one of *tables* changes.
+
+    The session is not part of the key; everything else must be hashable
+    (pass dates like "today" explicitly). Writes from any process invalidate it.
+    """
+    watched = frozenset(tables)
+
+    def decorator(fn):
+        cache: dict = {}
+        cache_lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(session, *args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            current = generation(watched)
+            with cache_lock:
+                hit = cache.get(key)
+                if hit and hit[0] == current:
+                    return hit[1]
+            value = fn(session, *args, **kwargs)
+            with cache_lock:
+                if len(cache) >= maxsize:
+                    cache.clear()
+                cache[key] = (current, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
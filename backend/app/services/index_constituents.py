@@ -0,0 +1,233 @@
+"""Index constituent weights and stock industries for exact index-fund lookthrough.
+
+Constituent weights come from the China Securities Index monthly weight files
+(``index_stock_cons_weight_csindex``); stock industries from the eastmoney
+industry boards. Both are cached locally and refreshed incrementally: an
+index is re-downloaded only once its weights are a month old, and the
+industry map only when a constituent is missing from it or it has gone stale.
+"""
+
+import datetime
+import logging
+
+import akshare as ak
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import Fund, Holding, IndexConstituent, StockIndustry
+
+logger = logging.getLogger(__name__)
+
+# Fund.index_type tag -> CSI index code. Indices not published by CSI
+# (Hang Seng family, S&P, Nasdaq, SZSE-only) have no weight file here and
+# keep using the static sector table in fund_data.
+INDEX_TYPE_TO_CSINDEX: dict[str, str] = {
+    "csi300": "000300",
+    "csi500": "000905",
+    "csi1000": "000852",
+    "上证50": "000016",
+    "科创50": "000688",
+    "中证800": "000906",
+    "中证红利": "000922",
+    "上证红利": "000015",
+    "红利低波": "H30269",
+    "中证消费": "000932",
+    "主要消费": "000932",
+    "可选消费": "000989",
+    "上证消费": "000036",
+}
+
+_WEIGHTS_TTL = datetime.timedelta(days=30)
+_INDUSTRY_TTL = datetime.timedelta(days=90)
+_PERCENT_EPSILON = 1e-6
+
+
+def index_code_for(fund: Fund | None) -> str | None:
+    """CSI index code tracked by *fund* according to its ``index_type`` tag."""
+    if fund is None or not fund.index_type:
+        return None
+    return INDEX_TYPE_TO_CSINDEX.get(fund.index_type)
+
+
+def held_index_funds(session: Session) -> list[Fund]:
+    """Held funds whose ``index_type`` maps to a CSI index."""
+    funds = session.exec(
+        select(Fund)
+        .where(Fund.fund_code.in_(select(Holding.fund_code)))
+        .where(Fund.index_type.in_(list(INDEX_TYPE_TO_CSINDEX)))
+    ).all()
+    return list(funds)
+
+
+def tracked_index_codes(session: Session) -> list[str]:
+    """CSI index codes tracked by currently held funds."""
+    return sorted({index_code_for(f) for f in held_index_funds(session)})
+
+
+def constituents_as_of(index_codes: list[str], session: Session) -> dict[str, datetime.date]:
+    """``{index_code: weight date}`` for indices with stored constituents."""
+    if not index_codes:
+        return {}
+    rows = session.exec(
+        select(IndexConstituent.index_code, func.max(IndexConstituent.as_of))
+        .where(IndexConstituent.index_code.in_(index_codes))
+        .group_by(IndexConstituent.index_code)
+    ).all()
+    return dict(rows)
+
+
+def refresh_index_constituents(
+    session: Session,
+    index_codes: list[str] | None = None,
+    *,
+    force: bool = False,
+) -> dict:
+    """Download weights for stale indices (default: those held funds track), then fill missing industries.
+
+    Returns ``{"updated": [index codes whose weights changed], "skipped", "failed",
+    "industries_refreshed"}``. Commits.
+    """
+    codes = index_codes if index_codes is not None else tracked_index_codes(session)
+    stored = constituents_as_of(codes, session)
+    today = datetime.date.today()
+    updated, skipped, failed = [], [], []
+    for code in codes:
+        if not force and code in stored and today - stored[code] < _WEIGHTS_TTL:
+            skipped.append(code)
+            continue
+        try:
+            df = ak.index_stock_cons_weight_csindex(symbol=code)
+        except Exception:
+            logger.exception("index weights download failed for %s", code)
+            failed.append(code)
+            continue
+        if df.empty:
+            failed.append(code)
+            continue
+        rows = [
+            (str(row["成分券代码"]).zfill(6), str(row["成分券名称"]), float(row["权重"]), _parse_weight_date(row["日期"]))
+            for _, row in df.iterrows()
+        ]
+        if _sync_constituents(code, rows, session):
+            updated.append(code)
+    industries_refreshed = _refresh_stock_industries(session, force=force)
+    session.commit()
+    return {"updated": updated, "skipped": skipped, "failed": failed, "industries_refreshed": industries_refreshed}
+
+
+def _parse_weight_date(value) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value)[:10].replace("-", ""), "%Y%m%d").date()
+
+
+def _sync_constituents(
+    index_code: str,
+    rows: list[tuple[str, str, float, datetime.date]],
+    session: Session,
+) -> bool:
+    """Make the stored constituents of *index_code* equal *rows*; return True if anything was written."""
+    fetched = {stock_code: (name, weight, as_of) for stock_code, name, weight, as_of in rows}
+    changed = False
+    for record in session.exec(select(IndexConstituent).where(IndexConstituent.index_code == index_code)).all():
+        if record.stock_code not in fetched:
+            session.delete(record)
+            changed = True
+            continue
+        name, weight, as_of = fetched.pop(record.stock_code)
+        if abs(record.weight - weight) > _PERCENT_EPSILON or record.as_of != as_of or record.stock_name != name:
+            record.stock_name, record.weight, record.as_of = name, weight, as_of
+            session.add(record)
+            changed = True
+    for stock_code, (name, weight, as_of) in fetched.items():
+        session.add(IndexConstituent(
+            index_code=index_code, stock_code=stock_code, stock_name=name, weight=weight, as_of=as_of,
+        ))
+        changed = True
+    return changed
+
+
+def _refresh_stock_industries(session: Session, *, force: bool = False) -> bool:
+    """Rebuild the stock -> industry map if a constituent is unmapped or the map is stale.
+
+    One board list plus one constituent list per industry board (~90 calls)
+    covers the whole market, which is cheaper than per-stock lookups.
+    """
+    session.flush()
+    unmapped = session.exec(
+        select(func.count(IndexConstituent.stock_code.distinct()))
+        .where(IndexConstituent.stock_code.not_in(select(StockIndustry.stock_code)))
+    ).one()
+    oldest = session.exec(select(func.min(StockIndustry.updated_at))).one()
+    stale = oldest is None or datetime.datetime.now() - oldest > _INDUSTRY_TTL
+    if not force and not unmapped and not stale:
+        return False
+
+    try:
+        boards = ak.stock_board_industry_name_em()
+    except Exception:
+        logger.exception("industry board list download failed")
+        return False
+    mapping: dict[str, str] = {}
+    for board in boards["板块名称"]:
+        try:
+            cons = ak.stock_board_industry_cons_em(symbol=board)
+        except Exception:
+            continue
+        for stock_code in cons["代码"]:
+            mapping.setdefault(str(stock_code).zfill(6), str(board))
+    if not mapping:
+        return False
+
+    # Constituents on no board are recorded too, so they don't force a rebuild on every run
+    for stock_code in session.exec(select(IndexConstituent.stock_code).distinct()).all():
+        mapping.setdefault(stock_code, "其他")
+
+    now = datetime.datetime.now()
+    stored = {s.stock_code: s for s in session.exec(select(StockIndustry)).all()}
+    for stock_code, industry in mapping.items():
+        record = stored.get(stock_code) or StockIndustry(stock_code=stock_code, industry=industry)
+        record.industry = industry
+        record.updated_at = now
+        session.add(record)
+    return True
+
+
+def index_sector_weights(index_code: str, session: Session) -> tuple[datetime.date | None, list[tuple[str, float]]]:
+    """``(weight date, [(industry, weight %)])`` aggregated from stored constituents, largest first.
+
+    Constituents without a known industry are grouped under "其他".
+    """
+    rows = session.exec(
+        select(StockIndustry.industry, func.sum(IndexConstituent.weight), func.max(IndexConstituent.as_of))
+        .select_from(IndexConstituent)
+        .outerjoin(StockIndustry, StockIndustry.stock_code == IndexConstituent.stock_code)
+        .where(IndexConstituent.index_code == index_code)
+        .group_by(StockIndustry.industry)
+    ).all()
+    if not rows:
+        return None, []
+    as_of = max(d for _, _, d in rows)
+    totals: dict[str, float] = {}
+    for industry, weight, _ in rows:
+        key = industry or "其他"
+        totals[key] = totals.get(key, 0.0) + weight
+    return as_of, sorted(totals.items(), key=lambda x: -x[1])
+
+
+def index_stock_weights(index_code: str, session: Session, limit: int | None = None) -> list[dict]:
+    """Stock-level constituents of *index_code* with industries, largest weight first."""
+    query = (
+        select(IndexConstituent, StockIndustry.industry)
+        .outerjoin(StockIndustry, StockIndustry.stock_code == IndexConstituent.stock_code)
+        .where(IndexConstituent.index_code == index_code)
+        .order_by(IndexConstituent.weight.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return [
+        {"stock_code": c.stock_code, "stock_name": c.stock_name, "weight": c.weight, "industry": industry}
+        for c, industry in session.exec(query).all()
+    ]
@@ -0,0 +1,258 @@
+"""Intraday estimated valuation of the growth bucket.
+
+Official NAVs land after 20:00; during market hours a background thread polls
+eastmoney's fund NAV estimates (估值, one request for the whole market per
+cycle) and, for index funds without an estimate, the quote of the index mapped
+by ``Fund.index_type``. Exchange holidays are skipped using sina's trading
+calendar, loaded once a day. The estimated growth-bucket value and daily P&L are
+kept in memory and published to REST / server-sent-event readers.
+
+The poll interval comes from the ``INTRADAY_POLL_SECONDS`` environment
+variable (default 60, minimum 5).
+"""
+
+import datetime
+import logging
+import os
+import threading
+import time
+
+import akshare as ak
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import Fund, Holding
+from app.services.events import AsyncNotifier, publish
+from app.services.index_constituents import index_code_for
+from app.services.nav_panel import latest_navs
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = max(5, int(os.environ.get("INTRADAY_POLL_SECONDS", "60")))
+
+# Estimates move between the call auction and a little after the close (trading days)
+_MARKET_OPEN = datetime.time(9, 15)
+_MARKET_CLOSE = datetime.time(15, 5)
+
+# Exchange calendar, reloaded once a day: (loaded on, trading dates)
+_calendar: tuple[datetime.date | None, frozenset[datetime.date]] = (None, frozenset())
+_calendar_lock = threading.Lock()
+
+
+def _download_trade_dates() -> frozenset[datetime.date]:
+    df = ak.tool_trade_date_hist_sina()
+    return frozenset(datetime.date.fromisoformat(str(d)[:10]) for d in df["trade_date"])
+
+
+def is_trading_day(day: datetime.date) -> bool:
+    """Whether the exchanges trade on *day*; falls back to weekdays when the calendar cannot be loaded."""
+    global _calendar
+    with _calendar_lock:
+        loaded_on, dates = _calendar
+        if loaded_on != datetime.date.today():
+            try:
+                dates = _download_trade_dates()
+            except Exception:
+                logger.exception("trade calendar download failed")
+            # Also after a failure: retry tomorrow rather than on every poll
+            _calendar = (datetime.date.today(), dates)
+    # The calendar only reaches the end of the published year
+    if dates and day <= max(dates):
+        return day in dates
+    return day.weekday() < 5
+
+
+def market_open(now: datetime.datetime | None = None) -> bool:
+    now = now or datetime.datetime.now()
+    return _MARKET_OPEN <= now.time() <= _MARKET_CLOSE and is_trading_day(now.date())
+
+
+def _parse_rate(value) -> float | None:
+    """'-0.52%' / -0.52 -> -0.52; '--' -> None"""
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+def _download_estimates() -> tuple[datetime.date | None, dict[str, float]]:
+    """``(estimate date, {fund_code: estimated growth %})`` for every fund eastmoney estimates."""
+    df = ak.fund_value_estimation_em(symbol="全部")
+    growth_col = next((c for c in df.columns if "估算增长率" in c), None)
+    if growth_col is None:
+        return None, {}
+    try:
+        est_date = datetime.date.fromisoformat(growth_col[:10])
+    except ValueError:
+        est_date = None
+    estimates = {}
+    for code, rate in zip(df["基金代码"], df[growth_col]):
+        growth = _parse_rate(rate)
+        if growth is not None:
+            estimates[str(code).zfill(6)] = growth
+    return est_date, estimates
+
+
+def _download_index_moves() -> dict[str, float]:
+    """``{index_code: change %}`` for the major A-share indices."""
+    df = ak.stock_zh_index_spot_em(symbol="沪深重要指数")
+    moves = {}
+    for code, rate in zip(df["代码"], df["涨跌幅"]):
+        change = _parse_rate(rate)
+        if change is not None:
+            moves[str(code)] = change
+    return moves
+
+
+def _timed(fn, timings: dict[str, float], name: str):
+    started = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def estimate_portfolio(session: Session) -> dict:
+    """Run one estimation cycle against the current holdings (remote calls included)."""
+    started = time.perf_counter()
+    timings: dict[str, float] = {}
+
+    positions: dict[str, dict] = {}
+    for h in session.exec(select(Holding)).all():
+        p = positions.setdefault(h.fund_code, {"shares": 0.0, "cost": 0.0})
+        p["shares"] += h.shares
+        p["cost"] += h.shares * h.cost_price
+    codes = sorted(positions)
+    funds = {f.fund_code: f for f in session.exec(select(Fund).where(Fund.fund_code.in_(codes))).all()} if codes else {}
+    navs = latest_navs(codes, session)
+
+    try:
+        est_date, estimates = _timed(_download_estimates, timings, "estimates")
+    except Exception:
+        logger.exception("fund estimate download failed")
+        est_date, estimates = None, {}
+
+    index_codes = {code: index_code_for(funds.get(code)) for code in codes if code not in estimates}
+    index_moves: dict[str, float] = {}
+    if any(index_codes.values()):
+        try:
+            index_moves = _timed(_download_index_moves, timings, "index_quotes")
+        except Exception:
+            logger.exception("index quote download failed")
+
+    compute_started = time.perf_counter()
+    # Funds whose official NAV already covers the estimate day report the realized move
+    realized = [code for code in codes if code in navs and est_date and navs[code][1] >= est_date]
+    by_date: dict[datetime.date, list[str]] = {}
+    for code in realized:
+        by_date.setdefault(navs[code][1], []).append(code)
+    previous = {
+        code: nav
+        for nav_date, group in by_date.items()
+        for code, (nav, _) in latest_navs(group, session, as_of=nav_date - datetime.timedelta(days=1)).items()
+    }
+
+    items = []
+    base_total = est_total = cost_total = 0.0
+    for code in codes:
+        shares, cost = positions[code]["shares"], positions[code]["cost"]
+        if code not in navs:
+            continue
+        nav, nav_date = navs[code]
+        if code in previous:
+            source, base_nav, est_nav = "nav", previous[code], nav
+        elif code in estimates:
+            source, base_nav, est_nav = "estimate", nav, nav * (1 + estimates[code] / 100)
+        elif index_codes.get(code) in index_moves:
+            source, base_nav, est_nav = "index", nav, nav * (1 + index_moves[index_codes[code]] / 100)
+        else:
+            source, base_nav, est_nav = "none", nav, nav
+        base_total += shares * base_nav
+        est_total += shares * est_nav
+        cost_total += cost
+        fund = funds.get(code)
+        items.append({
+            "fund_code": code,
+            "fund_name": fund.fund_name if fund else code,
+            "shares": shares,
+            "nav": nav,
+            "nav_date": str(nav_date),
+            "source": source,
+            "est_nav": round(est_nav, 4),
+            "est_growth": round((est_nav / base_nav - 1) * 100, 2) if base_nav else 0.0,
+            "est_value": round(shares * est_nav, 2),
+            "day_pnl": round(shares * (est_nav - base_nav), 2),
+        })
+    timings["compute"] = round((time.perf_counter() - compute_started) * 1000, 1)
+
+    day_pnl = est_total - base_total
+    return {
+        "as_of": datetime.datetime.now().isoformat(timespec="seconds"),
+        "estimate_date": str(est_date) if est_date else None,
+        "market_open": market_open(),
+        "estimated_value": round(est_total, 2),
+        "previous_value": round(base_total, 2),
+        "day_pnl": round(day_pnl, 2),
+        "day_pnl_percent": round(day_pnl / base_total * 100, 2) if base_total else 0.0,
+        "total_cost": round(cost_total, 2),
+        "total_pnl": round(est_total - cost_total, 2),
+        "funds": sorted(items, key=lambda x: -x["est_value"]),
+        "timings_ms": timings,
+        "cycle_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+class IntradayEngine:
+    """Background poller holding the latest estimate; readers wait on :attr:`version`."""
+
+    def __init__(self, poll_seconds: int = POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.version = 0
+        self._snapshot: dict | None = None
+        self._lock = threading.Lock()
+        self._notifier = AsyncNotifier()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="intraday-estimator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def snapshot(self) -> dict | None:
+        return self._snapshot
+
+    def refresh(self) -> dict:
+        """Run one cycle now and publish it."""
+        with Session(engine) as session:
+            snapshot = estimate_portfolio(session)
+        with self._lock:
+            self._snapshot = snapshot
+            self.version += 1
+        self._notifier.notify_all()
+        publish("intraday_estimated", estimated_value=snapshot["estimated_value"], day_pnl=snapshot["day_pnl"])
+        logger.info("intraday cycle: %.0fms %s", snapshot["cycle_ms"], snapshot["timings_ms"])
+        return snapshot
+
+    async def wait_for_update_async(self, version: int, timeout: float) -> bool:
+        """Suspend until a snapshot newer than *version* is published; False on timeout."""
+        return await self._notifier.wait_for(lambda: self.version != version, timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if market_open():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("intraday estimate cycle failed")
+            self._stop.wait(self.poll_seconds)
+
+
+intraday_engine = IntradayEngine()
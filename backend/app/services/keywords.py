@@ -0,0 +1,73 @@
+"""Compiled multi-keyword matcher used by the fund name / benchmark classifiers."""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import re
+from collections.abc import Iterable
+
+# Joins texts for batch matching; never part of a keyword, so no match spans two texts
+_SEPARATOR = "\x00"
+
+
+class KeywordMatcher:
+    """Single compiled regex over an ordered ``[(keywords, label), ...]`` table.
+
+    Mirrors the "first group with any keyword contained in the text wins"
+    loops it replaces, but scans the text once in C regardless of table size.
+    The pattern is a zero-width lookahead so every start position is tried
+    (overlapping hits are seen); alternatives are ordered by group, so each
+    position reports its highest-priority keyword.
+    """
+
+    def __init__(self, table: Iterable[tuple[Iterable[str], str]], *, ignore_case: bool = False):
+        self.ignore_case = ignore_case
+        self._keywords: dict[str, tuple[int, str]] = {}  # keyword -> (priority, label)
+        for priority, (keywords, label) in enumerate(table):
+            for kw in keywords:
+                if ignore_case:
+                    kw = kw.lower()
+                self._keywords.setdefault(kw, (priority, label))
+        # Longer keywords first within a group so the captured text is the full keyword
+        ordered = sorted(self._keywords, key=lambda k: (self._keywords[k][0], -len(k)))
+        if ordered:
+            # The leading first-character class lets the regex engine skip non-candidate positions fast
+            first_chars = "".join(sorted({re.escape(k[0]) for k in ordered}))
+            alternation = "|".join(re.escape(k) for k in ordered)
+            self._pattern = re.compile(f"(?=[{first_chars}])(?=({alternation}))")
+        else:
+            self._pattern = re.compile(r"(?!)")
+
+    def first(self, text: str | None) -> str | None:
+        """Return the label of the earliest table group with a keyword in *text*."""
+        if not text:
+            return None
+        hits = self._pattern.findall(text.lower() if self.ignore_case else text)
+        if not hits:
+            return None
+        if len(hits) == 1:
+            return self._keywords[hits[0]][1]
+        return min(map(self._keywords.__getitem__, hits))[1]
+
+    def matches(self, text: str | None) -> bool:
+        if not text:
+            return False
+        return self._pattern.search(text.lower() if self.ignore_case else text) is not None
+
+    def first_many(self, texts: Iterable[str | None]) -> list[str | None]:
+        """Batch form of :meth:`first`: one regex pass over all *texts* joined together."""
+        texts = [t or "" for t in texts]
+        best: list[tuple[int, str] | None] = [None] * len(texts)
+        if not texts:
+            return []
+        joined = _SEPARATOR.join(texts)
+        if self.ignore_case:
+            joined = joined.lower()
+        starts = list(itertools.accumulate((len(t) + 1 for t in texts[:-1]), initial=0))
+        for m in self._pattern.finditer(joined):
+            i = bisect.bisect_right(starts, m.start()) - 1
+            hit = self._keywords[m.group(1)]
+            if best[i] is None or hit < best[i]:
+                best[i] = hit
+        return [b[1] if b else None for b in best]
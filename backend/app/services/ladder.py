@@ -0,0 +1,107 @@
+"""Maturity ladder of the stable bucket: projected principal + interest cash flows.
+
+Every stable asset with a maturity date pays back its principal plus simple
+interest (ACT/365, from ``start_date`` or the day the amount was last edited)
+on that date. Maturities are bucketed into weeks or months over the horizon
+with numpy; assets already past maturity are reported as overdue and assets
+without a maturity date as open-ended.
+
+Results are cached until ``stable_assets`` is written (see
+:func:`app.services.generations.generation_cache`).
+"""
+
+import datetime
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.models import StableAsset
+from app.services.accrual import DAY_COUNT_BASIS
+from app.services.generations import generation_cache
+from app.services.trend_rollup import period_starts
+
+LADDER_INTERVALS = ("week", "month")
+
+
+def _horizon_end(today: datetime.date, horizon_months: int) -> datetime.date:
+    month = today.month - 1 + horizon_months
+    year, month = today.year + month // 12, month % 12 + 1
+    return datetime.date(year, month, 1) - datetime.timedelta(days=1)
+
+
+@generation_cache("stable_assets")
+def compute_ladder(session: Session, today: datetime.date, interval: str, horizon_months: int) -> dict:
+    """Cash-flow ladder from *today* to the end of the *horizon_months*-th month."""
+    if interval not in LADDER_INTERVALS:
+        raise ValueError(f"unknown interval: {interval}")
+    assets = session.exec(select(StableAsset)).all()
+    dated = [a for a in assets if a.maturity_date]
+    end = _horizon_end(today, horizon_months)
+
+    principal = np.array([a.amount for a in dated], dtype=float)
+    rate = np.array([a.annual_rate / 100 for a in dated], dtype=float)
+    start = np.array([a.start_date or a.updated_at.date() for a in dated], dtype="datetime64[D]")
+    maturity = np.array([a.maturity_date for a in dated], dtype="datetime64[D]")
+    term_days = np.maximum((maturity - start).astype(np.int64), 0)
+    interest = np.round(principal * rate * term_days / DAY_COUNT_BASIS, 2)
+
+    today64, end64 = np.datetime64(today, "D"), np.datetime64(end, "D")
+    overdue = maturity < today64
+    upcoming = ~overdue & (maturity <= end64)
+
+    # Every period of the horizon, in order, so the ladder has no gaps
+    all_days = np.arange(today64, end64 + 1)
+    periods = np.unique(period_starts(all_days, interval))
+    idx = np.searchsorted(periods, period_starts(maturity[upcoming], interval))
+    period_principal = np.zeros(len(periods))
+    period_interest = np.zeros(len(periods))
+    np.add.at(period_principal, idx, principal[upcoming])
+    np.add.at(period_interest, idx, interest[upcoming])
+    period_total = period_principal + period_interest
+
+    names: list[list[dict]] = [[] for _ in periods]
+    upcoming_assets = [a for a, flag in zip(dated, upcoming) if flag]
+    for i, a, amt, inc in zip(idx.tolist(), upcoming_assets, principal[upcoming], interest[upcoming]):
+        names[i].append({
+            "id": a.id, "name": a.name, "platform": a.platform, "maturity_date": str(a.maturity_date),
+            "principal": round(float(amt), 2), "interest": round(float(inc), 2),
+        })
+
+    ladder = [
+        {
+            "period": str(p),
+            "principal": round(float(pr), 2),
+            "interest": round(float(it), 2),
+            "total": round(float(tot), 2),
+            "cumulative": round(float(cum), 2),
+            "assets": items,
+        }
+        for p, pr, it, tot, cum, items in zip(
+            periods.tolist(), period_principal, period_interest, period_total, np.cumsum(period_total), names
+        )
+    ]
+
+    weights = principal[~overdue]
+    days_left = (maturity[~overdue] - today64).astype(np.int64)
+    return {
+        "as_of": str(today),
+        "interval": interval,
+        "horizon_end": str(end),
+        "total_principal": round(float(sum(a.amount for a in assets)), 2),
+        "scheduled_principal": round(float(principal[upcoming].sum()), 2),
+        "scheduled_interest": round(float(interest[upcoming].sum()), 2),
+        # principal-weighted average days to maturity / rate of the not-yet-matured dated assets
+        "weighted_days_to_maturity": round(float(days_left @ weights / weights.sum()), 1) if weights.sum() else None,
+        "weighted_rate": round(float(rate[~overdue] @ weights / weights.sum() * 100), 3) if weights.sum() else None,
+        "ladder": ladder,
+        "overdue": [
+            {"id": a.id, "name": a.name, "maturity_date": str(a.maturity_date),
+             "principal": a.amount, "interest": round(float(i), 2)}
+            for a, i, flag in zip(dated, interest, overdue) if flag
+        ],
+        "open_ended": [{"id": a.id, "name": a.name, "amount": a.amount} for a in assets if not a.maturity_date],
+    }
+
+
+def stable_ladder(session: Session, interval: str = "month", horizon_months: int = 12) -> dict:
+    return compute_ladder(session, datetime.date.today(), interval, horizon_months)
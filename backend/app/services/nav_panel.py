@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import FundNavHistory
+
+
+@dataclass
+class NavPanel:
+    """Dense date x fund NAV matrix built from ``fund_nav_history``.
+
+    ``navs`` is forward-filled along the date axis; cells before a fund's
+    first NAV stay NaN.
+    """
+
+    dates: np.ndarray  # datetime64[D], ascending
+    fund_codes: list[str]
+    navs: np.ndarray  # shape (len(dates), len(fund_codes))
+
+    def returns(self) -> np.ndarray:
+        """Simple daily returns, shape (len(dates) - 1, len(fund_codes)); NaN where undefined."""
+        if len(self.dates) < 2:
+            return np.empty((0, len(self.fund_codes)))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.navs[1:] / self.navs[:-1] - 1.0
+
+    def first_valid_dates(self) -> dict[str, datetime.date | None]:
+        result: dict[str, datetime.date | None] = {}
+        valid = ~np.isnan(self.navs)
+        for j, code in enumerate(self.fund_codes):
+            rows = np.flatnonzero(valid[:, j])
+            result[code] = self.dates[rows[0]].astype(datetime.date) if rows.size else None
+        return result
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    if values.size == 0:
+        return values
+    mask = np.isnan(values)
+    idx = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+def load_nav_panel(
+    fund_codes: list[str],
+    session: Session,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+) -> NavPanel:
+    """Load NAVs for *fund_codes* into a :class:`NavPanel` with a single query."""
+    codes = list(dict.fromkeys(fund_codes))
+    if not codes:
+        return NavPanel(dates=np.array([], dtype="datetime64[D]"), fund_codes=[], navs=np.empty((0, 0)))
+
+    query = (
+        select(FundNavHistory.fund_code, FundNavHistory.date, FundNavHistory.nav)
+        .where(FundNavHistory.fund_code.in_(codes))
+    )
+    if start:
+        query = query.where(FundNavHistory.date >= start)
+    if end:
+        query = query.where(FundNavHistory.date <= end)
+    rows = session.exec(query).all()
+
+    if not rows:
+        return NavPanel(
+            dates=np.array([], dtype="datetime64[D]"),
+            fund_codes=codes,
+            navs=np.empty((0, len(codes))),
+        )
+
+    code_index = {c: i for i, c in enumerate(codes)}
+    col = np.fromiter((code_index[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+    raw_dates = np.array([r[1] for r in rows], dtype="datetime64[D]")
+    nav = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+
+    dates, row = np.unique(raw_dates, return_inverse=True)
+    navs = np.full((len(dates), len(codes)), np.nan)
+    navs[row, col] = nav
+    return NavPanel(dates=dates, fund_codes=codes, navs=_forward_fill(navs))
+
+
+def latest_navs(
+    fund_codes: list[str], session: Session, as_of: datetime.date | None = None
+) -> dict[str, tuple[float, datetime.date]]:
+    """Return ``{fund_code: (nav, date)}`` for the most recent NAV of each fund (on or before *as_of*)."""
+    codes = list(dict.fromkeys(fund_codes))
+    if not codes:
+        return {}
+    query = (
+        select(FundNavHistory.fund_code, func.max(FundNavHistory.date).label("max_date"))
+        .where(FundNavHistory.fund_code.in_(codes))
+    )
+    if as_of:
+        query = query.where(FundNavHistory.date <= as_of)
+    latest = query.group_by(FundNavHistory.fund_code).subquery()
+    rows = session.exec(
+        select(FundNavHistory.fund_code, FundNavHistory.nav, FundNavHistory.date)
+        .join(
+            latest,
+            (FundNavHistory.fund_code == latest.c.fund_code)
+            & (FundNavHistory.date == latest.c.max_date),
+        )
+    ).all()
+    return {code: (nav, date) for code, nav, date in rows}
@@ -47,6 +47,10 @@ def build_portfolio_context(budget: PositionBudget, session: Session) -> Portfol
         holding_details.append({
             "fund_code": h.fund_code,
             "fund_name": fund.fund_name if fund else "",
+            "fund_type": fund.fund_type if fund else "",
+            "index_type": fund.index_type if fund else None,
+            "asset_class": fund.asset_class if fund else None,
+            "equity_sub": fund.equity_sub if fund else None,
             "platform": h.platform,
             "shares": h.shares,
             "cost_price": h.cost_price,
@@ -0,0 +1,156 @@
+"""Premium schedule: every remaining payment of the active insurance policies.
+
+Premiums are annual. A policy's payments start at ``next_payment_date`` or,
+when it is not set, at the next anniversary of ``start_date``, and repeat
+yearly on the same day (Feb 29 falls back to Feb 28). A ``next_payment_date``
+in the past is rolled forward to the first due date on or after today; only
+the due date just before that is kept, as a single overdue payment. They stop after ``payment_years`` payments counted
+from ``start_date``, before ``end_date``, or at the horizon, whichever comes
+first.
+
+All policies are expanded at once into a flat ``(policy, payment)`` array and
+aggregated by month, by insured person and by year with numpy. Results are
+cached until ``insurance_policies`` is written.
+"""
+
+import datetime
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.models import InsurancePolicy
+from app.services.generations import generation_cache
+
+
+def _add_months(months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """``datetime64[D]`` from month numbers and day-of-month, clipping the day to the month's length."""
+    first = months.astype("datetime64[M]").astype("datetime64[D]")
+    length = ((months + 1).astype("datetime64[M]").astype("datetime64[D]") - first).astype(np.int64)
+    return first + np.minimum(days, length) - 1
+
+
+def _next_anniversary(start: datetime.date, today: datetime.date) -> datetime.date:
+    years = max(today.year - start.year, 0)
+    months = np.array([start.year * 12 + start.month - 1 + 12 * years]) - 1970 * 12
+    candidate = _add_months(months, np.array([start.day]))[0].item()
+    if candidate < today:
+        months += 12
+        candidate = _add_months(months, np.array([start.day]))[0].item()
+    return candidate
+
+
+@generation_cache("insurance_policies")
+def compute_premium_schedule(session: Session, today: datetime.date, years: int) -> dict:
+    """Remaining premium payments of active policies from *today* over *years* years."""
+    try:
+        horizon_end = today.replace(year=today.year + years)
+    except ValueError:  # Feb 29
+        horizon_end = today.replace(year=today.year + years, day=28)
+    policies = [p for p in session.exec(select(InsurancePolicy)).all() if p.status == "active" and p.annual_premium]
+
+    horizon_month = horizon_end.year * 12 + horizon_end.month - 1 - 1970 * 12
+    anchors, days, last, counts = [], [], [], []
+    for p in policies:
+        first = p.next_payment_date or (_next_anniversary(p.start_date, today) if p.start_date else None)
+        if first is None:
+            anchors.append(0)
+            days.append(1)
+            last.append(np.datetime64("NaT"))
+            counts.append(0)
+            continue
+        anchor = first.year * 12 + first.month - 1 - 1970 * 12
+        if first < today:
+            # Stale next_payment_date: start one year before the next due date, so at most one is overdue
+            due = _next_anniversary(first, today)
+            anchor = due.year * 12 + due.month - 1 - 1970 * 12 - 12
+        anchors.append(anchor)
+        days.append(first.day)
+        # Latest allowed payment date: the payment_years-th anniversary, before end_date, within the horizon
+        limit = np.datetime64(horizon_end, "D")
+        if p.payment_years and p.start_date:
+            final_month = p.start_date.year * 12 + p.start_date.month - 1 - 1970 * 12 + 12 * (p.payment_years - 1)
+            limit = min(limit, _add_months(np.array([final_month]), np.array([p.start_date.day]))[0])
+        if p.end_date:
+            limit = min(limit, np.datetime64(p.end_date, "D") - 1)
+        last.append(limit)
+        counts.append(max((horizon_month - anchor) // 12 + 1, 0))
+
+    empty = {"as_of": str(today), "horizon_end": str(horizon_end), "total": 0.0,
+             "by_month": [], "by_person": [], "by_year": [], "policies": []}
+    if not policies or not sum(counts):
+        return empty
+
+    # Flat (policy, k) expansion: payment k of a policy is k years after its first one
+    counts_arr = np.array(counts)
+    policy_idx = np.repeat(np.arange(len(policies)), counts_arr)
+    k = np.arange(len(policy_idx)) - np.repeat(np.cumsum(counts_arr) - counts_arr, counts_arr)
+    dates = _add_months(np.array(anchors)[policy_idx] + 12 * k, np.array(days)[policy_idx])
+    keep = dates <= np.array(last, dtype="datetime64[D]")[policy_idx]
+    policy_idx, dates = policy_idx[keep], dates[keep]
+    if len(dates) == 0:
+        return empty
+    amounts = np.array([p.annual_premium for p in policies])[policy_idx]
+    persons = np.array([p.insured_person for p in policies])[policy_idx]
+
+    order = np.lexsort((policy_idx, dates))
+    policy_idx, dates, amounts, persons = policy_idx[order], dates[order], amounts[order], persons[order]
+    months = dates.astype("datetime64[M]")
+
+    month_keys, month_inv = np.unique(months, return_inverse=True)
+    person_keys, person_inv = np.unique(persons, return_inverse=True)
+    month_person = np.zeros((len(month_keys), len(person_keys)))
+    np.add.at(month_person, (month_inv, person_inv), amounts)
+    year_keys, year_inv = np.unique(dates.astype("datetime64[Y]"), return_inverse=True)
+    person_year = np.zeros((len(person_keys), len(year_keys)))
+    np.add.at(person_year, (person_inv, year_inv), amounts)
+
+    payments_by_month: list[list[dict]] = [[] for _ in month_keys]
+    for m, i, d in zip(month_inv.tolist(), policy_idx.tolist(), dates.tolist()):
+        p = policies[i]
+        payments_by_month[m].append({
+            "policy_id": p.id, "name": p.name, "insured_person": p.insured_person,
+            "date": str(d), "amount": p.annual_premium, "overdue": d < today,
+        })
+
+    per_policy = np.bincount(policy_idx, minlength=len(policies))
+    per_policy_total = np.bincount(policy_idx, weights=amounts, minlength=len(policies))
+    last_date = {i: d for i, d in zip(policy_idx.tolist(), dates.tolist())}
+    year_labels = [str(y) for y in year_keys.astype(int) + 1970]
+    return {
+        "as_of": str(today),
+        "horizon_end": str(horizon_end),
+        "total": round(float(amounts.sum()), 2),
+        "by_month": [
+            {
+                "month": str(m),
+                "total": round(float(row.sum()), 2),
+                "by_person": {person: round(float(v), 2) for person, v in zip(person_keys.tolist(), row) if v},
+                "payments": payments_by_month[i],
+            }
+            for i, (m, row) in enumerate(zip(month_keys, month_person))
+        ],
+        "by_person": [
+            {
+                "insured_person": person,
+                "total": round(float(row.sum()), 2),
+                "by_year": {y: round(float(v), 2) for y, v in zip(year_labels, row) if v},
+            }
+            for person, row in zip(person_keys.tolist(), person_year)
+        ],
+        "by_year": [{"year": y, "total": round(float(v), 2)} for y, v in zip(year_labels, person_year.sum(axis=0))],
+        "policies": [
+            {
+                "id": p.id,
+                "name": p.name,
+                "insured_person": p.insured_person,
+                "remaining_payments": int(per_policy[i]),
+                "remaining_total": round(float(per_policy_total[i]), 2),
+                "last_payment_date": str(last_date[i]) if i in last_date else None,
+            }
+            for i, p in enumerate(policies)
+        ],
+    }
+
+
+def premium_schedule(session: Session, years: int = 10) -> dict:
+    return compute_premium_schedule(session, datetime.date.today(), years)
@@ -0,0 +1,167 @@
+"""Materialized reminders: insurance renewals and lapses, stable-asset maturities, position drift.
+
+Rows are rebuilt per source by the write paths that can change them
+(insurance, stable assets, position budget, holdings) and for every source
+by the daily date roll (scheduled, and once at startup), since the level and
+the "还有N天" text depend on today's date. The date of the last full roll is
+kept in ``reminder_rolls``, so an empty table still counts as rolled.
+
+Readers never write: they take one range scan over ``due_date``, or, when the
+table was not rolled today (a separate process such as the MCP server running
+while the API is down), build the reminders in memory instead.
+
+Reminders without a date of their own (lapsed policies, position drift) are
+due on the roll date; expired policies are due on their end date.
+"""
+
+import datetime
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.models import Holding, InsurancePolicy, PositionBudget, Reminder, ReminderRoll, StableAsset
+from app.services.nav_panel import latest_navs
+
+URGENT_DAYS = 7
+WARNING_DAYS = 30
+SOURCES = ("insurance", "stable", "growth_position")
+
+_LEVEL_ORDER = {"urgent": 0, "warning": 1, "info": 2}
+
+
+def _countdown_level(days: int) -> str:
+    if days <= URGENT_DAYS:
+        return "urgent"
+    if days <= WARNING_DAYS:
+        return "warning"
+    return "info"
+
+
+def _insurance_reminders(session: Session, today: datetime.date) -> list[dict]:
+    reminders = []
+    for p in session.exec(select(InsurancePolicy)).all():
+        who = f"{p.name}({p.insured_person})"
+        base = {"source": "insurance", "source_id": p.id, "link": "/insurance"}
+        if p.status == "lapsed":
+            reminders.append({
+                **base, "type": "insurance_lapsed", "level": "urgent", "due_date": today, "days": None,
+                "title": "保险已失效", "detail": f"{who} 状态已失效",
+            })
+            continue
+        if p.status != "active":
+            continue
+        if p.end_date and p.end_date < today:
+            reminders.append({
+                **base, "type": "insurance_expired", "level": "urgent", "due_date": p.end_date, "days": None,
+                "title": "保险已过期", "detail": f"{who} 已于{p.end_date}过期",
+            })
+        if p.next_payment_date:
+            days = (p.next_payment_date - today).days
+            if days < 0:
+                title, detail = "保险已逾期续费", f"{who} 已逾期{-days}天"
+            elif days <= URGENT_DAYS:
+                title, detail = "保险即将续费", f"{who} 还有{days}天"
+            else:
+                title, detail = "保险续费提醒", f"{who} 还有{days}天"
+            reminders.append({
+                **base, "type": "insurance_renewal", "level": _countdown_level(days),
+                "due_date": p.next_payment_date, "days": days, "title": title, "detail": detail,
+            })
+    return reminders
+
+
+def _stable_reminders(session: Session, today: datetime.date) -> list[dict]:
+    reminders = []
+    for a in session.exec(select(StableAsset)).all():
+        if not a.maturity_date:
+            continue
+        days = (a.maturity_date - today).days
+        if days < 0:
+            title, detail = "理财已到期", f"{a.name} 已到期{-days}天，请处理"
+        elif days <= URGENT_DAYS:
+            title, detail = "理财即将到期", f"{a.name} 还有{days}天到期"
+        else:
+            title, detail = "理财到期提醒", f"{a.name} 还有{days}天到期"
+        reminders.append({
+            "source": "stable", "source_id": a.id, "type": "stable_maturity", "level": _countdown_level(days),
+            "due_date": a.maturity_date, "days": days, "title": title, "detail": detail, "link": "/stable",
+        })
+    return reminders
+
+
+def _position_reminders(session: Session, today: datetime.date) -> list[dict]:
+    budget = session.exec(select(PositionBudget)).first()
+    if not budget or budget.total_budget <= 0:
+        return []
+    holdings = session.exec(select(Holding)).all()
+    navs = latest_navs([h.fund_code for h in holdings], session)
+    growth = sum(h.shares * navs[h.fund_code][0] for h in holdings if h.fund_code in navs)
+    position_pct = growth / budget.total_budget * 100
+    if position_pct < budget.target_position_min:
+        title = "长钱仓位偏低"
+        detail = f"当前仓位 {position_pct:.0f}%，低于目标下限 {budget.target_position_min:.0f}%"
+    elif position_pct > budget.target_position_max:
+        title = "长钱仓位偏高"
+        detail = f"当前仓位 {position_pct:.0f}%，高于目标上限 {budget.target_position_max:.0f}%"
+    else:
+        return []
+    return [{
+        "source": "growth_position", "source_id": budget.id, "type": "growth_position", "level": "warning",
+        "due_date": today, "days": None, "title": title, "detail": detail, "link": "/growth/position",
+    }]
+
+
+_BUILDERS = {
+    "insurance": _insurance_reminders,
+    "stable": _stable_reminders,
+    "growth_position": _position_reminders,
+}
+
+
+def refresh_reminders(session: Session, *sources: str, today: datetime.date | None = None) -> int:
+    """Rebuild the reminder rows of *sources* (default: all) as of *today*; returns the rows written.
+
+    The bulk delete comes first so the transaction takes the write lock before
+    reading; a concurrent rebuild of the same source waits and then replaces
+    these rows whole.
+    """
+    today = today or datetime.date.today()
+    sources = sources or SOURCES
+    session.execute(delete(Reminder).where(Reminder.source.in_(sources)))
+    count = 0
+    for source in sources:
+        for item in _BUILDERS[source](session, today):
+            session.add(Reminder(**item, rolled_on=today))
+            count += 1
+    if set(sources) >= set(SOURCES):
+        roll = session.get(ReminderRoll, 1) or ReminderRoll(id=1, rolled_on=today)
+        roll.rolled_on = today
+        session.add(roll)
+    session.commit()
+    return count
+
+
+def _view(r) -> dict:
+    return {"type": r["type"], "level": r["level"], "title": r["title"], "detail": r["detail"],
+            "days": r["days"], "link": r["link"]}
+
+
+def due_reminders(
+    session: Session, today: datetime.date | None = None, horizon_days: int = WARNING_DAYS
+) -> list[dict]:
+    """Reminders due within *horizon_days* (overdue included): urgent first, then by days left."""
+    today = today or datetime.date.today()
+    horizon = today + datetime.timedelta(days=horizon_days)
+    roll = session.get(ReminderRoll, 1)
+    if roll is not None and roll.rolled_on == today:
+        rows = session.exec(select(Reminder).where(Reminder.due_date <= horizon).order_by(Reminder.id)).all()
+        reminders = [_view(r.model_dump()) for r in rows]
+    else:
+        reminders = [
+            _view(item)
+            for source in SOURCES
+            for item in _BUILDERS[source](session, today)
+            if item["due_date"] <= horizon
+        ]
+    reminders.sort(key=lambda r: (_LEVEL_ORDER.get(r["level"], 9), r["days"] if r["days"] is not None else 999))
+    return reminders
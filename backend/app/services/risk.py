@@ -0,0 +1,235 @@
+"""Historical-simulation VaR/CVaR and lookthrough stress scenarios for the growth bucket."""
+
+from __future__ import annotations
+
+import datetime
+import re
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.models import Fund, Holding
+from app.services.allocation import latest_allocations
+from app.services.fund_data import _infer_geography
+from app.services.nav_panel import latest_navs, load_nav_panel
+from app.services.strategies.asset_rebalance import classify_fund
+
+DEFAULT_HORIZONS = (1, 20)
+DEFAULT_CONFIDENCES = (0.95, 0.99)
+DEFAULT_LOOKBACK_DAYS = 3 * 365
+
+# classify_fund() codes -> asset_class labels used in FundAllocation
+_CLASS_CODE_TO_LABEL = {"equity": "股票", "bond": "债券", "gold": "黄金"}
+
+_ASSET_CLASS_ALIASES = {
+    "equity": "股票", "stock": "股票", "权益": "股票",
+    "bond": "债券", "gold": "黄金", "cash": "现金",
+}
+# Also accepts Fund.region tag values
+_GEOGRAPHY_ALIASES = {
+    "china": "中国", "cn": "中国", "a股": "中国",
+    "usa": "美国", "us": "美国", "美股": "美国",
+    "hongkong": "中国香港", "hk": "中国香港", "港股": "中国香港", "香港": "中国香港",
+    "japan": "日本", "europe": "欧洲", "global": "全球",
+}
+_KNOWN_ASSET_CLASSES = {"股票", "债券", "现金", "黄金", "其他"}
+_KNOWN_GEOGRAPHIES = {"中国", "美国", "中国香港", "日本", "欧洲", "全球", "海外（其他）"}
+
+DEFAULT_SCENARIOS: list[dict] = [
+    {"name": "美股回调", "shocks": [{"asset_class": "股票", "geography": "美国", "change": -20.0}]},
+    {"name": "A股下跌", "shocks": [{"asset_class": "股票", "geography": "中国", "change": -15.0}]},
+    {"name": "港股下跌", "shocks": [{"asset_class": "股票", "geography": "中国香港", "change": -20.0}]},
+    {
+        "name": "全球股市下跌 + 黄金避险",
+        "shocks": [
+            {"asset_class": "股票", "geography": None, "change": -20.0},
+            {"asset_class": "黄金", "geography": None, "change": 10.0},
+        ],
+    },
+    {"name": "债市调整", "shocks": [{"asset_class": "债券", "geography": None, "change": -3.0}]},
+]
+
+
+def parse_shock_spec(spec: str) -> list[dict]:
+    """Parse a shock string such as ``"股票/美国:-20, 黄金:+10"``.
+
+    Each comma-separated item is ``<selector>:<change%>``; the selector is an
+    asset class, a geography, or ``asset_class/geography``. Raises ValueError
+    on unknown selectors or malformed items.
+    """
+    shocks: list[dict] = []
+    for item in re.split(r"[,，;；]", spec):
+        item = item.strip()
+        if not item:
+            continue
+        m = re.fullmatch(r"(.+?)\s*[:：]\s*([+-]?\d+(?:\.\d+)?)\s*%?", item)
+        if not m:
+            raise ValueError(f"无法解析冲击项「{item}」，格式应为 类别:涨跌幅，如 股票/美国:-20")
+        selector, change = m.group(1), float(m.group(2))
+        asset_class = geography = None
+        for token in (t.strip() for t in selector.split("/")):
+            key = token.lower()
+            if token in _KNOWN_ASSET_CLASSES or key in _ASSET_CLASS_ALIASES:
+                asset_class = _ASSET_CLASS_ALIASES.get(key, token)
+            elif token in _KNOWN_GEOGRAPHIES or key in _GEOGRAPHY_ALIASES:
+                geography = _GEOGRAPHY_ALIASES.get(key, token)
+            else:
+                raise ValueError(f"未知的资产类别或地域「{token}」")
+        shocks.append({"asset_class": asset_class, "geography": geography, "change": change})
+    if not shocks:
+        raise ValueError("冲击情景为空")
+    return shocks
+
+
+def _latest_allocation_matrix(
+    fund_codes: list[str], dimension: str, session: Session
+) -> tuple[list[str], np.ndarray, set[str]]:
+    """Return (categories, fund x category fractions, covered fund codes) for *dimension*."""
+    by_fund = latest_allocations(fund_codes, dimension, session)
+
+    categories: list[str] = sorted({a.category for allocs in by_fund.values() for a in allocs})
+    cat_index = {c: i for i, c in enumerate(categories)}
+    fund_index = {c: i for i, c in enumerate(fund_codes)}
+    matrix = np.zeros((len(fund_codes), len(categories)))
+    for code, allocs in by_fund.items():
+        for a in allocs:
+            matrix[fund_index[code], cat_index[a.category]] += a.percentage / 100
+    return categories, matrix, set(by_fund)
+
+
+def _with_fallback(
+    categories: list[str], matrix: np.ndarray, fund_codes: list[str], covered: set[str], fallback: dict[str, str]
+) -> tuple[list[str], np.ndarray]:
+    """Put 100% into the fallback category for funds with no allocation rows."""
+    extra = sorted({fallback[c] for c in fund_codes if c not in covered} - set(categories))
+    if extra:
+        categories = categories + extra
+        matrix = np.hstack([matrix, np.zeros((len(fund_codes), len(extra)))])
+    cat_index = {c: i for i, c in enumerate(categories)}
+    for i, code in enumerate(fund_codes):
+        if code not in covered:
+            matrix[i, cat_index[fallback[code]]] = 1.0
+    return categories, matrix
+
+
+def _tail_stats(returns: np.ndarray, confidence: float) -> tuple[float, float]:
+    """Return (VaR, CVaR) as positive loss fractions."""
+    cutoff = np.quantile(returns, 1 - confidence)
+    tail = returns[returns <= cutoff]
+    var = -cutoff
+    cvar = -tail.mean() if tail.size else var
+    return float(var), float(cvar)
+
+
+def compute_portfolio_risk(
+    session: Session,
+    lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+    scenarios: list[dict] | None = None,
+    horizons: tuple[int, ...] = DEFAULT_HORIZONS,
+    confidences: tuple[float, ...] = DEFAULT_CONFIDENCES,
+) -> dict:
+    """Compute historical VaR/CVaR and stress-scenario P&L for the current holdings.
+
+    VaR replays the last *lookback_days* of fund returns against today's
+    market-value weights; multi-day horizons use overlapping compounded
+    windows. Stress shocks are applied to each fund's lookthrough exposure
+    (asset_class share x geography share) from the latest ``FundAllocation`` reports.
+    """
+    holdings = session.exec(select(Holding)).all()
+    fund_codes = sorted({h.fund_code for h in holdings})
+    navs = latest_navs(fund_codes, session)
+
+    values = np.zeros(len(fund_codes))
+    fund_index = {c: i for i, c in enumerate(fund_codes)}
+    for h in holdings:
+        if h.fund_code in navs:
+            values[fund_index[h.fund_code]] += h.shares * navs[h.fund_code][0]
+    total_value = float(values.sum())
+    as_of = max((d for _, d in navs.values()), default=None)
+
+    result: dict = {
+        "as_of": str(as_of) if as_of else None,
+        "total_value": round(total_value, 2),
+        "lookback_days": lookback_days,
+        "observations": 0,
+        "var": [],
+        "scenarios": [],
+        "short_history_funds": [],
+    }
+    if total_value <= 0:
+        return result
+
+    weights = values / total_value
+
+    # --- Historical simulation VaR / CVaR ---
+    start = (as_of or datetime.date.today()) - datetime.timedelta(days=lookback_days)
+    panel = load_nav_panel(fund_codes, session, start=start)
+    fund_returns = panel.returns()
+    # Funds that did not exist yet contribute a flat return on those days
+    short = np.isnan(fund_returns).any(axis=0) if fund_returns.size else np.zeros(len(fund_codes), bool)
+    portfolio_returns = np.nan_to_num(fund_returns) @ weights
+    result["observations"] = int(portfolio_returns.size)
+    result["short_history_funds"] = [c for c, s in zip(fund_codes, short) if s]
+
+    if portfolio_returns.size:
+        log_growth = np.concatenate([[0.0], np.cumsum(np.log1p(portfolio_returns))])
+        for horizon in horizons:
+            if log_growth.size <= horizon:
+                continue
+            window = np.expm1(log_growth[horizon:] - log_growth[:-horizon])
+            for confidence in confidences:
+                var, cvar = _tail_stats(window, confidence)
+                result["var"].append({
+                    "horizon_days": horizon,
+                    "confidence": confidence,
+                    "var_percent": round(var * 100, 2),
+                    "var_amount": round(var * total_value, 2),
+                    "cvar_percent": round(cvar * 100, 2),
+                    "cvar_amount": round(cvar * total_value, 2),
+                })
+
+    # --- Stress scenarios on lookthrough exposure ---
+    funds = {f.fund_code: f for f in session.exec(select(Fund).where(Fund.fund_code.in_(fund_codes))).all()}
+    class_fallback, geo_fallback = {}, {}
+    for code in fund_codes:
+        f = funds.get(code)
+        fund_type, fund_name = (f.fund_type or "", f.fund_name or "") if f else ("", "")
+        asset_class = (f.asset_class if f else None) or classify_fund(fund_type, fund_name)
+        class_fallback[code] = _CLASS_CODE_TO_LABEL[asset_class]
+        geo_fallback[code] = _infer_geography(fund_type, fund_name)
+
+    ac_cats, ac_matrix, ac_covered = _latest_allocation_matrix(fund_codes, "asset_class", session)
+    ac_cats, ac_matrix = _with_fallback(ac_cats, ac_matrix, fund_codes, ac_covered, class_fallback)
+    geo_cats, geo_matrix, geo_covered = _latest_allocation_matrix(fund_codes, "geography", session)
+    geo_cats, geo_matrix = _with_fallback(geo_cats, geo_matrix, fund_codes, geo_covered, geo_fallback)
+    ac_index = {c: i for i, c in enumerate(ac_cats)}
+    geo_index = {c: i for i, c in enumerate(geo_cats)}
+    ones = np.ones(len(fund_codes))
+    zeros = np.zeros(len(fund_codes))
+
+    for scenario in scenarios if scenarios is not None else DEFAULT_SCENARIOS:
+        fund_impact = np.zeros(len(fund_codes))
+        for shock in scenario["shocks"]:
+            ac, geo = shock.get("asset_class"), shock.get("geography")
+            ac_exp = ac_matrix[:, ac_index[ac]] if ac in ac_index else (ones if ac is None else zeros)
+            geo_exp = geo_matrix[:, geo_index[geo]] if geo in geo_index else (ones if geo is None else zeros)
+            fund_impact += ac_exp * geo_exp * shock["change"] / 100
+        fund_pnl = values * fund_impact
+        pnl = float(fund_pnl.sum())
+        result["scenarios"].append({
+            "name": scenario["name"],
+            "shocks": scenario["shocks"],
+            "pnl": round(pnl, 2),
+            "pnl_percent": round(pnl / total_value * 100, 2),
+            "funds": [
+                {
+                    "fund_code": code,
+                    "fund_name": funds[code].fund_name if code in funds else code,
+                    "pnl": round(float(p), 2),
+                }
+                for code, p in sorted(zip(fund_codes, fund_pnl), key=lambda x: x[1])
+                if p != 0
+            ],
+        })
+
+    return result
@@ -11,6 +11,9 @@ from app.models import (
     StableAsset,
     TotalAssetSnapshot,
 )
+from app.services.accrual import accrued_interest
+from app.services.events import publish
+from app.services.trend_rollup import refresh_trend_rollups
 
 
 def take_portfolio_snapshot(session: Session) -> None:
@@ -72,6 +75,8 @@ def take_portfolio_snapshot(session: Session) -> None:
 
     if dates_to_fill:
         session.commit()
+        refresh_trend_rollups(session, "portfolio", since=dates_to_fill[0])
+        publish("snapshot_written", kind="portfolio", date=str(dates_to_fill[-1]), dates=len(dates_to_fill))
 
 
 def take_total_asset_snapshot(session: Session) -> TotalAssetSnapshot:
@@ -106,10 +111,16 @@ def take_total_asset_snapshot(session: Session) -> TotalAssetSnapshot:
     ).all()
     insurance_premium = sum(p.annual_premium for p in policies)
 
+    snapshot_date = latest_nav_date if latest_nav_date else datetime.date.today()
+
+    # Interest accrued on the liquid / stable face amounts up to the snapshot date
+    liquid_interest, stable_interest = (round(float(v[0]), 2) for v in accrued_interest(session, [snapshot_date]))
+    liquid_amount += liquid_interest
+    stable_amount += stable_interest
+
     # Total (insurance excluded from asset total, same as dashboard summary)
     total_assets = liquid_amount + stable_amount + growth_amount
 
-    snapshot_date = latest_nav_date if latest_nav_date else datetime.date.today()
     existing = session.get(TotalAssetSnapshot, snapshot_date)
     if existing:
         existing.liquid_amount = round(liquid_amount, 2)
@@ -117,6 +128,8 @@ def take_total_asset_snapshot(session: Session) -> TotalAssetSnapshot:
         existing.growth_amount = round(growth_amount, 2)
         existing.insurance_premium = round(insurance_premium, 2)
         existing.total_assets = round(total_assets, 2)
+        existing.liquid_accrued = liquid_interest
+        existing.stable_accrued = stable_interest
         session.add(existing)
     else:
         existing = TotalAssetSnapshot(
@@ -126,8 +139,12 @@ def take_total_asset_snapshot(session: Session) -> TotalAssetSnapshot:
             growth_amount=round(growth_amount, 2),
             insurance_premium=round(insurance_premium, 2),
             total_assets=round(total_assets, 2),
+            liquid_accrued=liquid_interest,
+            stable_accrued=stable_interest,
         )
         session.add(existing)
     session.commit()
+    refresh_trend_rollups(session, "total_assets", since=snapshot_date)
     session.refresh(existing)
+    publish("snapshot_written", kind="total_assets", date=str(snapshot_date))
     return existing
@@ -4,6 +4,7 @@ import datetime
 from sqlmodel import Session
 
 from app.models import Fund
+from app.services.keywords import KeywordMatcher
 from app.services.strategies.base import PortfolioContext, StrategyResult, SuggestionItem
 
 DEFAULT_CONFIG = {
@@ -33,6 +34,28 @@ EQUITY_SUB_LABELS = {
 }
 
 
+# Keyword tables for classify_equity_sub — first matching group wins
+# 基金标签 index_type -> 权益子项
+_INDEX_TYPE_SUB_KEYWORDS: list[tuple[list[str], str]] = [
+    (["sp500", "标普500"], "spx"),
+    (["nasdaq", "纳斯达克"], "nasdaq"),
+    (["csi300", "沪深300"], "csi300"),
+    (["红利"], "dividend"),
+    (["hsi", "恒生"], "hkt"),
+]
+# 基金名称 -> 权益子项
+_FUND_NAME_SUB_KEYWORDS: list[tuple[list[str], str]] = [
+    (["标普500", "标普 500", "s&p"], "spx"),
+    (["纳斯达克", "纳指", "nasdaq"], "nasdaq"),
+    (["沪深300", "沪深 300", "中证300", "中证 300"], "csi300"),
+    (["红利"], "dividend"),
+    (["恒生科技", "恒科", "港股科技"], "hkt"),
+]
+
+_INDEX_TYPE_SUB_MATCHER = KeywordMatcher(_INDEX_TYPE_SUB_KEYWORDS, ignore_case=True)
+_FUND_NAME_SUB_MATCHER = KeywordMatcher(_FUND_NAME_SUB_KEYWORDS, ignore_case=True)
+
+
 def classify_fund(fund_type: str, fund_name: str = "") -> str:
     """Classify a fund into equity/bond/gold based on its fund_type and fund_name."""
     ft = fund_type.lower()
@@ -48,51 +71,8 @@ def classify_fund(fund_type: str, fund_name: str = "") -> str:
 
 def classify_equity_sub(fund_type: str, fund_name: str, index_type: str | None = None) -> str:
     """将权益基金分类到具体的指数/类别，优先使用 index_type 标签"""
-    ft = fund_type.lower()
-    fn = fund_name.lower()
-
-    # 优先使用基金标签进行分类
-    if index_type:
-        it = index_type.lower()
-        # 标普500
-        if "sp500" in it or "标普500" in it:
-            return "spx"
-        # 纳斯达克
-        if "nasdaq" in it or "纳斯达克" in it:
-            return "nasdaq"
-        # 沪深300
-        if "csi300" in it or "沪深300" in it:
-            return "csi300"
-        # 中证红利
-        if "红利" in it:
-            return "dividend"
-        # 恒生科技
-        if "hsi" in it or "恒生" in it:
-            return "hkt"
-
-    # 如果没有标签或标签无法识别，使用基金名称/类型匹配
-    # 标普500
-    if "标普500" in fn or "标普 500" in fn or "s&p" in fn:
-        return "spx"
-
-    # 纳斯达克
-    if "纳斯达克" in fn or "纳指" in fn or "nasdaq" in fn:
-        return "nasdaq"
-
-    # 沪深300 / 中证300
-    if "沪深300" in fn or "沪深 300" in fn or "中证300" in fn or "中证 300" in fn:
-        return "csi300"
-
-    # 中证红利
-    if "红利" in fn:
-        return "dividend"
-
-    # 恒生科技 / 港股科技
-    if "恒生科技" in fn or "恒科" in fn or "港股科技" in fn:
-        return "hkt"
-
-    # 无法识别的归类到"其他"
-    return "other"
+    # 优先使用基金标签；没有标签或标签无法识别时用基金名称匹配，仍无法识别的归类到"其他"
+    return _INDEX_TYPE_SUB_MATCHER.first(index_type) or _FUND_NAME_SUB_MATCHER.first(fund_name) or "other"
 
 
 def _in_execution_window(today: datetime.date, window_days: int) -> bool:
@@ -163,7 +143,12 @@ class AssetRebalanceStrategy:
         # Merge user config with defaults
         cfg = {**DEFAULT_CONFIG, **context.strategy_config}
         if "targets" in context.strategy_config:
-            cfg["targets"] = {**DEFAULT_CONFIG["targets"], **context.strategy_config["targets"]}
+            user_targets = context.strategy_config["targets"]
+            # Merge per class so a partial override (e.g. only "max") keeps the other bounds
+            cfg["targets"] = {
+                cls: {**DEFAULT_CONFIG["targets"].get(cls, {}), **user_targets.get(cls, {})}
+                for cls in {**DEFAULT_CONFIG["targets"], **user_targets}
+            }
         targets = cfg["targets"]
         window_days = cfg.get("execution_window_days", 5)
         min_position = cfg.get("min_position_for_rebalance", 80)
@@ -174,17 +159,23 @@ class AssetRebalanceStrategy:
         equity_sub_values: dict[str, float] = {"spx": 0.0, "nasdaq": 0.0, "csi300": 0.0, "dividend": 0.0, "hkt": 0.0, "other": 0.0}
 
         for h in context.holdings:
-            fund = session.get(Fund, h["fund_code"])
-            fund_type = fund.fund_type if fund else ""
-            fund_name = fund.fund_name if fund else ""
-            index_type = fund.index_type if fund else None
-            cls = classify_fund(fund_type, fund_name)
+            # Prefer the classification persisted on Fund (carried in the context)
+            cls, sub = h.get("asset_class"), h.get("equity_sub")
+            if cls is None:
+                if "fund_type" in h:
+                    fund_type, fund_name, index_type = h["fund_type"], h.get("fund_name", ""), h.get("index_type")
+                else:
+                    fund = session.get(Fund, h["fund_code"])
+                    fund_type = fund.fund_type if fund else ""
+                    fund_name = fund.fund_name if fund else ""
+                    index_type = fund.index_type if fund else None
+                cls = classify_fund(fund_type, fund_name)
+                sub = classify_equity_sub(fund_type, fund_name, index_type) if cls == "equity" else None
             class_values[cls] += h.get("market_value", 0.0)
 
             # 如果是权益类，进一步分类到指数/子项
             if cls == "equity":
-                sub = classify_equity_sub(fund_type, fund_name, index_type)
-                equity_sub_values[sub] += h.get("market_value", 0.0)
+                equity_sub_values[sub or "other"] += h.get("market_value", 0.0)
 
         total_value = sum(class_values.values())
 
@@ -233,7 +224,7 @@ class AssetRebalanceStrategy:
             )
 
         # --- Check execution window ---
-        today = datetime.date.today()
+        today = context.as_of or datetime.date.today()
         in_window = _in_execution_window(today, window_days)
 
         if not in_window:
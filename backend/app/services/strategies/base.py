@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import datetime
 from dataclasses import dataclass, field
 from typing import Protocol
 
@@ -19,6 +20,8 @@ class PortfolioContext:
     target_position_max: float
     holdings: list[dict]
     strategy_config: dict
+    # Evaluation date; None means today. Set by the backtester when replaying history.
+    as_of: datetime.date | None = None
 
 
 @dataclass
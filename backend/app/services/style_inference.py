@@ -0,0 +1,308 @@
+"""Returns-based style analysis for funds without disclosed allocation data.
+
+Each fund's daily returns are regressed on a small set of locally stored index
+return series under long-only, fully-invested constraints (weights on the
+simplex; a zero-return cash factor absorbs the remainder). The fitted weights
+are aggregated into approximate asset-class and geography exposure and stored
+as ``FundAllocation`` rows with ``source="inferred"``, which
+:func:`app.services.allocation.latest_allocations` uses only for funds
+lacking informative reported data.
+
+All funds are fitted at once: per-fund Gram matrices are built with one
+einsum over the observation mask, and the constrained least-squares problem is
+solved by batched accelerated projected gradient.
+"""
+
+import datetime
+import json
+import logging
+
+import akshare as ak
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import FundAllocation, FundNavHistory, FundStyleFit, Holding, IndexNavHistory
+from app.services.allocation import PLACEHOLDER_CATEGORIES
+from app.services.events import publish
+from app.services.nav_panel import load_nav_panel
+
+logger = logging.getLogger(__name__)
+
+# factor key -> (label, asset-class category, geography or None for non-equity, akshare loader)
+STYLE_FACTORS: dict[str, tuple[str, str, str | None, str]] = {
+    "sh000300": ("沪深300", "股票", "中国", "stock_zh_index_daily"),
+    "HSI": ("恒生指数", "股票", "中国香港", "stock_hk_index_daily_sina"),
+    ".INX": ("标普500", "股票", "美国", "index_us_stock_sina"),
+    ".NDX": ("纳斯达克100", "股票", "美国", "index_us_stock_sina"),
+    "sh000012": ("上证国债", "债券", None, "stock_zh_index_daily"),
+    "Au99.99": ("黄金9999", "黄金", None, "spot_hist_sge"),
+}
+CASH_FACTOR = "cash"  # implicit zero-return factor
+
+_WINDOW_DAYS = 365
+_MIN_OBSERVATIONS = 60
+# Daily moves beyond this are treated as distributions / data errors, not style
+_MAX_ABS_RETURN = 0.15
+_MAX_ITER = 2000
+_TOLERANCE = 1e-7
+_MIN_WEIGHT_PERCENT = 0.1
+
+
+def refresh_factor_history(session: Session, through: datetime.date) -> list[str]:
+    """Append new closes for factors whose stored series ends before *through*; returns updated keys."""
+    stored = dict(session.exec(
+        select(IndexNavHistory.index_code, func.max(IndexNavHistory.date)).group_by(IndexNavHistory.index_code)
+    ).all())
+    updated = []
+    for key, (_, _, _, loader) in STYLE_FACTORS.items():
+        last = stored.get(key)
+        if last and last >= through:
+            continue
+        try:
+            df = getattr(ak, loader)(symbol=key)
+        except Exception:
+            logger.exception("factor history download failed for %s", key)
+            continue
+        added = 0
+        for value, close in zip(df["date"], df["close"]):
+            date = _to_date(value)
+            if last and date <= last:
+                continue
+            session.add(IndexNavHistory(index_code=key, date=date, close=float(close)))
+            added += 1
+        if added:
+            updated.append(key)
+    session.commit()
+    return updated
+
+
+def _to_date(value) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _factor_returns(dates: np.ndarray, session: Session) -> np.ndarray:
+    """Factor returns aligned to *dates* (last close on or before each date), shape (len(dates) - 1, k)."""
+    keys = list(STYLE_FACTORS)
+    closes = np.full((len(dates), len(keys) + 1), np.nan)
+    closes[:, -1] = 1.0  # cash
+    rows = session.exec(
+        select(IndexNavHistory.index_code, IndexNavHistory.date, IndexNavHistory.close)
+        .where(IndexNavHistory.index_code.in_(keys))
+        .where(IndexNavHistory.date <= dates[-1].astype(datetime.date))
+        .order_by(IndexNavHistory.index_code, IndexNavHistory.date)
+    ).all()
+    by_key: dict[str, list[tuple[datetime.date, float]]] = {}
+    for key, date, close in rows:
+        by_key.setdefault(key, []).append((date, close))
+    for j, key in enumerate(keys):
+        series = by_key.get(key)
+        if not series:
+            continue
+        factor_dates = np.array([d for d, _ in series], dtype="datetime64[D]")
+        values = np.array([c for _, c in series])
+        idx = np.searchsorted(factor_dates, dates, side="right") - 1
+        closes[:, j] = np.where(idx >= 0, values[np.maximum(idx, 0)], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return closes[1:] / closes[:-1] - 1.0
+
+
+def _project_simplex(v: np.ndarray) -> np.ndarray:
+    """Euclidean projection of each row of *v* onto the probability simplex."""
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1.0
+    ind = np.arange(1, v.shape[1] + 1)
+    rho = np.count_nonzero(u - css / ind > 0, axis=1) - 1
+    theta = css[np.arange(v.shape[0]), rho] / (rho + 1)
+    return np.maximum(v - theta[:, None], 0.0)
+
+
+def fit_style_weights(
+    returns: np.ndarray, factors: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Constrained regression of every fund column of *returns* (T, n) on *factors* (T, k).
+
+    Factor columns with fewer than ``_MIN_OBSERVATIONS`` finite returns in the
+    window (failed download, no stored history yet) are left out and get zero
+    weight; otherwise one missing factor would drop every row. NaN cells are
+    then excluded per fund. Returns ``(weights (n, k), r_squared (n,),
+    observations (n,), dropped factor column indices)``.
+    """
+    usable = np.isfinite(factors).sum(axis=0) >= _MIN_OBSERVATIONS
+    dropped = np.flatnonzero(~usable)
+    full_k = factors.shape[1]
+    factors = factors[:, usable]
+
+    mask = ~np.isnan(returns) & np.all(np.isfinite(factors), axis=1)[:, None]
+    mask &= np.abs(np.nan_to_num(returns)) <= _MAX_ABS_RETURN
+    r = np.where(mask, returns, 0.0)
+    x = np.nan_to_num(factors)
+    m = mask.astype(np.float64)
+
+    gram = np.einsum("tf,ti,tj->fij", m, x, x)
+    rhs = np.einsum("tf,ti->fi", r, x)
+    lipschitz = np.linalg.eigvalsh(gram)[:, -1]
+    step = 1.0 / np.maximum(lipschitz, 1e-12)
+
+    n, k = rhs.shape
+    w = np.full((n, k), 1.0 / k)
+    y, t = w.copy(), 1.0
+    for _ in range(_MAX_ITER):
+        grad = np.einsum("fij,fj->fi", gram, y) - rhs
+        w_next = _project_simplex(y - step[:, None] * grad)
+        t_next = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        y = w_next + ((t - 1.0) / t_next) * (w_next - w)
+        converged = np.max(np.abs(w_next - w)) < _TOLERANCE
+        w, t = w_next, t_next
+        if converged:
+            break
+
+    observations = mask.sum(axis=0)
+    resid = np.where(mask, r - x @ w.T, 0.0)
+    mean = r.sum(axis=0) / np.maximum(observations, 1)
+    sst = (np.where(mask, r - mean, 0.0) ** 2).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r_squared = np.where(sst > 0, 1.0 - (resid ** 2).sum(axis=0) / sst, 0.0)
+    weights = np.zeros((n, full_k))
+    weights[:, usable] = w
+    return weights, r_squared, observations, dropped
+
+
+def _exposure_rows(weights: dict[str, float]) -> dict[str, list[tuple[str, float]]]:
+    """Aggregate factor weights into ``{"asset_class": [...], "geography": [...]}`` percentages."""
+    asset: dict[str, float] = {}
+    geo: dict[str, float] = {}
+    for key, weight in weights.items():
+        if key == CASH_FACTOR:
+            asset["现金"] = asset.get("现金", 0.0) + weight
+            continue
+        _, asset_category, geography, _ = STYLE_FACTORS[key]
+        asset[asset_category] = asset.get(asset_category, 0.0) + weight
+        if geography:
+            geo[geography] = geo.get(geography, 0.0) + weight
+    equity = sum(geo.values())
+    rows = {"asset_class": [(c, w * 100) for c, w in asset.items()]}
+    # Geography covers the equity part only, as for benchmark-derived geography
+    rows["geography"] = [(g, w / equity * 100) for g, w in geo.items()] if equity > 1e-3 else []
+    return {
+        dim: sorted(((c, round(p, 2)) for c, p in items if p >= _MIN_WEIGHT_PERCENT), key=lambda x: -x[1])
+        for dim, items in rows.items()
+    }
+
+
+def inference_candidates(session: Session) -> list[str]:
+    """Held funds missing informative reported asset-class or geography data."""
+    held = set(session.exec(select(Holding.fund_code)).all())
+    reported = {
+        dim: set(session.exec(
+            select(FundAllocation.fund_code)
+            .where(FundAllocation.dimension == dim)
+            .where(FundAllocation.source != "inferred")
+            .where(FundAllocation.category.not_in(PLACEHOLDER_CATEGORIES))
+            .distinct()
+        ).all())
+        for dim in ("asset_class", "geography")
+    }
+    return sorted(code for code in held if code not in reported["asset_class"] or code not in reported["geography"])
+
+
+def run_style_inference(session: Session, *, force: bool = False) -> dict:
+    """Fit candidate funds whose NAVs moved since their last fit and store inferred allocations. Commits.
+
+    Returns ``{"fitted": [...], "skipped": [...], "insufficient": [...], "removed": [...]}``.
+    """
+    candidates = inference_candidates(session)
+    # Inferred rows of funds that now have reported data are dropped
+    removed = sorted(set(session.exec(select(FundStyleFit.fund_code)).all()) - set(candidates))
+    if removed:
+        for record in session.exec(select(FundAllocation).where(
+            FundAllocation.fund_code.in_(removed), FundAllocation.source == "inferred"
+        )).all():
+            session.delete(record)
+        for fit in session.exec(select(FundStyleFit).where(FundStyleFit.fund_code.in_(removed))).all():
+            session.delete(fit)
+
+    nav_dates = dict(session.exec(
+        select(FundNavHistory.fund_code, func.max(FundNavHistory.date))
+        .where(FundNavHistory.fund_code.in_(candidates))
+        .group_by(FundNavHistory.fund_code)
+    ).all()) if candidates else {}
+    fitted_dates = dict(session.exec(select(FundStyleFit.fund_code, FundStyleFit.nav_date)).all())
+    due = [
+        code for code in candidates
+        if code in nav_dates and (force or fitted_dates.get(code) is None or fitted_dates[code] < nav_dates[code])
+    ]
+    skipped = [code for code in candidates if code not in due]
+    if not due:
+        session.commit()
+        return {"fitted": [], "skipped": skipped, "insufficient": [], "removed": removed}
+
+    through = max(nav_dates[code] for code in due)
+    refresh_factor_history(session, through)
+    panel = load_nav_panel(due, session, start=through - datetime.timedelta(days=_WINDOW_DAYS))
+    weights, r_squared, observations, dropped = fit_style_weights(
+        panel.returns(), _factor_returns(panel.dates, session)
+    )
+
+    factor_keys = list(STYLE_FACTORS) + [CASH_FACTOR]
+    dropped_json = json.dumps([factor_keys[i] for i in dropped])
+    fits = {f.fund_code: f for f in session.exec(select(FundStyleFit).where(FundStyleFit.fund_code.in_(due))).all()}
+    fitted, insufficient = [], []
+    now = datetime.datetime.now()
+    for j, code in enumerate(panel.fund_codes):
+        if observations[j] < _MIN_OBSERVATIONS:
+            insufficient.append(code)
+            continue
+        fund_weights = {key: float(weights[j, i]) for i, key in enumerate(factor_keys) if weights[j, i] > 1e-6}
+        for dimension, rows in _exposure_rows(fund_weights).items():
+            _replace_inferred(code, dimension, rows, session)
+        fit = fits.get(code) or FundStyleFit(fund_code=code, nav_date=nav_dates[code], observations=0, r_squared=0.0)
+        fit.nav_date = nav_dates[code]
+        fit.observations = int(observations[j])
+        fit.r_squared = round(float(r_squared[j]), 4)
+        fit.weights_json = json.dumps({k: round(v, 4) for k, v in fund_weights.items()})
+        fit.dropped_json = dropped_json
+        fit.fitted_at = now
+        session.add(fit)
+        fitted.append(code)
+    session.commit()
+    for code in fitted:
+        publish("allocation_updated", fund_code=code, source="inferred")
+    return {"fitted": fitted, "skipped": skipped, "insufficient": insufficient, "removed": removed}
+
+
+def _replace_inferred(fund_code: str, dimension: str, rows: list[tuple[str, float]], session: Session) -> None:
+    for record in session.exec(select(FundAllocation).where(
+        FundAllocation.fund_code == fund_code,
+        FundAllocation.dimension == dimension,
+        FundAllocation.source == "inferred",
+    )).all():
+        session.delete(record)
+    for category, percentage in rows:
+        session.add(FundAllocation(
+            fund_code=fund_code, dimension=dimension, category=category, percentage=percentage, source="inferred",
+        ))
+
+
+def get_style_fit(fund_code: str, session: Session) -> dict | None:
+    fit = session.get(FundStyleFit, fund_code)
+    if not fit:
+        return None
+    weights = json.loads(fit.weights_json)
+    return {
+        "fund_code": fund_code,
+        "nav_date": str(fit.nav_date),
+        "observations": fit.observations,
+        "r_squared": fit.r_squared,
+        "fitted_at": fit.fitted_at.isoformat(timespec="seconds"),
+        "dropped_factors": json.loads(fit.dropped_json),
+        "weights": [
+            {"factor": k, "label": STYLE_FACTORS[k][0] if k in STYLE_FACTORS else "现金", "weight": w}
+            for k, w in sorted(weights.items(), key=lambda x: -x[1])
+        ],
+        "exposure": _exposure_rows(weights),
+    }
@@ -0,0 +1,293 @@
+"""Parallel parameter sweep of strategy configs over the historical replay.
+
+The NAV panel is written once to a temporary ``.npy`` file and memory-mapped
+by every worker, so tasks only carry their config dict. Workers come from one
+spawn-based pool per process, reused across sweeps.
+
+CLI usage (from ``backend/``)::
+
+    python -m app.services.sweep --grid '{"execution_window_days": [3, 5, 7], "targets.equity.min": [60, 65]}'
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import datetime
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from sqlmodel import Session
+
+from app.services.backtest import BacktestInputs, load_backtest_inputs, load_strategy_config, replay
+from app.services.nav_panel import NavPanel
+from app.services.strategies.registry import get_strategy
+
+MAX_SWEEP_CONFIGS = 500
+
+# metric -> (extractor, higher_is_better)
+RANK_METRICS = {
+    "sharpe": (lambda r: r.get("sharpe"), True),
+    "total_return": (lambda r: r.get("total_return"), True),
+    "annualized_return": (lambda r: r.get("annualized_return"), True),
+    "max_drawdown": (lambda r: r.get("max_drawdown"), True),  # negative %, closer to 0 is better
+    "turnover": (lambda r: r.get("turnover"), False),
+    "class_deviation": (lambda r: r.get("tracking", {}).get("class_deviation_mean"), False),
+    "position_gap": (lambda r: r.get("tracking", {}).get("position_gap_mean"), False),
+}
+
+
+def _set_path(cfg: dict, path: str, value) -> None:
+    keys = path.split(".")
+    node = cfg
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def expand_grid(base_config: dict, grid: dict[str, list]) -> list[tuple[dict, dict]]:
+    """Return ``[(params, config), ...]`` for the cartesian product of *grid*.
+
+    Grid keys are dotted config paths such as ``targets.equity.min``.
+    """
+    if not grid:
+        return [({}, copy.deepcopy(base_config))]
+    keys = list(grid)
+    combos = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        cfg = copy.deepcopy(base_config)
+        params = dict(zip(keys, values))
+        for key, value in params.items():
+            _set_path(cfg, key, value)
+        combos.append((params, cfg))
+    return combos
+
+
+# ---------------------------------------------------------------------------
+# Worker side — one chunk of tasks per call, inputs loaded once per chunk
+# ---------------------------------------------------------------------------
+_worker_inputs: BacktestInputs | None = None
+
+
+def _init_worker(nav_path: str, dates: np.ndarray, fund_codes: list[str], meta: dict) -> None:
+    global _worker_inputs
+    navs = np.load(nav_path, mmap_mode="r")
+    _worker_inputs = BacktestInputs(panel=NavPanel(dates=dates, fund_codes=fund_codes, navs=navs), **meta)
+
+
+def _run_one(task: tuple[int, str, dict, float | None, float]) -> tuple[int, dict]:
+    idx, strategy_name, config, initial_capital, fee_rate = task
+    result = replay(_worker_inputs, get_strategy(strategy_name), config, initial_capital, fee_rate)
+    result.pop("equity_curve", None)
+    return idx, result
+
+
+def _run_chunk(initargs: tuple, tasks: list[tuple]) -> list[tuple[int, dict]]:
+    global _worker_inputs
+    _init_worker(*initargs)
+    try:
+        return [_run_one(t) for t in tasks]
+    finally:
+        _worker_inputs = None  # drop the memory map so the NAV file can be removed
+
+
+# One pool per process, created on first use: spawning interpreters (and
+# re-importing the app in each) per request costs more than most sweeps.
+# spawn rather than fork: the API process runs scheduler threads, which fork() would not copy safely.
+MAX_SWEEP_WORKERS = os.cpu_count() or 1
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_SWEEP_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_sweep_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _inputs_meta(inputs: BacktestInputs) -> dict:
+    return {
+        "funds": inputs.funds,
+        "initial_weights": inputs.initial_weights,
+        "initial_position_ratio": inputs.initial_position_ratio,
+        "total_budget": inputs.total_budget,
+        "target_position_min": inputs.target_position_min,
+        "target_position_max": inputs.target_position_max,
+    }
+
+
+def sweep_inputs(
+    inputs: BacktestInputs,
+    strategy_name: str,
+    combos: list[tuple[dict, dict]],
+    initial_capital: float | None = None,
+    fee_rate: float = 0.0,
+    rank_by: str = "sharpe",
+    max_workers: int | None = None,
+) -> dict:
+    """Evaluate every ``(params, config)`` combo and return them ranked by *rank_by*."""
+    if get_strategy(strategy_name) is None:
+        raise ValueError(f"Strategy '{strategy_name}' not found")
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Unknown rank_by '{rank_by}', choose from: {', '.join(RANK_METRICS)}")
+    if len(combos) > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"Grid expands to {len(combos)} configs, limit is {MAX_SWEEP_CONFIGS}")
+    if max_workers is not None and not 1 <= max_workers <= MAX_SWEEP_WORKERS:
+        raise ValueError(f"max_workers must be between 1 and {MAX_SWEEP_WORKERS}")
+
+    started = time.perf_counter()
+    tasks = [(i, strategy_name, cfg, initial_capital, fee_rate) for i, (_, cfg) in enumerate(combos)]
+    workers = min(max_workers or MAX_SWEEP_WORKERS, len(tasks))
+
+    fd, nav_path = tempfile.mkstemp(prefix="mosaic-navs-", suffix=".npy")
+    os.close(fd)
+    try:
+        np.save(nav_path, np.ascontiguousarray(inputs.panel.navs))
+        initargs = (nav_path, inputs.panel.dates, inputs.panel.fund_codes, _inputs_meta(inputs))
+        if workers <= 1:
+            outcomes = _run_chunk(initargs, tasks)
+        else:
+            # *workers* chunks on the shared pool caps this sweep's parallelism
+            pool = _get_pool()
+            futures = [pool.submit(_run_chunk, initargs, tasks[i::workers]) for i in range(workers)]
+            outcomes = sorted((outcome for future in futures for outcome in future.result()), key=lambda o: o[0])
+    finally:
+        os.unlink(nav_path)
+
+    extract, higher_is_better = RANK_METRICS[rank_by]
+    rows = []
+    for idx, result in outcomes:
+        params, cfg = combos[idx]
+        rows.append({"params": params, "config": cfg, **result})
+
+    def sort_key(row):
+        value = extract(row)
+        if value is None:
+            return (1, 0.0)
+        return (0, -value if higher_is_better else value)
+
+    rows.sort(key=sort_key)
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+
+    return {
+        "strategy_name": strategy_name,
+        "rank_by": rank_by,
+        "count": len(rows),
+        "workers": workers,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": rows,
+    }
+
+
+def run_sweep(
+    session: Session,
+    strategy_name: str,
+    grid: dict[str, list] | None = None,
+    configs: list[dict] | None = None,
+    base_config: dict | None = None,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    initial_capital: float | None = None,
+    fee_rate: float = 0.0,
+    rank_by: str = "sharpe",
+    max_workers: int | None = None,
+) -> dict:
+    """Sweep a grid (or an explicit list) of configs for *strategy_name*.
+
+    The grid size is checked before it is expanded.
+
+    *base_config* defaults to the stored config; explicit *configs* are
+    evaluated as-is in addition to the grid expansion.
+    """
+    size = math.prod(len(v) for v in (grid or {}).values()) + len(configs or [])
+    if size > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"Grid expands to {size} configs, limit is {MAX_SWEEP_CONFIGS}")
+    if base_config is None:
+        base_config = load_strategy_config(strategy_name, session)
+    combos = expand_grid(base_config, grid or {}) if grid or not configs else []
+    combos += [({"config": i}, cfg) for i, cfg in enumerate(configs or [])]
+    inputs = load_backtest_inputs(session, start=start, end=end)
+    return sweep_inputs(
+        inputs,
+        strategy_name,
+        combos,
+        initial_capital=initial_capital,
+        fee_rate=fee_rate,
+        rank_by=rank_by,
+        max_workers=max_workers,
+    )
+
+
+def _load_json_arg(value: str):
+    path = Path(value)
+    return json.loads(path.read_text(encoding="utf-8") if path.is_file() else value)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep strategy configs over the historical replay.")
+    parser.add_argument("--strategy", default="asset_rebalance")
+    parser.add_argument("--grid", default="{}", help="JSON object (or file) of dotted-path -> list of values")
+    parser.add_argument("--configs", help="JSON list (or file) of full config objects")
+    parser.add_argument("--start", type=datetime.date.fromisoformat)
+    parser.add_argument("--end", type=datetime.date.fromisoformat)
+    parser.add_argument("--capital", type=float)
+    parser.add_argument("--fee-rate", type=float, default=0.0)
+    parser.add_argument("--rank-by", default="sharpe", choices=list(RANK_METRICS))
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    with Session(engine) as session:
+        outcome = run_sweep(
+            session,
+            args.strategy,
+            grid=_load_json_arg(args.grid),
+            configs=_load_json_arg(args.configs) if args.configs else None,
+            start=args.start,
+            end=args.end,
+            initial_capital=args.capital,
+            fee_rate=args.fee_rate,
+            rank_by=args.rank_by,
+            max_workers=args.workers,
+        )
+
+    print(
+        f"{outcome['count']} configs, {outcome['workers']} workers, "
+        f"{outcome['elapsed_ms'] / 1000:.2f}s, ranked by {outcome['rank_by']}\n"
+    )
+    header = f"{'#':>3}  {'return%':>8}  {'cagr%':>6}  {'sharpe':>6}  {'maxdd%':>7}  {'turnover%':>9}  params"
+    print(header)
+    print("-" * len(header))
+    for row in outcome["results"][: args.top]:
+        sharpe = f"{row['sharpe']:.2f}" if row.get("sharpe") is not None else "-"
+        print(
+            f"{row['rank']:>3}  {row.get('total_return', 0):>8.2f}  {row.get('annualized_return', 0):>6.2f}  "
+            f"{sharpe:>6}  {row.get('max_drawdown', 0):>7.2f}  {row.get('turnover', 0):>9.2f}  "
+            f"{json.dumps(row['params'], ensure_ascii=False)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
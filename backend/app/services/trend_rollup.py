@@ -0,0 +1,203 @@
+"""Weekly / monthly / quarterly rollups of the daily snapshot series.
+
+Each period stores OHLC of the headline value, the closing snapshot's full
+row and the period return. The portfolio return nets out cost changes
+(money added or withdrawn), so buying more does not show up as performance;
+total assets have no flow data and use the plain change of the close.
+
+Resampling is done with numpy (period keys from ``datetime64`` arithmetic,
+``reduceat`` for highs and lows). Rollups are refreshed incrementally after
+each snapshot run — only periods from the one containing the earliest
+rewritten date onwards are recomputed.
+"""
+
+import datetime
+import json
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import PortfolioSnapshot, TotalAssetSnapshot, TrendRollup
+
+# series -> (snapshot model, headline column, all columns, cost/flow column)
+SERIES = {
+    "portfolio": (PortfolioSnapshot, "total_value", ("total_value", "total_cost", "total_pnl"), "total_cost"),
+    "total_assets": (
+        TotalAssetSnapshot,
+        "total_assets",
+        ("liquid_amount", "stable_amount", "growth_amount", "insurance_premium", "total_assets"),
+        None,
+    ),
+}
+INTERVALS = ("week", "month", "quarter")
+
+
+def period_starts(dates: np.ndarray, interval: str) -> np.ndarray:
+    """First day of the week (Monday) / month / quarter containing each ``datetime64[D]`` date."""
+    if interval == "week":
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        return (days - (days + 3) % 7).astype("datetime64[D]")  # 1970-01-01 was a Thursday
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    if interval == "quarter":
+        months = months - months % 3
+    elif interval != "month":
+        raise ValueError(f"unknown interval: {interval}")
+    return months.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def resample(
+    dates: np.ndarray,
+    columns: dict[str, np.ndarray],
+    value_key: str,
+    interval: str,
+    flow_key: str | None = None,
+    previous: dict | None = None,
+) -> list[dict]:
+    """Roll sorted daily rows up to *interval* periods.
+
+    *previous* is the closing row of the period before ``dates[0]`` (if any);
+    it anchors the first period's return.
+    """
+    if len(dates) == 0:
+        return []
+    keys = period_starts(dates, interval)
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    last = np.r_[first[1:], len(dates)] - 1
+
+    value = columns[value_key]
+    close = value[last]
+    # Base of each period's return: previous period's close, or the first snapshot for the very first period
+    base = np.r_[previous[value_key] if previous else value[0], close[:-1]]
+    change = close - base
+    if flow_key:
+        flow = columns[flow_key]
+        flow_base = np.r_[previous[flow_key] if previous else flow[0], flow[last][:-1]]
+        change = change - (flow[last] - flow_base)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(base > 0, change / base * 100, np.nan)
+
+    high = np.maximum.reduceat(value, first)
+    low = np.minimum.reduceat(value, first)
+    return [
+        {
+            "period_start": keys[f].item(),
+            "period_end": dates[e].item(),
+            "observations": int(e - f + 1),
+            "open": float(value[f]),
+            "high": float(high[i]),
+            "low": float(low[i]),
+            "close": float(close[i]),
+            "period_return": None if np.isnan(returns[i]) else round(float(returns[i]), 4),
+            "values": {k: float(col[e]) for k, col in columns.items()},
+        }
+        for i, (f, e) in enumerate(zip(first, last))
+    ]
+
+
+def _period_start(date: datetime.date, interval: str) -> datetime.date:
+    return period_starts(np.array([date], dtype="datetime64[D]"), interval)[0].item()
+
+
+def refresh_trend_rollups(
+    session: Session, series: str | None = None, since: datetime.date | None = None
+) -> dict[str, int]:
+    """Recompute rollups of *series* (default: all) for periods touching *since* onwards.
+
+    Without *since*, or when a series has no rollups yet, everything is rebuilt.
+    Returns ``{series: periods written}``.
+    """
+    written = {}
+    for name in ([series] if series else SERIES):
+        model, value_key, cols, flow_key = SERIES[name]
+        has_rollups = session.exec(select(TrendRollup.series).where(TrendRollup.series == name).limit(1)).first()
+        cutoffs = {iv: _period_start(since, iv) if since and has_rollups else None for iv in INTERVALS}
+
+        earliest = min((c for c in cutoffs.values() if c), default=None)
+        query = select(model.date, *(getattr(model, c) for c in cols)).order_by(model.date)
+        if earliest:
+            query = query.where(model.date >= earliest)
+        rows = session.exec(query).all()
+        dates = np.array([r[0] for r in rows], dtype="datetime64[D]")
+        data = np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), len(cols))
+
+        count = 0
+        for interval, cutoff in cutoffs.items():
+            stale = select(TrendRollup).where(TrendRollup.series == name, TrendRollup.interval == interval)
+            previous = None
+            if cutoff:
+                stale = stale.where(TrendRollup.period_start >= cutoff)
+                prev_row = session.exec(
+                    select(TrendRollup)
+                    .where(TrendRollup.series == name, TrendRollup.interval == interval)
+                    .where(TrendRollup.period_start < cutoff)
+                    .order_by(TrendRollup.period_start.desc())
+                    .limit(1)
+                ).first()
+                previous = json.loads(prev_row.values_json) if prev_row else None
+            for r in session.exec(stale).all():
+                session.delete(r)
+            session.flush()
+
+            mask = dates >= np.datetime64(cutoff) if cutoff else slice(None)
+            columns = {c: data[mask, i] for i, c in enumerate(cols)}
+            for p in resample(dates[mask], columns, value_key, interval, flow_key, previous):
+                session.add(TrendRollup(
+                    series=name,
+                    interval=interval,
+                    period_start=p["period_start"],
+                    period_end=p["period_end"],
+                    observations=p["observations"],
+                    open=p["open"],
+                    high=p["high"],
+                    low=p["low"],
+                    close=p["close"],
+                    period_return=p["period_return"],
+                    values_json=json.dumps(p["values"]),
+                ))
+                count += 1
+        written[name] = count
+    session.commit()
+    return written
+
+
+def backfill_trend_rollups() -> None:
+    """Build rollups for series that have snapshots but no rollups yet (first start after upgrading)."""
+    with Session(engine) as session:
+        for name, (model, *_rest) in SERIES.items():
+            has_rollups = session.exec(select(TrendRollup.series).where(TrendRollup.series == name).limit(1)).first()
+            if not has_rollups and session.exec(select(model.date).limit(1)).first():
+                refresh_trend_rollups(session, name)
+
+
+def load_rollups(
+    series: str,
+    interval: str,
+    session: Session,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+) -> list[dict]:
+    """Rollup rows of *series* whose period ends within [start, end], oldest first."""
+    query = (
+        select(TrendRollup)
+        .where(TrendRollup.series == series, TrendRollup.interval == interval)
+        .order_by(TrendRollup.period_start)
+    )
+    if start:
+        query = query.where(TrendRollup.period_end >= start)
+    if end:
+        query = query.where(TrendRollup.period_start <= end)
+    return [
+        {
+            "period": str(r.period_start),
+            "date": str(r.period_end),
+            "observations": r.observations,
+            "open": r.open,
+            "high": r.high,
+            "low": r.low,
+            "close": r.close,
+            "period_return": r.period_return,
+            **json.loads(r.values_json),
+        }
+        for r in session.exec(query).all()
+    ]
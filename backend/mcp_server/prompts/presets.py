@@ -19,16 +19,20 @@ def weekly_review() -> str:
 
 
 def risk_check() -> str:
-    """风险体检 — 分析行业集中度、地域集中度、单基金占比，给出风险提示。"""
+    """风险体检 — 分析集中度、历史 VaR 与压力情景，给出风险提示。"""
     return (
         "请帮我做一次组合风险体检。请按以下步骤操作：\n\n"
         "1. 调用 get_portfolio_summary 获取总览\n"
         "2. 调用 get_portfolio_allocation(dimension='asset_class') 查看资产类别配置\n"
         "3. 调用 get_portfolio_allocation(dimension='sector') 查看行业配置\n"
         "4. 调用 get_portfolio_allocation(dimension='geography') 查看地域配置\n"
-        "5. 调用 get_position_status 查看仓位状态\n\n"
+        "5. 调用 get_position_status 查看仓位状态\n"
+        "6. 调用 get_portfolio_risk 获取历史模拟 VaR/CVaR 和压力情景损益；"
+        "如有需要，可用 shocks 参数追加自定义情景（如 \"股票/美国:-20, 黄金:+10\"）\n\n"
         "然后基于以上数据，帮我进行风险分析，包含：\n"
         "- **集中度风险**: 单一基金/行业/地域是否过度集中（>30% 为高集中度）\n"
+        "- **尾部风险**: 1日/20日 VaR 与 CVaR 意味着多大的潜在亏损金额，是否在我的承受范围内\n"
+        "- **情景冲击**: 哪些压力情景对组合冲击最大，主要由哪些基金贡献\n"
         "- **资产配置评估**: 股债比例是否合理（结合我的仓位目标区间）\n"
         "- **相关性风险**: 是否存在多只基金实质上持有相同底层资产\n"
         "- **风险评分**: 给出 1-10 的风险评分和理由\n"
@@ -15,6 +15,7 @@ from app.models import (
     StableAsset,
 )
 from app.services.allocation import get_weighted_allocation
+from app.services.reminders import due_reminders
 
 
 def _fmt_money(v: float) -> str:
@@ -126,28 +127,11 @@ def get_portfolio_overview() -> str:
         # =====================================================================
         # Section 2: Active reminders
         # =====================================================================
-        reminders: list[str] = []
-
-        for a in stable_assets:
-            if a.maturity_date:
-                days = (a.maturity_date - today).days
-                if days < 0:
-                    reminders.append(f"{a.name} 已到期{-days}天，请及时处理")
-                elif days <= 30:
-                    reminders.append(f"{a.name} 还有{days}天到期")
-
-        for p in active_policies:
-            if p.next_payment_date:
-                days = (p.next_payment_date - today).days
-                if days < 0:
-                    reminders.append(f"{p.name}({p.insured_person}) 保费已逾期{-days}天")
-                elif days <= 30:
-                    reminders.append(f"{p.name}({p.insured_person}) 还有{days}天续费")
-
+        reminders = due_reminders(session, today)
         if reminders:
             lines.append("\n### 待办提醒\n")
             for r in reminders:
-                lines.append(f"- {r}")
+                lines.append(f"- {r['title']}：{r['detail']}")
 
         # =====================================================================
         # Section 3: Liquid assets summary
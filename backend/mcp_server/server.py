@@ -20,6 +20,7 @@ from mcp_server.tools.portfolio import (  # noqa: E402
     get_holdings,
     get_platform_breakdown,
     get_portfolio_allocation,
+    get_portfolio_risk,
     get_portfolio_summary,
     get_portfolio_trend,
 )
@@ -33,7 +34,9 @@ from mcp_server.tools.market import (  # noqa: E402
 from mcp_server.tools.buckets import (  # noqa: E402
     get_liquid_assets,
     get_stable_assets,
+    get_stable_ladder,
     get_insurance_policies,
+    get_insurance_premium_schedule,
     get_family_asset_summary,
 )
 
@@ -84,6 +87,7 @@ mcp.tool(get_holdings)
 mcp.tool(get_platform_breakdown)
 mcp.tool(get_portfolio_allocation)
 mcp.tool(get_portfolio_trend)
+mcp.tool(get_portfolio_risk)
 
 # Group 2: Fund (单基金查询)
 mcp.tool(get_fund_detail)
@@ -101,7 +105,9 @@ mcp.tool(get_macro_indicators)
 # Group 5: Buckets (四桶资产)
 mcp.tool(get_liquid_assets)
 mcp.tool(get_stable_assets)
+mcp.tool(get_stable_ladder)
 mcp.tool(get_insurance_policies)
+mcp.tool(get_insurance_premium_schedule)
 mcp.tool(get_family_asset_summary)
 
 # ---------------------------------------------------------------------------
@@ -13,6 +13,8 @@ from app.models import (
     LiquidAsset,
     StableAsset,
 )
+from app.services.ladder import LADDER_INTERVALS, compute_ladder
+from app.services.premiums import compute_premium_schedule
 
 
 def _fmt_money(v: float) -> str:
@@ -108,6 +110,61 @@ def get_stable_assets() -> str:
         return "\n".join(lines)
 
 
+def get_stable_ladder(interval: str = "month", horizon_months: int = 12) -> str:
+    """获取稳钱到期阶梯：未来各周/月到期的本金与利息现金流，用于规划再投资与流动性。
+
+    Args:
+        interval: 汇总粒度，month（默认）或 week
+        horizon_months: 展望月数，默认 12，最多 120
+    """
+    if interval not in LADDER_INTERVALS:
+        return f"不支持的粒度: {interval}（可选 month/week）"
+    horizon_months = max(1, min(horizon_months, 120))
+    with Session(engine) as session:
+        result = compute_ladder(session, datetime.date.today(), interval, horizon_months)
+
+    if not result["ladder"] and not result["overdue"] and not result["open_ended"]:
+        return "当前没有稳钱(中期保值)记录。"
+
+    label = "周" if interval == "week" else "月"
+    lines = [
+        f"## 稳钱到期阶梯（截至 {result['horizon_end']}，按{label}）\n",
+        f"- 稳钱本金合计: {_fmt_money(result['total_principal'])}",
+        f"- 区间内到期: 本金 {_fmt_money(result['scheduled_principal'])} + "
+        f"利息 {_fmt_money(result['scheduled_interest'])}",
+    ]
+    if result["weighted_days_to_maturity"] is not None:
+        lines.append(
+            f"- 加权剩余期限 {result['weighted_days_to_maturity']:.0f} 天 | 加权利率 {result['weighted_rate']:.2f}%"
+        )
+
+    rows = [p for p in result["ladder"] if p["total"]]
+    if rows:
+        lines += [
+            "",
+            f"| {label}份 | 到期本金 | 利息 | 合计 | 累计回款 | 到期资产 |",
+            "|------|----------|------|------|----------|----------|",
+        ]
+        for p in rows:
+            names = "、".join(f"{a['name']}({a['maturity_date'][5:]})" for a in p["assets"])
+            lines.append(
+                f"| {p['period']} | {_fmt_money(p['principal'])} | {_fmt_money(p['interest'])} | "
+                f"{_fmt_money(p['total'])} | {_fmt_money(p['cumulative'])} | {names} |"
+            )
+    else:
+        lines.append("\n展望期内没有到期的稳钱资产。")
+
+    if result["overdue"]:
+        lines.append("\n**已到期未处理**: " + "、".join(
+            f"{a['name']}（{a['maturity_date']}，{_fmt_money(a['principal'] + a['interest'])}）" for a in result["overdue"]
+        ))
+    if result["open_ended"]:
+        lines.append("\n**无到期日**: " + "、".join(
+            f"{a['name']}（{_fmt_money(a['amount'])}）" for a in result["open_ended"]
+        ))
+    return "\n".join(lines)
+
+
 def get_insurance_policies() -> str:
     """获取保险保单明细,按被保人分组,含保障和续费信息。"""
     with Session(engine) as session:
@@ -179,6 +236,51 @@ def get_insurance_policies() -> str:
         return "\n".join(lines)
 
 
+def get_insurance_premium_schedule(years: int = 10) -> str:
+    """获取保费现金流日历：生效保单未来各年、各被保人的应缴保费，及近 12 个月的缴费明细。
+
+    Args:
+        years: 展望年数，默认 10，最多 50
+    """
+    years = max(1, min(years, 50))
+    today = datetime.date.today()
+    with Session(engine) as session:
+        result = compute_premium_schedule(session, today, years)
+
+    if not result["by_month"]:
+        return "当前没有待缴保费的生效保单。"
+
+    year_labels = [y["year"] for y in result["by_year"]]
+    lines = [
+        f"## 保费现金流日历（{result['as_of']} 至 {result['horizon_end']}）\n",
+        f"- 待缴保费合计: {_fmt_money(result['total'])}",
+        "",
+        "| 被保人 | " + " | ".join(year_labels) + " | 合计 |",
+        "|--------|" + "------|" * len(year_labels) + "------|",
+    ]
+    for person in result["by_person"]:
+        cells = [_fmt_money(person["by_year"][y]) if y in person["by_year"] else "-" for y in year_labels]
+        lines.append(f"| {person['insured_person']} | " + " | ".join(cells) + f" | {_fmt_money(person['total'])} |")
+    lines.append(
+        "| **合计** | " + " | ".join(_fmt_money(y["total"]) for y in result["by_year"])
+        + f" | {_fmt_money(result['total'])} |"
+    )
+
+    # Months strictly before the same month next year: exactly 12 months including the current one
+    horizon = f"{today.year + 1:04d}-{today.month:02d}"
+    upcoming = [m for m in result["by_month"] if m["month"] < horizon]
+    if upcoming:
+        lines += ["", "### 近 12 个月缴费明细\n", "| 月份 | 金额 | 保单 |", "|------|------|------|"]
+        for m in upcoming:
+            items = "、".join(
+                f"{p['name']}({p['insured_person']}, {p['date'][5:]}{', 已逾期' if p['overdue'] else ''})"
+                for p in m["payments"]
+            )
+            lines.append(f"| {m['month']} | {_fmt_money(m['total'])} | {items} |")
+
+    return "\n".join(lines)
+
+
 def get_family_asset_summary() -> str:
     """获取家庭资产四桶总览:活钱、稳钱、长钱和保险的汇总数据。"""
     with Session(engine) as session:
@@ -5,7 +5,9 @@ import datetime
 from sqlmodel import Session, select
 
 from app.database import engine
-from app.models import Fund, FundAllocation, FundNavHistory, FundTopHolding
+from app.models import Fund, FundNavHistory
+from app.services.allocation import latest_allocations, latest_top_holdings
+from app.services.fetch_misses import latest_misses
 
 
 def get_fund_detail(fund_code: str) -> str:
@@ -35,42 +37,49 @@ def get_fund_detail(fund_code: str) -> str:
             f"| 基金名称 | {fund.fund_name} |",
             f"| 基金类型 | {fund.fund_type} |",
             f"| 管理公司 | {fund.management_company} |",
-            f"| 最后更新 | {fund.last_updated or 'N/A'} |",
         ]
+        if fund.benchmark:
+            lines.append(f"| 业绩比较基准 | {fund.benchmark} |")
+        if fund.inception_date:
+            lines.append(f"| 成立日期 | {fund.inception_date} |")
+        if fund.fund_size is not None:
+            lines.append(f"| 资产规模 | {fund.fund_size:.2f} 亿元 |")
+        fees = [
+            f"{label} {rate:.2f}%"
+            for label, rate in [
+                ("管理", fund.management_fee), ("托管", fund.custodian_fee), ("销售服务", fund.sales_service_fee),
+            ]
+            if rate is not None
+        ]
+        if fees:
+            lines.append(f"| 年费率 | {' / '.join(fees)} |")
+        lines.append(f"| 最后更新 | {fund.last_updated or 'N/A'} |")
         if nav_record:
             lines.append(f"| 最新净值 | {nav_record.nav:.4f} ({nav_record.date}) |")
 
         # Allocations
         for dim, dim_label in [("asset_class", "资产类别"), ("sector", "行业"), ("geography", "地域")]:
-            allocs = session.exec(
-                select(FundAllocation)
-                .where(FundAllocation.fund_code == fund_code)
-                .where(FundAllocation.dimension == dim)
-                .order_by(FundAllocation.percentage.desc())
-            ).all()
+            allocs = latest_allocations([fund_code], dim, session).get(fund_code, [])
             if allocs:
-                # Use latest report_date only
-                latest_date = max((a.report_date for a in allocs if a.report_date), default=None)
-                if latest_date:
-                    allocs = [a for a in allocs if a.report_date == latest_date]
-                lines.append(f"\n### {dim_label}配置")
+                report_date = allocs[0].report_date
+                lines.append(f"\n### {dim_label}配置" + (f"（{report_date}）" if report_date else ""))
                 lines.append(f"| {dim_label} | 占比 |")
                 lines.append(f"|--------|------|")
                 for a in sorted(allocs, key=lambda x: -x.percentage):
                     lines.append(f"| {a.category} | {a.percentage:.1f}% |")
 
         # Top holdings
-        top = session.exec(
-            select(FundTopHolding)
-            .where(FundTopHolding.fund_code == fund_code)
-            .order_by(FundTopHolding.percentage.desc())
-        ).all()
+        top = latest_top_holdings([fund_code], session).get(fund_code, [])
         if top:
             lines.append(f"\n### 重仓股（前{len(top)}名）")
             lines.append("| 股票代码 | 股票名称 | 占比 |")
             lines.append("|---------|---------|------|")
             for t in top:
                 lines.append(f"| {t.stock_code} | {t.stock_name} | {t.percentage:.2f}% |")
+        else:
+            miss = latest_misses([fund_code], "top_holdings", session).get(fund_code)
+            if miss:
+                lines.append(f"\n### 重仓股\n无披露数据（最后检查 {miss['last_checked'][:10]}）")
 
         return "\n".join(lines)
 
@@ -7,6 +7,8 @@ from sqlmodel import Session, select
 from app.database import engine
 from app.models import Fund, FundNavHistory, Holding, PortfolioSnapshot
 from app.services.allocation import get_weighted_allocation
+from app.services.risk import DEFAULT_SCENARIOS, compute_portfolio_risk, parse_shock_spec
+from app.services.trend_rollup import load_rollups
 
 
 def _fmt_money(v: float) -> str:
@@ -152,21 +154,28 @@ def get_platform_breakdown() -> str:
         return "\n".join(lines)
 
 
-def get_portfolio_allocation(dimension: str = "asset_class") -> str:
+def get_portfolio_allocation(dimension: str = "asset_class", as_of: str | None = None) -> str:
     """获取组合加权资产配置，支持按资产类别、行业、地域三个维度查看。
 
     Args:
         dimension: 配置维度，可选值：asset_class（资产类别）、sector（行业）、geography（地域）
+        as_of: 可选，历史日期（YYYY-MM-DD），按当时已披露的最新季报计算，用于查看配置漂移
     """
     valid = {"asset_class", "sector", "geography"}
     if dimension not in valid:
         return f"无效维度「{dimension}」，可选值: {', '.join(valid)}"
+    as_of_date = None
+    if as_of:
+        try:
+            as_of_date = datetime.date.fromisoformat(as_of)
+        except ValueError:
+            return f"无效日期「{as_of}」，格式应为 YYYY-MM-DD"
 
     dim_labels = {"asset_class": "资产类别", "sector": "行业", "geography": "地域"}
     label = dim_labels[dimension]
 
     with Session(engine) as session:
-        result = get_weighted_allocation(dimension, session)
+        result = get_weighted_allocation(dimension, session, as_of=as_of_date)
 
     items = result["items"]
     coverage = result["coverage"]
@@ -174,8 +183,9 @@ def get_portfolio_allocation(dimension: str = "asset_class") -> str:
     if not items:
         return f"没有{label}配置数据。"
 
+    title = f"## 组合{label}配置" + (f"（截至 {as_of}）" if as_of else "")
     lines = [
-        f"## 组合{label}配置\n",
+        f"{title}\n",
         f"| {label} | 占比 | 贡献基金 |",
         f"|--------|------|---------|",
     ]
@@ -190,18 +200,65 @@ def get_portfolio_allocation(dimension: str = "asset_class") -> str:
     )
     if cov.get("missing_funds"):
         lines.append(f"**缺少数据**: {', '.join(cov['missing_funds'])}")
+    if cov.get("inferred_funds"):
+        lines.append(f"**收益率风格推断**（非披露数据，近似值）: {', '.join(cov['inferred_funds'])}")
+    for code, miss in cov.get("no_data", {}).items():
+        lines.append(f"- {code}: 接口无数据（最后检查 {miss['last_checked'][:10]}，{miss['retry_after'][:10]} 后重试）")
 
     return "\n".join(lines)
 
 
-def get_portfolio_trend(days: int = 90) -> str:
-    """获取组合历史走势（每日快照），包含总市值、总成本和盈亏。
+_INTERVAL_LABELS = {"day": "每日", "week": "每周", "month": "每月", "quarter": "每季度"}
+
+
+def _auto_interval(days: int) -> str:
+    if days <= 90:
+        return "day"
+    if days <= 400:
+        return "week"
+    if days <= 1500:
+        return "month"
+    return "quarter"
+
+
+def get_portfolio_trend(days: int = 90, interval: str = "auto") -> str:
+    """获取组合历史走势，包含总市值、总成本和盈亏。长区间按周/月/季度汇总，避免输出上百行每日数据。
 
     Args:
         days: 查看最近多少天的走势，默认90天
+        interval: 粒度，auto（默认：≤90天每日，≤400天每周，≤1500天每月，更长按季度）、day、week、month、quarter
     """
+    if interval == "auto":
+        interval = _auto_interval(days)
+    if interval not in _INTERVAL_LABELS:
+        return f"不支持的粒度: {interval}（可选 auto/day/week/month/quarter）"
     start_date = datetime.date.today() - datetime.timedelta(days=days)
 
+    if interval != "day":
+        with Session(engine) as session:
+            rollups = load_rollups("portfolio", interval, session, start=start_date)
+        if not rollups:
+            return f"最近 {days} 天没有组合快照数据。"
+        lines = [
+            f"## 组合走势（最近 {days} 天，{_INTERVAL_LABELS[interval]}汇总）\n",
+            "| 区间 | 收盘市值 | 最高 | 最低 | 总成本 | 盈亏 | 区间收益 |",
+            "|------|----------|------|------|--------|------|----------|",
+        ]
+        for r in rollups:
+            ret = _fmt_pct(r["period_return"]) if r["period_return"] is not None else "-"
+            lines.append(
+                f"| {r['period']} ~ {r['date']} | {_fmt_money(r['close'])} | {_fmt_money(r['high'])} | "
+                f"{_fmt_money(r['low'])} | {_fmt_money(r['total_cost'])} | {_fmt_money(r['total_pnl'])} | {ret} |"
+            )
+        first, last = rollups[0], rollups[-1]
+        change = last["close"] - first["open"]
+        change_pct = (change / first["open"] * 100) if first["open"] else 0
+        lines.append(
+            f"\n**区间变化**: {_fmt_money(change)} ({_fmt_pct(change_pct)}) "
+            f"| 从 {first['period']} 到 {last['date']}（区间收益已扣除加减仓带来的成本变化）"
+        )
+        return "\n".join(lines)
+
     with Session(engine) as session:
         records = session.exec(
             select(PortfolioSnapshot)
@@ -235,3 +292,59 @@ def get_portfolio_trend(days: int = 90) -> str:
         )
 
     return "\n".join(lines)
+
+
+def get_portfolio_risk(shocks: str | None = None, lookback_days: int = 1095) -> str:
+    """获取组合风险指标：历史模拟法 1日/20日 VaR 与 CVaR，以及按资产类别/地域穿透的压力情景损益。
+
+    Args:
+        shocks: 可选，自定义冲击情景，格式为「类别:涨跌幅」逗号分隔，类别可为资产类别、地域或「资产类别/地域」，
+            如 "股票/美国:-20, 黄金:+10"
+        lookback_days: 历史模拟回看的自然日天数，默认 1095（约三年）
+    """
+    scenarios = list(DEFAULT_SCENARIOS)
+    if shocks:
+        try:
+            scenarios.append({"name": "自定义情景", "shocks": parse_shock_spec(shocks)})
+        except ValueError as e:
+            return str(e)
+
+    with Session(engine) as session:
+        result = compute_portfolio_risk(session, lookback_days=lookback_days, scenarios=scenarios)
+
+    if result["total_value"] <= 0:
+        return "当前没有可计算风险的持仓（缺少持仓或净值数据）。"
+
+    lines = [
+        f"## 组合风险指标（截至 {result['as_of']}）\n",
+        f"- 当前市值: {_fmt_money(result['total_value'])}",
+        f"- 历史样本: {result['observations']} 个交易日（回看 {result['lookback_days']} 天）",
+    ]
+    if result["short_history_funds"]:
+        lines.append(f"- 历史不足整个回看区间的基金: {', '.join(result['short_history_funds'])}")
+
+    if result["var"]:
+        lines.append("\n### 历史模拟 VaR / CVaR\n")
+        lines.append("| 持有期 | 置信度 | VaR | VaR 金额 | CVaR | CVaR 金额 |")
+        lines.append("|--------|--------|-----|---------|------|----------|")
+        for v in result["var"]:
+            lines.append(
+                f"| {v['horizon_days']}日 | {v['confidence'] * 100:.0f}% | "
+                f"{v['var_percent']:.2f}% | {_fmt_money(v['var_amount'])} | "
+                f"{v['cvar_percent']:.2f}% | {_fmt_money(v['cvar_amount'])} |"
+            )
+
+    lines.append("\n### 压力情景\n")
+    lines.append("| 情景 | 冲击 | 组合损益 | 影响最大的基金 |")
+    lines.append("|------|------|---------|--------------|")
+    for sc in result["scenarios"]:
+        shock_str = ", ".join(
+            f"{'/'.join(x for x in (s['asset_class'], s['geography']) if x)} {_fmt_pct(s['change'])}"
+            for s in sc["shocks"]
+        )
+        top = ", ".join(f"{f['fund_name']}({_fmt_money(f['pnl'])})" for f in sc["funds"][:3])
+        lines.append(
+            f"| {sc['name']} | {shock_str} | {_fmt_money(sc['pnl'])} ({_fmt_pct(sc['pnl_percent'])}) | {top or '-'} |"
+        )
+
+    return "\n".join(lines)
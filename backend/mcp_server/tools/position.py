@@ -3,7 +3,9 @@
 from sqlmodel import Session
 
 from app.database import engine
+from app.services.classification import get_class_values
 from app.services.position import build_portfolio_context, get_or_create_budget, run_strategy
+from app.services.strategies.asset_rebalance import ASSET_CLASS_LABELS, EQUITY_SUB_LABELS
 
 
 def _fmt_money(v: float) -> str:
@@ -20,6 +22,7 @@ def get_position_status() -> str:
     with Session(engine) as session:
         budget = get_or_create_budget(session)
         ctx = build_portfolio_context(budget, session)
+        class_values = get_class_values(session)
 
     lines = [
         "## 仓位管理状态\n",
@@ -42,6 +45,23 @@ def get_position_status() -> str:
         else:
             lines.append(f"\n**状态**: 仓位在目标区间内")
 
+    # Asset class breakdown
+    if class_values["total_value"] > 0:
+        lines.append("\n### 资产类别分布")
+        lines.append("| 类别 | 市值 | 占比 |")
+        lines.append("|------|------|------|")
+        for cls, value in class_values["asset_class"].items():
+            lines.append(
+                f"| {ASSET_CLASS_LABELS.get(cls, cls)} | {_fmt_money(value)} | "
+                f"{class_values['asset_class_ratio'][cls]:.1f}% |"
+            )
+        if class_values["equity_sub"]:
+            subs = ", ".join(
+                f"{EQUITY_SUB_LABELS.get(k, k)} {_fmt_money(v)}"
+                for k, v in sorted(class_values["equity_sub"].items(), key=lambda x: -x[1])
+            )
+            lines.append(f"\n权益子项: {subs}")
+
     # Per-holding breakdown
     if ctx.holdings:
         lines.append("\n### 持仓权重")
@@ -0,0 +1,103 @@
+"""Serialization time and bytes on the wire for the largest read endpoints.
+
+Runs the app in-process (no scheduler, no intraday poller) against the local
+database and, for each endpoint, reports:
+
+- request latency (median of N in-process requests; no If-None-Match, so never a 304)
+- encode time of the decoded payload with stdlib ``json`` vs ``orjson``
+- body size raw / gzip / brotli (brotli only if the ``brotli`` package is installed)
+
+Usage (from backend/)::
+
+    python -m scripts.bench_serialization [--fund 110020] [--repeat 20]
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+
+import orjson
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+
+from app.database import engine
+from app.main import app
+from app.models import FundNavHistory
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+def _largest_fund() -> str | None:
+    with Session(engine) as session:
+        row = session.exec(
+            select(FundNavHistory.fund_code, func.count())
+            .group_by(FundNavHistory.fund_code)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).first()
+    return row[0] if row else None
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def bench(client: TestClient, path: str, repeat: int) -> dict:
+    headers = {"Accept-Encoding": "identity"}
+    resp = client.get(path, headers=headers)
+    resp.raise_for_status()
+    body = resp.content
+    payload = resp.json()
+    result = {
+        "endpoint": path,
+        "request_ms": _median_ms(lambda: client.get(path, headers=headers), repeat),
+        "json_ms": _median_ms(lambda: json.dumps(payload, ensure_ascii=False).encode(), repeat),
+        "orjson_ms": _median_ms(lambda: orjson.dumps(payload), repeat),
+        "raw_bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body, compresslevel=6)),
+    }
+    if brotli is not None:
+        result["br_bytes"] = len(brotli.compress(body, quality=5))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fund", help="fund code for the NAV history endpoints (default: longest history)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    fund = args.fund or _largest_fund()
+    paths = ["/api/holdings", "/api/portfolio/risk", "/api/portfolio/trend", "/api/dashboard/trend"]
+    if fund:
+        paths[:0] = [f"/api/funds/{fund}/nav-history", f"/api/funds/{fund}/nav-history?format=columns"]
+
+    client = TestClient(app)  # not used as a context manager: skips the lifespan jobs
+    rows = []
+    for path in paths:
+        try:
+            rows.append(bench(client, path, args.repeat))
+        except Exception as e:
+            print(f"{path}: skipped ({e})")
+
+    columns = ["endpoint", "request_ms", "json_ms", "orjson_ms", "raw_bytes", "gzip_bytes"]
+    if brotli is not None:
+        columns.append("br_bytes")
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) if rows else len(c) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+if __name__ == "__main__":
+    main()
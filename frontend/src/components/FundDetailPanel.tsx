@@ -57,12 +57,15 @@ export default function FundDetailPanel() {
       return;
     }
     setLoading(true);
-    Promise.all([
-      fundsApi.get(selectedFundCode).then(setFund),
-      fundsApi.navHistory(selectedFundCode).then(setNavHistory),
-      fundsApi.allocation(selectedFundCode).then(setAllocation),
-      fundsApi.topHoldings(selectedFundCode).then(setTopHoldings),
-    ]).finally(() => setLoading(false));
+    fundsApi
+      .detail(selectedFundCode, 400)
+      .then((detail) => {
+        setFund(detail.fund ?? null);
+        setNavHistory(detail.nav_history ?? []);
+        setAllocation(detail.allocation ?? {});
+        setTopHoldings(detail.top_holdings ?? []);
+      })
+      .finally(() => setLoading(false));
   }, [selectedFundCode]);
 
   useEffect(() => {
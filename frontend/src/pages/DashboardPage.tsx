@@ -250,10 +250,11 @@ export default function DashboardPage() {
   const [savingTargets, setSavingTargets] = useState(false);
 
   useEffect(() => {
-    dashboardApi.summary().then(setSummary);
-    dashboardApi.reminders().then(setReminders);
-    dashboardApi.trend(0).then(setTrendData);
-    dashboardApi.allocationTargets().then((t) => {
+    dashboardApi.bundle(0, 400).then((bundle) => {
+      const t = bundle.allocation_targets;
+      setSummary(bundle.summary);
+      setReminders(bundle.reminders);
+      setTrendData(bundle.trend);
       setTargets(t);
       setTargetsLoaded(true);
       if (t) {
@@ -278,7 +279,7 @@ export default function DashboardPage() {
     setSnapshotLoading(true);
     try {
       await dashboardApi.snapshot();
-      const updated = await dashboardApi.trend(0);
+      const updated = await dashboardApi.trend(0, 400);
       setTrendData(updated);
     } finally {
       setSnapshotLoading(false);
@@ -18,7 +18,7 @@ export default function OverviewPage() {
 
   useEffect(() => {
     portfolioApi.summary().then(setSummary);
-    portfolioApi.trend().then(setTrend);
+    portfolioApi.trend(undefined, undefined, 400).then(setTrend);
     positionApi.getBudget().then((pos) => {
       setPosition(pos);
       if (pos.active_strategy === "asset_rebalance") {
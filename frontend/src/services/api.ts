@@ -5,9 +5,11 @@ import type {
   BudgetChangeLogEntry,
   BudgetUpdate,
   ChangeLog,
+  DashboardBundle,
   DashboardSummary,
   DiagnosisResult,
   FundAllocation,
+  FundDetail,
   FundInfo,
   GrowthAllocationRequest,
   GrowthAllocationResponse,
@@ -59,12 +61,16 @@ export const holdingsApi = {
 export const fundsApi = {
   get: (code: string) =>
     api.get<FundInfo>(`/funds/${code}`).then((r) => r.data),
-  navHistory: (code: string, start?: string, end?: string) =>
+  navHistory: (code: string, start?: string, end?: string, maxPoints?: number) =>
     api
       .get<NavHistory[]>(`/funds/${code}/nav-history`, {
-        params: { start, end },
+        params: { start, end, max_points: maxPoints },
       })
       .then((r) => r.data),
+  detail: (code: string, maxPoints?: number) =>
+    api
+      .get<FundDetail>(`/funds/${code}/detail`, { params: { max_points: maxPoints } })
+      .then((r) => r.data),
   refresh: (code: string) =>
     api.post(`/funds/${code}/refresh`).then((r) => r.data),
   allocation: (code: string) =>
@@ -83,8 +89,10 @@ export const portfolioApi = {
     api.get<PortfolioSummary>("/portfolio/summary").then((r) => r.data),
   byPlatform: () =>
     api.get<PlatformBreakdown[]>("/portfolio/by-platform").then((r) => r.data),
-  trend: (start?: string, end?: string) =>
-    api.get<PortfolioTrend[]>("/portfolio/trend", { params: { start, end } }).then((r) => r.data),
+  trend: (start?: string, end?: string, maxPoints?: number) =>
+    api
+      .get<PortfolioTrend[]>("/portfolio/trend", { params: { start, end, max_points: maxPoints } })
+      .then((r) => r.data),
   allocation: (dimension: string) =>
     api.get<AllocationResponse>("/portfolio/allocation", { params: { dimension } }).then((r) => r.data),
   snapshot: () =>
@@ -145,12 +153,18 @@ export const insuranceApi = {
 };
 
 export const dashboardApi = {
+  bundle: (days?: number, maxPoints?: number) =>
+    api
+      .get<DashboardBundle>("/dashboard/bundle", { params: { days, max_points: maxPoints } })
+      .then((r) => r.data),
   summary: () =>
     api.get<DashboardSummary>("/dashboard/summary").then((r) => r.data),
   reminders: () =>
     api.get<Reminder[]>("/dashboard/reminders").then((r) => r.data),
-  trend: (days?: number) =>
-    api.get<TotalAssetTrend[]>("/dashboard/trend", { params: { days } }).then((r) => r.data),
+  trend: (days?: number, maxPoints?: number) =>
+    api
+      .get<TotalAssetTrend[]>("/dashboard/trend", { params: { days, max_points: maxPoints } })
+      .then((r) => r.data),
   snapshot: () => api.post("/dashboard/snapshot"),
   allocationTargets: () =>
     api.get<AllocationTarget | null>("/dashboard/allocation-targets").then((r) => r.data),
@@ -382,6 +382,13 @@ export interface AllocationTarget {
   growth_target: number;
 }
 
+export interface DashboardBundle {
+  summary: DashboardSummary;
+  reminders: Reminder[];
+  trend: TotalAssetTrend[];
+  allocation_targets: AllocationTarget | null;
+}
+
 // --- Diagnosis Report Types (flexible, adapts to actual skill output) ---
 
 // The diagnosis JSON is semi-structured — the skill may produce
@@ -441,3 +448,13 @@ export interface GrowthAllocationRequest {
 }
 
 export type GrowthAllocationResponse = GrowthAllocationRequest;
+
+export interface FundDetail {
+  fund_code: string;
+  fund?: FundInfo;
+  nav_history?: NavHistory[];
+  allocation?: FundAllocation;
+  top_holdings?: TopHolding[];
+  // 失败的字段 -> 错误信息；其余字段照常返回
+  errors: Record<string, string>;
+}